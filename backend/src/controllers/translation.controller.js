@@ -29,12 +29,12 @@ export const translateBook = (req, res, next) => {
 export const translateBookFile = async (req, res, next) => {
     
     try {
-        const bookText = req.file.buffer.toString("utf-8");
+        // raw bytes, chunked by the service as they arrive instead of one JSON string
         const { language, email } = req.body;
-        const response = await axios.post(`${FAST_API_URL}/translate_book`, {
-            book: bookText,
-            language,
-            email
+        const response = await axios.post(`${FAST_API_URL}/translate_book_stream`, req.file.buffer, {
+            params: { language, email },
+            headers: { "Content-Type": "text/plain; charset=utf-8" },
+            maxBodyLength: Infinity
         });
 
         res.status(200).json(response.data);
@@ -63,6 +63,56 @@ export const getTranslationProgress = (req, res, next) => {
     }
 };
 
+/**
+ * Stream the progress events (Server-Sent Events) of a translation job using its job ID.
+ * Piped through as-is, so reconnecting clients can resume with Last-Event-ID.
+ *
+ * @param {*} req
+ * @param {*} res
+ * @param {*} next
+ */
+export const getTranslationEvents = async (req, res, next) => {
+    
+    try {
+        const headers = req.get("Last-Event-ID") ? { "Last-Event-ID": req.get("Last-Event-ID") } : {};
+        const response = await axios.get(`${FAST_API_URL}/translation_events`, {
+            params: req.query,
+            headers,
+            responseType: "stream"
+        });
+        res.set({
+            "Content-Type": "text/event-stream",
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive"
+        });
+        res.flushHeaders();
+        response.data.pipe(res);
+        req.on("close", () => response.data.destroy());
+    } catch (error) {
+        console.log("error in getTranslationEvents controller", error.message);
+        next(error);
+    }
+};
+
+/**
+ * List the languages a book has already been translated into.
+ *
+ * @param {*} req
+ * @param {*} res
+ * @param {*} next
+ */
+export const getTranslatedLanguages = (req, res, next) => {
+    
+    try {
+        forward(res, axios.get(`${FAST_API_URL}/translated_languages`, {
+            params: req.query
+        }));
+    } catch (error) {
+        console.log("error in getTranslatedLanguages controller", error.message);
+        next(error);
+    }
+};
+
 /**
  * Cancel an ongoing translation job using its job ID.
  *
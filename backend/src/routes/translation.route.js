@@ -4,6 +4,8 @@ import { upload } from "../middleware/multer.middleware.js"
 import {
     cancelTranslation,
     getLastJob,
+    getTranslatedLanguages,
+    getTranslationEvents,
     getTranslationProgress,
     translateBook,
     translateBookFile,
@@ -13,6 +15,8 @@ const router = Router();
 
 router.get("/last_job", getLastJob);
 router.get("/translation_progress", getTranslationProgress);
+router.get("/translated_languages", getTranslatedLanguages);
+router.get("/translation_events", getTranslationEvents);
 router.post("/translate_book", translateBook);
 router.post("/translate_book/file_upload", upload.single("file"), translateBookFile);
 router.post("/cancel_translation", cancelTranslation);
@@ -1,4 +1,5 @@
 import React, { useState } from "react";
+import { useNavigate } from "react-router-dom";
 import { axiosInstance } from "../../lib/axios";
 import { useTranslationStore } from "../../stores/useTranslationStore";
 import { Button } from "@/components/ui/button";
@@ -13,8 +14,9 @@ export default function TranslationPage() {
     const [language, setLanguage] = useState("chinese");
     const [loading, setLoading] = useState(false);
 
-    //const setMeta = useTranslationStore(s => s.setMetaData);
-    //const setJobId = useTranslationStore(s => s.setJobId);
+    const navigate = useNavigate();
+    const setMeta = useTranslationStore(s => s.setMetaData);
+    const setJobId = useTranslationStore(s => s.setJobId);
     const setJobStatus = useTranslationStore(s => s.setJobStatus);
     //const setProgress = useTranslationStore(s => s.setProgress);
     const [result, setResult] = useState<string | null>(null);
@@ -39,17 +41,19 @@ const handleSubmit = async (e: React.FormEvent) => {
         };
         try {
         const res = await axiosInstance.post("/translation/translate_book", meta);
-        //   if (res.data.job_id) {
-        //     setJobId(res.data.job_id);
-        //     // store meta for polling
-        //     setMeta({
-        //       origin_title: res.data.origin_title, // should backend return these in response? If not, extract from book or frontend
-        //       origin_author: res.data.origin_author,
-        //       language,
-        //       email,
-        //     });
             setJobStatus(res.data.status);
-            if (res.data && res.data.result) setResult(res.data.result);  
+            if (res.data && res.data.result) setResult(res.data.result);
+            else if (res.data.job_id) {
+                setJobId(res.data.job_id);
+                // store meta for polling
+                setMeta({
+                    origin_title: res.data.origin_title,
+                    origin_author: res.data.origin_author,
+                    language,
+                    email,
+                });
+                navigate("/translation_progress");
+            }
             else alert("No translation result returned.");
         } catch (err) {
             alert("Failed to submit translation job.");
@@ -14,9 +14,15 @@ export interface TranslateProgressQuery {
 export interface CancelJobRequest {
   origin_title: string;
   origin_author: string;
+  language: string;
   email: string;
 }
 
+export interface TranslatedLanguagesQuery {
+  origin_title: string;
+  origin_author: string;
+}
+
 export interface LastJobQuery {
   email: string;
 }
@@ -0,0 +1,103 @@
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+import redis.asyncio as redis
+
+from app.book_translation import assemble_translated_book
+from app.file_management import write_file_to_local_storage
+from app.job_handler import (
+    fetch_saved_chunks,
+    save_job_result,
+    update_translation_job_progress
+)
+
+# Needs a local Redis, e.g. `redis-server --port 6379`
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+# chunk counts of ~6 KB translated chunks (2000 CJK characters), so up to a ~60 MB book
+CHUNK_COUNTS = [1000, 10000]
+CHUNK_TEXT = "译" * 2000
+JOB_ID = "benchmark-assembly"
+META = {
+    "origin_title": "Benchmark",
+    "origin_author": "Assembly",
+    "trans_title": "基准",
+    "trans_author": "组装",
+    "language": "chinese"
+}
+
+# ------ LEGACY ASSEMBLY ----------
+
+async def legacy_assemble(job_id: str, meta: dict, server: redis.Redis) -> int:
+    """
+        Previous implementation, kept here as the baseline.
+        HGETALL of every chunk, a stripped copy, the joined book, its compressed file and Redis copies.
+    """
+    translations = await fetch_saved_chunks(server, job_id)
+    cleaned_translations = [t.strip() for t in translations]
+    full_book = "\n\n".join(cleaned_translations)
+    write_file_to_local_storage(
+        full_book,
+        meta["origin_title"],
+        meta["origin_author"],
+        meta["trans_title"],
+        meta["trans_author"],
+        meta["language"]
+    )
+    await save_job_result(server, job_id, full_book)
+    return len(translations)
+
+# ------ BENCHMARK RUNNER ----------
+
+async def measure(assemble, server: redis.Redis) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = await assemble(JOB_ID, META, server)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return { "chunks": chunks, "time": elapsed, "peak_mb": peak / 1024 / 1024 }
+
+
+async def benchmark_assembly(server: redis.Redis, chunk_counts: list) -> list:
+    results = []
+    for total in chunk_counts:
+        print(f"Testing {total} chunks")
+        await server.delete(f"job:{JOB_ID}:chunks", f"job:{JOB_ID}:events", f"job:{JOB_ID}:events:seq")
+        await server.set(f"job:{JOB_ID}:total_chunks", total)
+        for i in range(total):
+            await update_translation_job_progress(server, JOB_ID, i, CHUNK_TEXT, total)
+
+        legacy = await measure(legacy_assemble, server)
+        streamed = await measure(assemble_translated_book, server)
+        book_mb = total * len(CHUNK_TEXT.encode("utf-8")) / 1024 / 1024
+        results.append({
+            "chunks": total,
+            "book_mb": round(book_mb, 1),
+            "legacy_peak_mb": round(legacy["peak_mb"], 1),
+            "streamed_peak_mb": round(streamed["peak_mb"], 1),
+            "legacy_time": round(legacy["time"], 2),
+            "streamed_time": round(streamed["time"], 2),
+        })
+        print(f"Done | legacy: {legacy['peak_mb']:.1f}MB peak, streamed: {streamed['peak_mb']:.1f}MB peak")
+    await server.delete(*[f"job:{JOB_ID}:{k}" for k in ("chunks", "events", "events:seq", "total_chunks", "result")])
+    return results
+
+
+async def main() -> list:
+    server = redis.Redis(port=REDIS_PORT, decode_responses=True)
+    try:
+        return await benchmark_assembly(server, CHUNK_COUNTS)
+    finally:
+        await server.aclose()
+
+# ------ SCRIPT ENTRY ----------
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as folder:
+        os.chdir(folder)
+        results = asyncio.run(main())
+    print("\n===== SUMMARY =====")
+    for res in results:
+        print(res)
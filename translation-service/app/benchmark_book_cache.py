@@ -0,0 +1,126 @@
+import contextlib
+import io
+import os
+import random
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import app.file_management as file_management
+from app.file_management import read_file_in_local_storage, write_file_to_local_storage
+from app.utils.str_utils import generate_file_name, sanitize_filename
+
+# Lookup and write latency of the translated book cache with thousands of cached books
+CACHE_SIZES = [1000, 5000]
+BOOK_BYTES = 2048
+LOOKUPS = 200
+WRITES = 50
+SEED = 42
+
+# ------ LEGACY (scan + regex) CACHE ----------
+
+def legacy_regex_pattern(origin_title: str, origin_author: str, language: str) -> re.Pattern:
+    return re.compile(
+        f"^{re.escape(sanitize_filename(origin_title)[:40])}___"
+        f"{re.escape(sanitize_filename(origin_author)[:30])}___"
+        f"{re.escape(language)}___"
+        r".*___.*___\d{8}_\d{6}\.txt$"
+    )
+
+
+def legacy_LRU_update(folder: str, n: int) -> None:
+    files = sorted(Path(folder).glob("*.txt"), key=lambda f: f.stat().st_atime, reverse=True)
+    for f in files[n:]:
+        os.remove(f)
+
+
+def legacy_read(origin_title: str, origin_author: str, language: str, folder: str, n: int) -> str:
+    """
+        Previous implementation, kept here as the baseline.
+        Scans and regex-matches the whole folder, then globs, stats and sorts it on every hit.
+    """
+    pattern = legacy_regex_pattern(origin_title, origin_author, language)
+    for entry in os.scandir(folder):
+        if pattern.match(entry.name):
+            os.utime(entry.path)
+            legacy_LRU_update(folder, n)
+            with open(entry.path, "r", encoding="utf-8") as f:
+                return f.read()
+    return ""
+
+
+def legacy_write(
+    text: str,
+    origin_title: str,
+    origin_author: str,
+    language: str,
+    folder: str,
+    n: int | None
+) -> None:
+    path = Path(folder) / generate_file_name(origin_title, origin_author, language, "T", "A")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.utime(path)
+    if n is not None:
+        legacy_LRU_update(folder, n)
+
+# ------ BENCHMARK RUNNER ----------
+
+def time_per_call(fn, calls: list) -> float:
+    start = time.perf_counter()
+    # silence the storage layer's progress prints
+    with contextlib.redirect_stdout(io.StringIO()):
+        for args in calls:
+            fn(*args)
+    return (time.perf_counter() - start) / len(calls)
+
+
+def benchmark_book_cache(num_books: int) -> dict:
+    rng = random.Random(SEED)
+    text = "x" * BOOK_BYTES
+    books = [(f"Title {i}", f"Author {i}", rng.choice(["chinese", "malay", "thai"])) for i in range(num_books)]
+    lookups = rng.sample(books, LOOKUPS)
+    writes = [(f"New title {i}", f"New author {i}", "chinese") for i in range(WRITES)]
+    # same entry bound as the legacy run
+    file_management.MAX_CACHE_ENTRIES = num_books + WRITES
+
+    with tempfile.TemporaryDirectory() as legacy_dir, tempfile.TemporaryDirectory() as indexed_dir:
+        # fill both caches, then time writes into the full cache
+        time_per_call(lambda t, a, l: legacy_write(text, t, a, l, legacy_dir, None), books)
+        fill_time = time_per_call(
+            lambda t, a, l: write_file_to_local_storage(text, t, a, "T", "A", l, indexed_dir), books
+        )
+        legacy_write_time = time_per_call(
+            lambda t, a, l: legacy_write(text, t, a, l, legacy_dir, num_books + WRITES), writes
+        )
+        indexed_write_time = time_per_call(
+            lambda t, a, l: write_file_to_local_storage(text, t, a, "T", "A", l, indexed_dir), writes
+        )
+        legacy_read_time = time_per_call(
+            lambda t, a, l: legacy_read(t, a, l, legacy_dir, num_books), lookups
+        )
+        indexed_read_time = time_per_call(
+            lambda t, a, l: read_file_in_local_storage(t, a, l, indexed_dir), lookups
+        )
+
+    return {
+        "books": num_books,
+        "legacy_read_ms": legacy_read_time * 1000,
+        "indexed_read_ms": indexed_read_time * 1000,
+        "read_speedup": legacy_read_time / indexed_read_time,
+        "legacy_write_ms": legacy_write_time * 1000,
+        "indexed_write_ms": indexed_write_time * 1000,
+        "indexed_fill_ms": fill_time * 1000,
+    }
+
+# ------ SCRIPT ENTRY ----------
+
+if __name__ == "__main__":
+    results = []
+    for num_books in CACHE_SIZES:
+        print(f"Testing cache with {num_books} books")
+        results.append(benchmark_book_cache(num_books))
+    print("\n===== SUMMARY =====")
+    for res in results:
+        print(res)
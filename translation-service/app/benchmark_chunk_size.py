@@ -1,10 +1,11 @@
 import asyncio
 import time
 import random
+from app.benchmark_chunking import generate_text
 from app.book_translation import chunk_by_tokens, translate_chunk
 from pathlib import Path
 
-# Use your realistic input
+# Use your realistic input, otherwise a generated book (see benchmark_suite.py for the mock-server based suite)
 main_loc = Path(__file__).parent
 TEXT_FILE = main_loc / "text.txt"
 LANGUAGE = "chinese"
@@ -68,8 +69,11 @@ async def benchmark_chunk_size(text, language, max_tokens_list, real_run=False):
 # ------ SCRIPT ENTRY ----------
 
 if __name__ == "__main__":
-    with open(TEXT_FILE, "r", encoding="utf-8") as f:
-        book_text = f.read()
+    if TEXT_FILE.exists():
+        with open(TEXT_FILE, "r", encoding="utf-8") as f:
+            book_text = f.read()
+    else:
+        book_text = generate_text(1)
     # Use excerpt for initial runs (to avoid excessive quota/cost)
     #book_text = book_text[:5000]
     results = asyncio.run(benchmark_chunk_size(
@@ -0,0 +1,113 @@
+import random
+import time
+from pathlib import Path
+
+from app.book_translation import chunk_by_tokens
+from app.token_counter import token_counter
+
+# Uses text.txt when present, otherwise a generated multi-MB book
+main_loc = Path(__file__).parent
+TEXT_FILE = main_loc / "text.txt"
+TEXT_SIZES_MB = [1, 4]
+MAX_TOKENS_LIST = [2000, 8000, 32000]
+SEED = 42
+
+WORDS = (
+    "the of and to in was he that it his her with as had for she on at by "
+    "not but from they be were this which have one you all an said would there "
+    "their we when been has more if no out so what up into them some could time"
+).split()
+
+# ------ LEGACY (quadratic) CHUNKER ----------
+
+def legacy_chunk_by_tokens(text: str, max_tokens: int) -> list:
+    """
+        Previous implementation, kept here as the baseline.
+        Re-encodes the whole growing candidate for every paragraph.
+    """
+    paragraphs = [p for p in text.split("\n\n") if p]
+    chunks = []
+    curr = ""
+    for p in paragraphs:
+        candidate = f"{curr}\n\n{p}" if curr else p
+        if len(token_counter.encode(candidate)) <= max_tokens:
+            curr = candidate
+        else:
+            if curr:
+                chunks.append(curr)
+            curr = p
+
+    if curr:
+        chunks.append(curr)
+    return chunks
+
+# ------ CORPUS ----------
+
+def generate_text(size_mb: float, seed: int = SEED) -> str:
+    """
+        Generates a book-like text of roughly size_mb megabytes.
+        Paragraphs are mostly short, with an occasional very long one to exercise the sentence fallback.
+    """
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    paragraphs = []
+    size = 0
+    while size < target:
+        n_sentences = rng.randint(1, 8) if rng.random() > 0.002 else rng.randint(2000, 4000)
+        sentences = []
+        for _ in range(n_sentences):
+            words = rng.choices(WORDS, k=rng.randint(5, 25))
+            sentences.append(" ".join(words).capitalize() + rng.choice([".", "!", "?"]))
+        p = " ".join(sentences)
+        paragraphs.append(p)
+        size += len(p) + 2
+    return "\n\n".join(paragraphs)
+
+# ------ BENCHMARK RUNNER ----------
+
+def run_chunker(chunker, text: str, max_tokens: int) -> dict:
+    start = time.perf_counter()
+    chunks = chunker(text, max_tokens)
+    elapsed = time.perf_counter() - start
+    oversized = sum(1 for c in chunks if len(token_counter.encode(c)) > max_tokens)
+    return {
+        "time": elapsed,
+        "num_chunks": len(chunks),
+        "oversized_chunks": oversized,
+    }
+
+
+def benchmark_chunking(texts: dict, max_tokens_list: list) -> list:
+    results = []
+    for label, text in texts.items():
+        for max_tokens in max_tokens_list:
+            print(f"Testing {label} | chunk size: {max_tokens}")
+            new = run_chunker(chunk_by_tokens, text, max_tokens)
+            legacy = run_chunker(legacy_chunk_by_tokens, text, max_tokens)
+            results.append({
+                "text": label,
+                "max_tokens": max_tokens,
+                "legacy_time": legacy["time"],
+                "linear_time": new["time"],
+                "speedup": legacy["time"] / new["time"] if new["time"] else float("inf"),
+                "legacy_chunks": legacy["num_chunks"],
+                "linear_chunks": new["num_chunks"],
+                "legacy_oversized": legacy["oversized_chunks"],
+                "linear_oversized": new["oversized_chunks"],
+            })
+            print(f"Done | legacy: {legacy['time']:.2f}s, linear: {new['time']:.2f}s")
+    return results
+
+# ------ SCRIPT ENTRY ----------
+
+if __name__ == "__main__":
+    if TEXT_FILE.exists():
+        with open(TEXT_FILE, "r", encoding="utf-8") as f:
+            texts = { TEXT_FILE.name: f.read() }
+    else:
+        texts = { f"generated_{mb}MB": generate_text(mb) for mb in TEXT_SIZES_MB }
+
+    results = benchmark_chunking(texts, MAX_TOKENS_LIST)
+    print("\n===== SUMMARY =====")
+    for res in results:
+        print(res)
@@ -0,0 +1,98 @@
+import gzip
+import random
+import time
+
+from app.benchmark_chunking import generate_text
+from app.utils.compression import zstandard
+
+# Size/CPU trade-off of compressing translated books (whole) and chunks (~2000 tokens each)
+TEXT_SIZE_MB = 1
+CHUNK_CHARS = {"english": 8000, "chinese": 3000}
+REPEATS = 5
+SEED = 42
+
+CJK_WORDS = (
+    "的 一 是 在 不 了 有 和 人 这 中 大 为 上 个 国 我 以 要 他 时 来 用 们 生 到 作 地 于 出 就 分 对 成 会 可 主 发 年 动 "
+    "同 工 也 能 下 过 子 说 产 种 面 而 方 后 多 定 行 学 法 所 民 得 经 十 三 之 进 着 等 部 度 家 电 力 里 如 水 化 高 自 "
+    "二 理 起 小 物 现 实 加 量 都 两 体 制 机 当 使 点 从 业 本 去 把 性 好 应 开 它 合 还 因 由 其 些 然 前 外 天 政 四 日"
+).split()
+
+# ------ CORPUS ----------
+
+def generate_cjk_text(size_mb: float, seed: int = SEED) -> str:
+    """
+        Generates a Chinese-like text (3 bytes per character in UTF-8) of roughly size_mb megabytes.
+    """
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    paragraphs = []
+    size = 0
+    while size < target:
+        sentences = ["".join(rng.choices(CJK_WORDS, k=rng.randint(8, 30))) + rng.choice("。！？") for _ in range(rng.randint(1, 8))]
+        p = "".join(sentences)
+        paragraphs.append(p)
+        size += len(p.encode("utf-8")) + 2
+    return "\n\n".join(paragraphs)
+
+# ------ CODECS ----------
+
+def codecs() -> dict:
+    res = {
+        "gzip-1": (lambda b: gzip.compress(b, compresslevel=1, mtime=0), gzip.decompress),
+        "gzip-6": (lambda b: gzip.compress(b, compresslevel=6, mtime=0), gzip.decompress),
+    }
+    if zstandard is not None:
+        for level in (1, 3, 9, 19):
+            res[f"zstd-{level}"] = (
+                lambda b, level=level: zstandard.ZstdCompressor(level=level).compress(b),
+                lambda b: zstandard.ZstdDecompressor().decompress(b)
+            )
+    return res
+
+# ------ BENCHMARK RUNNER ----------
+
+def measure(compress, decompress, pieces: list[bytes]) -> dict:
+    raw = sum(len(p) for p in pieces)
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        compressed = [compress(p) for p in pieces]
+    compress_time = (time.perf_counter() - start) / REPEATS
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for c in compressed:
+            decompress(c)
+    decompress_time = (time.perf_counter() - start) / REPEATS
+    stored = sum(len(c) for c in compressed)
+    return {
+        "ratio": raw / stored,
+        "saved_pct": 100 * (1 - stored / raw),
+        "compress_MBps": raw / compress_time / 1e6,
+        "decompress_MBps": raw / decompress_time / 1e6,
+    }
+
+
+def benchmark_compression(texts: dict) -> list:
+    results = []
+    for label, text in texts.items():
+        n = CHUNK_CHARS[label]
+        granularities = {
+            "book": [text.encode("utf-8")],
+            "chunk": [text[i:i + n].encode("utf-8") for i in range(0, len(text), n)],
+        }
+        for granularity, pieces in granularities.items():
+            for name, (compress, decompress) in codecs().items():
+                print(f"Testing {label} | {granularity} | {name}")
+                results.append({ "text": label, "unit": granularity, "codec": name, **measure(compress, decompress, pieces) })
+    return results
+
+# ------ SCRIPT ENTRY ----------
+
+if __name__ == "__main__":
+    texts = {
+        "english": generate_text(TEXT_SIZE_MB),
+        "chinese": generate_cjk_text(TEXT_SIZE_MB),
+    }
+    results = benchmark_compression(texts)
+    print("\n===== SUMMARY =====")
+    for res in results:
+        print({ k: round(v, 2) if isinstance(v, float) else v for k, v in res.items() })
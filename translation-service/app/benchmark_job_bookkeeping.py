@@ -0,0 +1,115 @@
+import asyncio
+import os
+import time
+import redis.asyncio as redis
+
+from app.job_handler import (
+    get_chunk_task_context,
+    get_completed_chunks,
+    save_source_chunks,
+    update_translation_job_progress
+)
+
+# Needs a local Redis, e.g. `redis-server --port 6379`
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+CHUNK_COUNTS = [1000, 10000]
+CHUNK_TEXT = "译" * 1000
+JOB_ID = "benchmark-bookkeeping"
+# the legacy path is quadratic; it is timed on every LEGACY_SAMPLE_EVERY-th chunk and extrapolated
+LEGACY_SAMPLE_EVERY = 100
+
+# ------ LEGACY BOOKKEEPING ----------
+
+async def legacy_update_progress(server: redis.Redis, job_id: str, chunk_no: int, chunk: str, total: int) -> str:
+    """
+        Previous implementation, kept here as the baseline.
+        HKEYS over the whole chunk hash (counted before the HSET), then two more round trips.
+    """
+    completed_chunks = len(set(map(int, await server.hkeys(f"job:{job_id}:chunks"))))
+    progress = f"{completed_chunks}/{total}"
+    await server.hset(f"job:{job_id}:chunks", chunk_no, chunk)
+    await server.set(f"job:{job_id}:progress", progress)
+    return progress
+
+
+async def legacy_process_chunk(server: redis.Redis, job_id: str, chunk_no: int, total: int) -> None:
+    # per-task reads and the finalization check (HKEYS again) of the previous worker loop
+    await server.hget(f"job:{job_id}:source", chunk_no)
+    await server.get(f"job:{job_id}:status")
+    await server.hgetall(f"job:{job_id}:meta")
+    await server.get(f"job:{job_id}:total_chunks")
+    await server.hget(f"job:{job_id}:source_tokens", chunk_no)
+    await legacy_update_progress(server, job_id, chunk_no, CHUNK_TEXT, total)
+    await server.get(f"job:{job_id}:total_chunks")
+    set(range(total)) - set(map(int, await server.hkeys(f"job:{job_id}:chunks")))
+
+
+async def new_process_chunk(server: redis.Redis, job_id: str, chunk_no: int, total: int) -> None:
+    await get_chunk_task_context(server, job_id, chunk_no)
+    await update_translation_job_progress(server, job_id, chunk_no, CHUNK_TEXT, total)
+    await get_completed_chunks(server, job_id)
+
+# ------ BENCHMARK RUNNER ----------
+
+async def reset_job(server: redis.Redis, total: int) -> None:
+    await server.delete(*[f"job:{JOB_ID}:{k}" for k in ("chunks", "progress", "events", "events:seq")])
+    await server.set(f"job:{JOB_ID}:total_chunks", total)
+    await server.set(f"job:{JOB_ID}:status", "running")
+    await server.hset(f"job:{JOB_ID}:meta", mapping={ "language": "chinese", "email": "bench@example.com" })
+
+
+async def run_job(server: redis.Redis, process_chunk, total: int) -> float:
+    await reset_job(server, total)
+    start = time.perf_counter()
+    for i in range(total):
+        await process_chunk(server, JOB_ID, i, total)
+    return time.perf_counter() - start
+
+
+async def run_job_sampled(server: redis.Redis, process_chunk, total: int) -> float:
+    """
+        Times one chunk completion out of every LEGACY_SAMPLE_EVERY, with the chunk hash filled
+        to the size it has at that point of the job, and extrapolates to the whole job.
+    """
+    await reset_job(server, total)
+    elapsed = 0.0
+    for i in range(0, total, LEGACY_SAMPLE_EVERY):
+        start = time.perf_counter()
+        await process_chunk(server, JOB_ID, i, total)
+        elapsed += time.perf_counter() - start
+        # fill up to the next sample point untimed
+        fill = { j: CHUNK_TEXT for j in range(i + 1, min(i + LEGACY_SAMPLE_EVERY, total)) }
+        if fill:
+            await server.hset(f"job:{JOB_ID}:chunks", mapping=fill)
+    return elapsed * LEGACY_SAMPLE_EVERY
+
+
+async def benchmark_job_bookkeeping() -> list:
+    server = redis.Redis(host="localhost", port=REDIS_PORT, decode_responses=True)
+    results = []
+    for total in CHUNK_COUNTS:
+        print(f"Testing job with {total} chunks")
+        await save_source_chunks(server, JOB_ID, ["source"] * total, [10] * total)
+        legacy = await run_job_sampled(server, legacy_process_chunk, total)
+        new = await run_job(server, new_process_chunk, total)
+        results.append({
+            "chunks": total,
+            "legacy_time_est": legacy,
+            "new_time": new,
+            "legacy_us_per_chunk": legacy / total * 1e6,
+            "new_us_per_chunk": new / total * 1e6,
+            "speedup": legacy / new,
+        })
+    await server.delete(*[f"job:{JOB_ID}:{k}" for k in (
+        "chunks", "progress", "events", "events:seq", "source", "source_tokens", "total_chunks", "status", "meta"
+    )])
+    await server.aclose()
+    return results
+
+# ------ SCRIPT ENTRY ----------
+
+if __name__ == "__main__":
+    results = asyncio.run(benchmark_job_bookkeeping())
+    print("\n===== SUMMARY =====")
+    for res in results:
+        print(res)
@@ -0,0 +1,151 @@
+import asyncio
+import random
+import socket
+import threading
+import time
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# Local OpenAI-compatible /v1/chat/completions for offline benchmarks: `python -m app.benchmark_mock_llm`
+# Latency follows the fitted model of app/chunk_tuner.py (overhead + per output token), scaled by time_scale.
+MOCK_OVERHEAD = 3.4
+MOCK_SECONDS_PER_TOKEN = 0.0037
+# rough tokens per character of English text, the mock doesn't load the tokenizer
+CHARS_PER_TOKEN = 4
+MOCK_PORT = 8900
+
+
+class MockLLMConfig:
+    """
+        Behaviour of the mock server: latency = (overhead + per_token * output tokens) * time_scale,
+        +/- jitter (a fraction of it), and a throttle_rate share of requests answered 429 with retry_after seconds.
+    """
+    def __init__(
+        self,
+        overhead: float = MOCK_OVERHEAD,
+        per_token: float = MOCK_SECONDS_PER_TOKEN,
+        time_scale: float = 1.0,
+        jitter: float = 0.1,
+        throttle_rate: float = 0.0,
+        retry_after: float = 1.0,
+        output_ratio: float = 1.0,
+        seed: int = 42
+    ):
+        self.overhead = overhead
+        self.per_token = per_token
+        self.time_scale = time_scale
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.output_ratio = output_ratio
+        self.seed = seed
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def create_mock_app(config: MockLLMConfig) -> FastAPI:
+    """
+        Builds the mock app. Translation prompts are answered with the text itself,
+        book-info prompts with a fixed [title, author, title, author] list.
+        GET /stats returns the request counters.
+    """
+    app = FastAPI()
+    rng = random.Random(config.seed)
+    stats = { "requests": 0, "throttled": 0, "output_tokens": 0 }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        if rng.random() < config.throttle_rate:
+            stats["throttled"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={ "error": { "message": "Rate limit exceeded (mock)", "type": "rate_limit_error" } },
+                headers={ "retry-after": str(config.retry_after * config.time_scale) }
+            )
+
+        prompt = body["messages"][-1]["content"]
+        text = prompt.split("Text: ", 1)[-1]
+        if prompt.startswith("Read the text"):
+            answer = "[Mock Title, Mock Author, 模拟书名, 模拟作者]"
+        else:
+            answer = text
+        output_tokens = int(len(answer) / CHARS_PER_TOKEN * config.output_ratio)
+        latency = (config.overhead + config.per_token * output_tokens) * config.time_scale
+        await asyncio.sleep(max(latency * (1 + config.jitter * rng.uniform(-1, 1)), 0))
+        stats["output_tokens"] += output_tokens
+
+        return {
+            "id": f"mock-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": { "role": "assistant", "content": answer },
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": len(prompt) // CHARS_PER_TOKEN,
+                "completion_tokens": output_tokens,
+                "total_tokens": len(prompt) // CHARS_PER_TOKEN + output_tokens
+            }
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    app.state.stats = stats
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class MockLLMServer:
+    """
+        Runs the mock app with uvicorn in a background thread, for use as a context manager:
+            with MockLLMServer(MockLLMConfig(time_scale=0.01)) as mock:
+                ... base_url=mock.base_url ...
+    """
+    def __init__(self, config: MockLLMConfig, port: int | None = None):
+        self.config = config
+        self.port = port or free_port()
+        self.app = create_mock_app(config)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    @property
+    def stats(self) -> dict:
+        return dict(self.app.state.stats)
+
+    def reset_stats(self) -> None:
+        for k in self.app.state.stats:
+            self.app.state.stats[k] = 0
+
+    def __enter__(self) -> "MockLLMServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join()
+
+# ------ SCRIPT ENTRY ----------
+
+if __name__ == "__main__":
+    # point SEALION_API_URL at http://127.0.0.1:8900/v1 to run the service against it
+    uvicorn.run(create_mock_app(MockLLMConfig()), host="127.0.0.1", port=MOCK_PORT)
@@ -0,0 +1,93 @@
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+import redis.asyncio as redis
+
+from app.rate_limiter import RateLimiter, RedisRateLimiter
+
+# Needs a local Redis, e.g. `redis-server --port 6379`
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+PROCESSES = 4
+COROUTINES_PER_PROCESS = 8
+MAX_CALLS = 10
+REFILL_RATE = 5  # seconds, shortened from 60 so a run takes seconds
+DURATION = 20
+KEY = "ratelimit:benchmark"
+
+# ------ PER-PROCESS LOAD ----------
+
+async def hammer(distributed: bool) -> list[float]:
+    server = redis.Redis(host="localhost", port=REDIS_PORT, decode_responses=True)
+    if distributed:
+        rl = RedisRateLimiter(server, MAX_CALLS, REFILL_RATE, key=KEY)
+    else:
+        rl = RateLimiter(MAX_CALLS, REFILL_RATE)
+    stamps = []
+    deadline = time.time() + DURATION
+
+    async def caller():
+        while True:
+            await rl.acquire()
+            now = time.time()
+            if now >= deadline:
+                return
+            stamps.append(now)
+
+    try:
+        await asyncio.wait_for(
+            asyncio.gather(*[caller() for _ in range(COROUTINES_PER_PROCESS)]),
+            DURATION + REFILL_RATE
+        )
+    except asyncio.TimeoutError:
+        pass
+    await server.aclose()
+    return stamps
+
+
+def run_process(distributed: bool, out) -> None:
+    out.put(asyncio.run(hammer(distributed)))
+
+# ------ BENCHMARK RUNNER ----------
+
+def max_calls_in_window(stamps: list[float], window: float) -> int:
+    stamps = sorted(stamps)
+    best, lo = 0, 0
+    for hi, t in enumerate(stamps):
+        while stamps[lo] <= t - window:
+            lo += 1
+        best = max(best, hi - lo + 1)
+    return best
+
+
+def benchmark_rate_limiter(distributed: bool) -> dict:
+    out = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=run_process, args=(distributed, out)) for _ in range(PROCESSES)]
+    for p in procs:
+        p.start()
+    stamps = [t for _ in procs for t in out.get()]
+    for p in procs:
+        p.join()
+
+    # budget over the run: max_calls in each refill window
+    budget = MAX_CALLS * math.ceil(DURATION / REFILL_RATE)
+    return {
+        "limiter": "redis" if distributed else "in-process",
+        "processes": PROCESSES,
+        "total_calls": len(stamps),
+        "budget": budget,
+        "max_calls_per_window": max_calls_in_window(stamps, REFILL_RATE),
+        "calls_per_sec": len(stamps) / DURATION,
+    }
+
+# ------ SCRIPT ENTRY ----------
+
+if __name__ == "__main__":
+    results = []
+    for distributed in (False, True):
+        print(f"Testing {'redis' if distributed else 'in-process'} limiter with {PROCESSES} processes")
+        results.append(benchmark_rate_limiter(distributed))
+    print("\n===== SUMMARY =====")
+    for res in results:
+        print(res)
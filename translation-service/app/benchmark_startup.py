@@ -0,0 +1,67 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Each scenario runs in a fresh interpreter so import caches don't leak between runs
+SERVICE_ROOT = Path(__file__).parent.parent
+RUNS = 5
+
+SCENARIOS = {
+    "import app.main": "import app.main",
+    "import app.main + preload tokenizer": (
+        "import app.main\n"
+        "from app.token_counter import preload_tokenizer\n"
+        "preload_tokenizer()"
+    ),
+}
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = [m for m in ("transformers", "torch") if m in sys.modules]
+print(json.dumps({{"time": elapsed, "max_rss_mb": rss_kb / 1024, "heavy_modules": heavy}}))
+"""
+
+# ------ BENCHMARK RUNNER ----------
+
+def run_probe(code: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE.format(code=code)],
+        cwd=SERVICE_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def benchmark_startup(scenarios: dict, runs: int) -> list:
+    results = []
+    for name, code in scenarios.items():
+        print(f"Testing: {name}")
+        samples = [run_probe(code) for _ in range(runs)]
+        times = [s["time"] for s in samples]
+        rss = [s["max_rss_mb"] for s in samples]
+        results.append({
+            "scenario": name,
+            "runs": runs,
+            "avg_time": sum(times) / runs,
+            "min_time": min(times),
+            "max_time": max(times),
+            "avg_max_rss_mb": sum(rss) / runs,
+            "heavy_modules": samples[-1]["heavy_modules"],
+        })
+        print(f"Done | avg: {results[-1]['avg_time']:.3f}s, rss: {results[-1]['avg_max_rss_mb']:.1f}MB")
+    return results
+
+# ------ SCRIPT ENTRY ----------
+
+if __name__ == "__main__":
+    results = benchmark_startup(SCENARIOS, RUNS)
+    print("\n===== SUMMARY =====")
+    for res in results:
+        print(res)
@@ -0,0 +1,416 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import redis.asyncio as redis
+
+from app.benchmark_book_cache import benchmark_book_cache
+from app.benchmark_chunking import generate_text, run_chunker
+from app.benchmark_mock_llm import MockLLMConfig, MockLLMServer
+import app.book_translation as book_translation
+from app.book_translation import (
+    chunk_by_tokens,
+    chunk_with_token_counts,
+    start_translation_workers,
+    stop_translation_workers,
+    translate_service
+)
+from app.chunk_cache import get_cached_translation, set_cached_translation
+from app.file_management import BookInfo
+from app.job_handler import (
+    JOB_END_STATES,
+    ack_chunk_task,
+    dequeue_chunk_task,
+    enqueue_chunk_tasks,
+    get_chunk_task_context,
+    get_completed_chunks,
+    get_job_state,
+    save_source_chunks,
+    update_translation_job_progress
+)
+from app.llm_client import close_llm_client
+from app.llm_router import LLMBackend, LLMRouter
+from app.rate_limiter import RedisRateLimiter
+
+# Offline benchmark suite: generated corpora, a local mock LLM server and fakeredis (or a throwaway local Redis).
+# fakeredis and lupa, which runs its Lua scripts, come with `pip install -r requirements-dev.txt`;
+# without them and without --redis-port, only the scenarios that need no Redis are run.
+#   python -m app.benchmark_suite --out results.json
+#   python -m app.benchmark_suite --redis-port 6379 --compare baseline.json
+# The Redis database BENCHMARK_REDIS_DB is flushed between scenarios, never point it at live data.
+BENCHMARK_REDIS_DB = 15
+SCENARIOS = ["chunking", "end_to_end", "small_books", "bookkeeping", "disk_cache"]
+REDIS_SCENARIOS = ["end_to_end", "small_books", "bookkeeping", "disk_cache"]
+CORPUS_SIZES_MB = [0.1, 0.5, 2]
+E2E_SIZES_MB = [0.05, 0.2]
+MAX_TOKENS_LIST = [2000, 8000]
+E2E_MAX_TOKENS = 2000
+E2E_WORKERS = 10
+E2E_RATE_LIMIT = (600, 60)
+# mock latencies are this fraction of the fitted real ones, so a run takes seconds
+TIME_SCALE = 0.01
+THROTTLE_RATE = 0.05
+# books of a few hundred tokens submitted at once, translated with and without packing small chunks
+SMALL_BOOKS = 40
+SMALL_BOOK_MB = 0.001
+BOOKKEEPING_CHUNKS = [1000, 5000]
+BOOK_CACHE_SIZES = [1000]
+CHUNK_CACHE_ENTRIES = 2000
+# a metric differing from the baseline by more than this is flagged by --compare
+REGRESSION_THRESHOLD = 0.1
+
+# ------ REDIS ----------
+
+def connect_redis(port: int | None) -> redis.Redis | None:
+    """
+        A local Redis when a port is given, otherwise fakeredis with Lua support, or None if it isn't installed.
+    """
+    if port:
+        return redis.Redis(host="localhost", port=port, db=BENCHMARK_REDIS_DB, decode_responses=True)
+    try:
+        import fakeredis
+        import lupa  # runs the Lua scripts in fakeredis
+    except ImportError:
+        return None
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+# ------ SCENARIOS ----------
+
+async def scenario_chunking(corpora: dict, server: redis.Redis, mock: MockLLMServer) -> list:
+    results = []
+    for label, text in corpora.items():
+        for max_tokens in MAX_TOKENS_LIST:
+            res = run_chunker(chunk_by_tokens, text, max_tokens)
+            results.append({
+                "corpus": label,
+                "max_tokens": max_tokens,
+                "time": res["time"],
+                "num_chunks": res["num_chunks"],
+                "oversized_chunks": res["oversized_chunks"],
+                "MBps": len(text.encode("utf-8")) / res["time"] / 1e6 if res["time"] else None,
+            })
+    return results
+
+
+async def run_translation_job(
+    server: redis.Redis,
+    router: LLMRouter,
+    job_id: str,
+    text: str,
+    timeout: float = 600
+) -> dict:
+    """
+        Queues text through translate_service and waits for the workers to finish it.
+    """
+    chunks, token_counts = chunk_with_token_counts(text, E2E_MAX_TOKENS)
+    book_info = BookInfo()
+    book_info.set_book_info([f"Benchmark {job_id}", "Suite", "基准", "套件"])
+
+    workers = start_translation_workers(E2E_WORKERS, router, server)
+    start = time.perf_counter()
+    try:
+        await translate_service(
+            job_id, f"{job_id}@benchmark", "chinese", book_info, chunks, server, token_counts, E2E_MAX_TOKENS
+        )
+        state = await get_job_state(server, job_id)
+        while state not in JOB_END_STATES and time.perf_counter() - start < timeout:
+            await asyncio.sleep(0.05)
+            state = await get_job_state(server, job_id)
+        elapsed = time.perf_counter() - start
+    finally:
+        await stop_translation_workers(workers)
+    return {
+        "state": state,
+        "num_chunks": len(chunks),
+        "tokens": sum(token_counts),
+        "time": elapsed,
+        "chunks_per_s": len(chunks) / elapsed,
+        "tokens_per_s": sum(token_counts) / elapsed,
+    }
+
+
+async def scenario_end_to_end(corpora: dict, server: redis.Redis, mock: MockLLMServer) -> list:
+    """
+        translate_service, the queue workers, routing, rate limiting and finalization against the mock LLM.
+        Each corpus runs cold (empty chunk cache), then again warm under another job id.
+    """
+    results = []
+    max_calls, refill_rate = E2E_RATE_LIMIT
+    for label, text in corpora.items():
+        await server.flushdb()
+        router = LLMRouter([LLMBackend(
+            "mock",
+            "mock-model",
+            RedisRateLimiter(server, max_calls, refill_rate, key="ratelimit:benchmark", max_concurrency=E2E_WORKERS),
+            base_url=mock.base_url,
+            api_key="mock"
+        )])
+        for run in ("cold", "warm"):
+            mock.reset_stats()
+            # finalization writes the book to the local cache folder
+            with tempfile.TemporaryDirectory() as folder, contextlib.chdir(folder), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                res = await run_translation_job(server, router, f"{label}-{run}", text)
+            stats = mock.stats
+            results.append({
+                "corpus": label,
+                "run": run,
+                **res,
+                "llm_requests": stats["requests"],
+                "throttled": stats["throttled"],
+            })
+            print(f"Done {label} | {run}: {res['time']:.2f}s, {stats['requests']} requests")
+    return results
+
+
+async def scenario_small_books(corpora: dict, server: redis.Redis, mock: MockLLMServer) -> list:
+    """
+        SMALL_BOOKS small books queued at once through translate_service, with each chunk in a request of its own
+        and then packed several per request (see book_translation.process_packed_tasks), cold both times.
+    """
+    results = []
+    max_calls, refill_rate = E2E_RATE_LIMIT
+    books = [generate_text(SMALL_BOOK_MB, seed=i) for i in range(SMALL_BOOKS)]
+    pack_chunk_tokens = book_translation.PACK_CHUNK_TOKENS or 500
+    for packing in (False, True):
+        await server.flushdb()
+        book_translation.PACK_CHUNK_TOKENS = pack_chunk_tokens if packing else 0
+        router = LLMRouter([LLMBackend(
+            "mock",
+            "mock-model",
+            RedisRateLimiter(server, max_calls, refill_rate, key="ratelimit:benchmark", max_concurrency=E2E_WORKERS),
+            base_url=mock.base_url,
+            api_key="mock"
+        )])
+        mock.reset_stats()
+        workers = start_translation_workers(E2E_WORKERS, router, server)
+        start = time.perf_counter()
+        try:
+            with tempfile.TemporaryDirectory() as folder, contextlib.chdir(folder), \
+                    contextlib.redirect_stdout(io.StringIO()):
+                job_ids = []
+                for i, text in enumerate(books):
+                    chunks, token_counts = chunk_with_token_counts(text, E2E_MAX_TOKENS)
+                    book_info = BookInfo()
+                    book_info.set_book_info([f"Small {i}", "Suite", "小书", "套件"])
+                    job_id = f"small-{i}"
+                    await translate_service(
+                        job_id, f"{job_id}@benchmark", "chinese", book_info, chunks, server, token_counts, E2E_MAX_TOKENS
+                    )
+                    job_ids.append(job_id)
+                states = [await get_job_state(server, j) for j in job_ids]
+                while any(s not in JOB_END_STATES for s in states) and time.perf_counter() - start < 600:
+                    await asyncio.sleep(0.05)
+                    states = [await get_job_state(server, j) for j in job_ids]
+                elapsed = time.perf_counter() - start
+        finally:
+            await stop_translation_workers(workers)
+            book_translation.PACK_CHUNK_TOKENS = pack_chunk_tokens
+        stats = mock.stats
+        results.append({
+            "packing": packing,
+            "books": SMALL_BOOKS,
+            "finished": states.count("finished"),
+            "time": elapsed,
+            "llm_requests": stats["requests"],
+            "throttled": stats["throttled"],
+        })
+        print(f"Done packing={packing}: {elapsed:.2f}s, {stats['requests']} requests")
+    return results
+
+
+async def scenario_bookkeeping(corpora: dict, server: redis.Redis, mock: MockLLMServer) -> list:
+    """
+        Redis side of every chunk: enqueue, dequeue, task context, progress update, ack and completion check.
+    """
+    results = []
+    text = "译" * 1000
+    for total in BOOKKEEPING_CHUNKS:
+        await server.flushdb()
+        job_id = f"bookkeeping-{total}"
+        await save_source_chunks(server, job_id, ["source"] * total, [10] * total)
+        await server.set(f"job:{job_id}:total_chunks", total)
+        await server.set(f"job:{job_id}:status", "running")
+        await server.hset(f"job:{job_id}:meta", mapping={ "language": "chinese", "email": "bench@example.com" })
+
+        start = time.perf_counter()
+        await enqueue_chunk_tasks(server, job_id, list(range(total)))
+        enqueue_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(total):
+            _, chunk_no = await dequeue_chunk_task(server, "benchmark", timeout=0)
+            await get_chunk_task_context(server, job_id, chunk_no)
+            await update_translation_job_progress(server, job_id, chunk_no, text, total)
+            await ack_chunk_task(server, "benchmark", job_id, chunk_no)
+            await get_completed_chunks(server, job_id)
+        chunk_time = time.perf_counter() - start
+        results.append({
+            "chunks": total,
+            "enqueue_time": enqueue_time,
+            "chunk_time": chunk_time,
+            "us_per_chunk": chunk_time / total * 1e6,
+        })
+    return results
+
+
+async def scenario_disk_cache(corpora: dict, server: redis.Redis, mock: MockLLMServer) -> list:
+    """
+        Translated book cache (SQLite index, see benchmark_book_cache) and the chunk cache with its disk tier.
+    """
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for num_books in BOOK_CACHE_SIZES:
+            results.append({ "cache": "book", **benchmark_book_cache(num_books) })
+
+    await server.flushdb()
+    translation = "译" * 1000
+    keys = [f"{i:064x}" for i in range(CHUNK_CACHE_ENTRIES)]
+    with tempfile.TemporaryDirectory() as folder:
+        start = time.perf_counter()
+        for k in keys:
+            await set_cached_translation(server, k, translation, folder)
+        write_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for k in keys:
+            await get_cached_translation(server, k, folder)
+        redis_read_time = time.perf_counter() - start
+        await server.flushdb()
+        start = time.perf_counter()
+        for k in keys:
+            await get_cached_translation(server, k, folder)
+        disk_read_time = time.perf_counter() - start
+    results.append({
+        "cache": "chunk",
+        "entries": CHUNK_CACHE_ENTRIES,
+        "write_us": write_time / CHUNK_CACHE_ENTRIES * 1e6,
+        "redis_read_us": redis_read_time / CHUNK_CACHE_ENTRIES * 1e6,
+        "disk_read_us": disk_read_time / CHUNK_CACHE_ENTRIES * 1e6,
+    })
+    return results
+
+# ------ RESULTS ----------
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def row_key(row: dict) -> str:
+    """
+        Identifies a result row across runs by its non-numeric fields and its sizes.
+    """
+    ids = ("corpus", "run", "packing", "cache", "max_tokens", "chunks", "books", "entries")
+    return "|".join(f"{k}={row[k]}" for k in ids if k in row)
+
+
+def compare_results(baseline: dict, current: dict) -> list:
+    """
+        Returns (scenario, row, metric, baseline, current, ratio) for every shared numeric metric
+        that moved by more than REGRESSION_THRESHOLD.
+    """
+    changes = []
+    for scenario, rows in current["results"].items():
+        old_rows = { row_key(r): r for r in baseline.get("results", {}).get(scenario, []) }
+        for row in rows:
+            old = old_rows.get(row_key(row))
+            if old is None:
+                continue
+            for metric, value in row.items():
+                prev = old.get(metric)
+                if isinstance(value, bool) or not isinstance(value, (int, float)) or not isinstance(prev, (int, float)) or not prev:
+                    continue
+                ratio = value / prev
+                if abs(ratio - 1) > REGRESSION_THRESHOLD:
+                    changes.append((scenario, row_key(row), metric, prev, value, ratio))
+    return changes
+
+# ------ BENCHMARK RUNNER ----------
+
+async def run_suite(scenarios: list, redis_port: int | None, mock_config: MockLLMConfig) -> dict:
+    runners = {
+        "chunking": (scenario_chunking, CORPUS_SIZES_MB),
+        "end_to_end": (scenario_end_to_end, E2E_SIZES_MB),
+        "small_books": (scenario_small_books, []),
+        "bookkeeping": (scenario_bookkeeping, []),
+        "disk_cache": (scenario_disk_cache, []),
+    }
+    server = connect_redis(redis_port)
+    skipped = []
+    if server is None:
+        skipped = [name for name in scenarios if name in REDIS_SCENARIOS]
+        scenarios = [name for name in scenarios if name not in REDIS_SCENARIOS]
+        if skipped:
+            print(f"Skipping {', '.join(skipped)}: fakeredis[lua] is not installed (pip install -r requirements-dev.txt), or pass --redis-port")
+    results = {}
+    try:
+        with MockLLMServer(mock_config) as mock:
+            for name in scenarios:
+                runner, sizes = runners[name]
+                corpora = { f"generated_{mb}MB": generate_text(mb) for mb in sizes }
+                print(f"Testing {name}")
+                results[name] = await runner(corpora, server, mock)
+        if server is not None:
+            await server.flushdb()
+    finally:
+        if server is not None:
+            await server.aclose()
+        await close_llm_client()
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "redis": f"localhost:{redis_port}/{BENCHMARK_REDIS_DB}" if redis_port else ("fakeredis" if server else None),
+            "mock_llm": mock_config.to_dict(),
+            "skipped": skipped,
+        },
+        "results": results,
+    }
+
+# ------ SCRIPT ENTRY ----------
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmark suite of the translation pipeline")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--redis-port", type=int, default=None, help="throwaway local Redis instead of fakeredis")
+    parser.add_argument("--time-scale", type=float, default=TIME_SCALE)
+    parser.add_argument("--throttle-rate", type=float, default=THROTTLE_RATE)
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="baseline JSON of a previous run")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_suite(
+        args.scenarios,
+        args.redis_port,
+        MockLLMConfig(time_scale=args.time_scale, throttle_rate=args.throttle_rate)
+    ))
+    Path(args.out).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    print("\n===== SUMMARY =====")
+    for name, rows in report["results"].items():
+        for res in rows:
+            print(name, { k: round(v, 4) if isinstance(v, float) else v for k, v in res.items() })
+    print(f"Results written to {args.out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(f"\n===== CHANGES vs {baseline['meta'].get('commit')} (>{REGRESSION_THRESHOLD:.0%}) =====")
+        for scenario, key, metric, prev, value, ratio in compare_results(baseline, report):
+            print(f"{scenario} {key} {metric}: {prev:.4g} -> {value:.4g} (x{ratio:.2f})")
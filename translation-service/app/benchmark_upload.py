@@ -0,0 +1,102 @@
+import codecs
+import json
+import time
+import tracemalloc
+from typing import Iterator
+
+from app.benchmark_chunking import generate_text
+from app.book_translation import StreamingChunker, chunk_with_token_counts, estimate_text_tokens, estimate_upload_tokens
+from app.job_handler import BookFingerprinter, create_book_fingerprint
+from app.schema import TranslateRequest
+
+# Peak Python memory of the upload path before Redis: JSON body (/translate_book) vs streamed body (/translate_book_stream).
+# Both fingerprint, estimate the size and chunk the book; streamed chunks are dropped where the endpoint stages them.
+#   python -m app.benchmark_upload
+TEXT_SIZES_MB = [1, 4, 10]
+MAX_TOKENS = 2000
+# about what the ASGI server hands over per receive
+PIECE_BYTES = 64 * 1024
+SAMPLE_BYTES = 64 * 1024
+
+# ------ UPLOAD PATHS ----------
+
+def json_upload(body: bytes) -> int:
+    req = TranslateRequest(**json.loads(body))
+    create_book_fingerprint(req.book, req.language)
+    estimate_text_tokens(req.book)
+    chunks, _ = chunk_with_token_counts(req.book, MAX_TOKENS)
+    return len(chunks)
+
+
+def streamed_upload(pieces: Iterator[bytes], total_bytes: int) -> int:
+    pieces = iter(pieces)
+    head = next(pieces)
+    estimate_upload_tokens(head[:SAMPLE_BYTES], total_bytes)
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    fingerprinter = BookFingerprinter("chinese")
+    chunker = StreamingChunker(MAX_TOKENS)
+    staged = 0
+    for piece in with_end(head, pieces):
+        text = decoder.decode(piece or b"", final=piece is None)
+        fingerprinter.update(text)
+        chunks = chunker.feed(text)
+        if piece is None:
+            chunks += chunker.close()
+        staged += len(chunks)
+    fingerprinter.hexdigest()
+    return staged
+
+
+def with_end(head: bytes, pieces: Iterator[bytes]) -> Iterator[bytes | None]:
+    # the pieces of the body, then None at its end, like the endpoint's loop
+    yield head
+    yield from pieces
+    yield None
+
+# ------ BENCHMARK RUNNER ----------
+
+def measure(fn, *args) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    n = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return { "chunks": n, "time": elapsed, "peak_mb": peak / 1024 / 1024 }
+
+
+def benchmark_upload(sizes_mb: list) -> list:
+    results = []
+    for mb in sizes_mb:
+        print(f"Testing {mb}MB book")
+        text = generate_text(mb)
+        data = text.encode("utf-8")
+        body = json.dumps({ "book": text, "language": "chinese", "email": "bench@example.com" }).encode("utf-8")
+        del text
+
+        # the server holds the whole JSON body before parsing it, so it is built inside the measurement
+        as_json = measure(lambda: json_upload(bytes(body)))
+        # the streamed body only ever exists piece by piece
+        streamed = measure(
+            streamed_upload,
+            (data[i:i + PIECE_BYTES] for i in range(0, len(data), PIECE_BYTES)),
+            len(data)
+        )
+        results.append({
+            "size_mb": mb,
+            "json_peak_mb": round(as_json["peak_mb"], 1),
+            "stream_peak_mb": round(streamed["peak_mb"], 1),
+            "json_time": round(as_json["time"], 2),
+            "stream_time": round(streamed["time"], 2),
+            "same_chunk_count": as_json["chunks"] == streamed["chunks"],
+        })
+        print(f"Done | json: {as_json['peak_mb']:.1f}MB peak, stream: {streamed['peak_mb']:.1f}MB peak")
+    return results
+
+# ------ SCRIPT ENTRY ----------
+
+if __name__ == "__main__":
+    results = benchmark_upload(TEXT_SIZES_MB)
+    print("\n===== SUMMARY =====")
+    for res in results:
+        print(res)
@@ -1,166 +1,652 @@
 import asyncio
+import bisect
+import json
+import openai
 import os
 import re
 import redis.asyncio as redis
+import socket
+import time
 import types
+from contextlib import AsyncExitStack
 from dotenv import load_dotenv
-from openai import OpenAI
-from transformers import AutoTokenizer
-from typing import Tuple
+from typing import AsyncIterator, Iterable, Iterator, Tuple
 
+from app.chunk_cache import chunk_cache_key, get_cached_translation, set_cached_translation
 from app.file_management import (
+    BookFileWriter,
     BookInfo,
-    read_file_in_local_storage,
-    write_file_to_local_storage
+    list_local_languages,
+    read_file_in_local_storage
 )
 from app.job_handler import (
+    acquire_lease,
+    ack_chunk_task,
+    adopt_upload_chunks,
+    append_job_result,
     cancel_translation_job,
+    chunk_lease_key,
+    CHUNK_LEASE_TTL,
+    claim_job_finalization,
+    commit_job_result,
     complete_translation_job,
+    dequeue_chunk_task,
+    dequeue_packable_chunk_tasks,
+    drain_legacy_queue,
+    drop_duplicate_chunk_task,
+    enqueue_chunk_tasks,
+    fail_translation_job,
     fetch_saved_chunks,
+    iter_saved_chunk_batches,
+    get_book_fingerprint,
+    get_cached_book_info,
+    get_chunk_task_context,
+    get_completed_chunks,
+    get_job_meta,
+    get_job_result,
+    get_job_state,
     get_last_user_job,
+    get_lost_chunk_tasks,
+    get_running_jobs,
     get_todo_job_chunks,
+    get_translated_prefix,
+    get_translated_languages,
+    hold_lease,
+    JobCompletion,
+    JobStart,
+    JOB_END_STATES,
+    read_job_events,
+    reclaim_dead_worker_tasks,
+    record_chunk_failure,
+    refresh_worker_heartbeat,
+    register_translated_language,
+    release_lease,
+    requeue_chunk_task,
+    save_cached_book_info,
+    save_source_chunks,
     start_translation_job,
-    update_translation_job_progress
+    update_translation_job_progress,
+    WORKER_HEARTBEAT_TTL
 )
-from app.rate_limiter import RateLimiter
+from app.hedging import hedged_call
+from app.llm_client import get_llm_client
+from app.llm_router import DEFAULT_EXTRA_BODY, LLMBackend, LLMRouter, ROLE_BOOK_INFO, ROLE_TRANSLATE
+from app.metrics import (
+    BOOK_INFO_SECONDS,
+    CHUNK_FAILURES,
+    CHUNK_RETRIES,
+    CHUNKING_SECONDS,
+    DEDUPLICATED_WORK,
+    JOB_FAILURES,
+    LLM_REQUESTS,
+    PACKED_CHUNKS,
+    PACKED_REQUESTS,
+    RECOVERED_TASKS,
+    TRANSLATE_CHUNK_SECONDS,
+    timed
+)
+from app.token_counter import token_counter
+from app.tracing import record_span, span
 
 load_dotenv()
 
-SEALION_API_KEY = os.getenv("SEALION_API_KEY")
-SEALION_API_URL = os.getenv("SEALION_API_URL")
 API_RATE_LIMIT = 10
 refill_rate = 60
 MAX_TOKENS = 2000
+TRANSLATION_MODEL = "aisingapore/Llama-SEA-LION-v3.5-70B-R"
+# bump whenever the translation prompt changes, so cached chunk translations are not reused
+TRANSLATE_PROMPT_VERSION = "1"
+MAX_CHUNK_ROUNDS = 10
+# backoff of a failed chunk before it is ready again: base * 2^(round - 1), capped
+CHUNK_RETRY_BASE_DELAY = float(os.getenv("CHUNK_RETRY_BASE_DELAY", 7))
+CHUNK_RETRY_MAX_DELAY = float(os.getenv("CHUNK_RETRY_MAX_DELAY", 300))
+MAX_RATE_LIMIT_RETRIES = 5
+PROMPT_OVERHEAD_TOKENS = 64
+OUTPUT_TOKEN_RATIO = float(os.getenv("OUTPUT_TOKEN_RATIO", 1.5))
+# chunks of at most PACK_CHUNK_TOKENS (short books, trailing remainders) are packed, up to PACK_MAX_CHUNKS of them
+# and PACK_TOKEN_BUDGET source tokens, into one request; 0 disables packing
+PACK_CHUNK_TOKENS = int(os.getenv("PACK_CHUNK_TOKENS", 500))
+PACK_TOKEN_BUDGET = int(os.getenv("PACK_TOKEN_BUDGET", MAX_TOKENS))
+PACK_MAX_CHUNKS = int(os.getenv("PACK_MAX_CHUNKS", 8))
+# marker tokens per packed chunk, in the prompt and in the answer
+PACK_SEGMENT_TOKENS = 16
+PACK_MARKER = "@@@ SEGMENT {} @@@"
+PACK_END = "@@@ END @@@"
+PACK_MARKER_LINE = re.compile(r"^[ \t]*@@@ (?:SEGMENT (\d+)|END) @@@[ \t]*$", re.MULTILINE)
+# a packed translation fails the split when its length ratio to the source is this many times off the whole pack's,
+# checked for chunks of at least PACK_RATIO_MIN_CHARS characters
+PACK_RATIO_SPREAD = 4
+PACK_RATIO_MIN_CHARS = 200
+# every process sweeps for jobs orphaned by crashed pods at startup and then every RECOVERY_INTERVAL seconds
+RECOVERY_INTERVAL = float(os.getenv("RECOVERY_INTERVAL", 60))
+RECOVERY_LEASE_TTL = 120
+# jobs started less than this many seconds ago may still be setting up their chunks, the sweep leaves them alone
+RECOVERY_GRACE = 120
+
+PARAGRAPH_SEPARATOR = "\n\n"
+SENTENCE_SEPARATOR = " "
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?。！？])\s+")
+TOKEN_SAMPLE_CHARS = 20000
+
+def count_tokens(text: str) -> int:
+    """
+        Returns the number of tokens in text, excluding special tokens added by the tokenizer.
+    """
+    return token_counter.count(text)
+
+
+def estimate_text_tokens(text: str, sample_chars: int = TOKEN_SAMPLE_CHARS) -> int:
+    """
+        Estimates the token count of a long text from the tokens per character of three samples
+        (start, middle, end), without tokenizing all of it.
+    """
+    if len(text) <= 3 * sample_chars:
+        return count_tokens(text)
+    middle = len(text) // 2 - sample_chars // 2
+    sample = text[:sample_chars] + text[middle:middle + sample_chars] + text[-sample_chars:]
+    return int(count_tokens(sample) * len(text) / len(sample))
+
+
+def estimate_upload_tokens(head: bytes, total_bytes: int | None) -> int:
+    """
+        Estimates the token count of an upload of total_bytes (None if unknown) from the tokens per byte of its first bytes.
+    """
+    tokens = count_tokens(head.decode("utf-8", errors="ignore"))
+    if not total_bytes or total_bytes <= len(head):
+        return tokens
+    return int(tokens * total_bytes / len(head))
+
+
+def split_sentences(paragraph: str) -> list[str]:
+    """
+        Splits a paragraph into sentences on terminal punctuation followed by whitespace.
+    """
+    return [s for s in SENTENCE_BOUNDARY.split(paragraph) if s]
+
+
+def split_by_token_window(text: str, max_tokens: int) -> list[str]:
+    """
+        Last-resort split for a single sentence longer than max_tokens.
+        Cuts the text where a window of max_tokens tokens starts, so no character is split
+        (decoding a window of byte-level tokens can end mid-character). A window whose text
+        re-tokenizes to more than max_tokens is narrowed.
+    """
+    starts = [start for start, _ in token_counter.offsets(text)]
+    pieces = []
+    pos = 0
+    i = 0
+    while i < len(starts):
+        j = min(i + max_tokens, len(starts))
+        while True:
+            end = starts[j] if j < len(starts) else len(text)
+            if end > pos and (j == i + 1 or count_tokens(text[pos:end]) <= max_tokens):
+                break
+            if end <= pos:
+                # the window ends inside the character it starts with: take that character whole
+                j = bisect.bisect_right(starts, pos)
+                end = starts[j] if j < len(starts) else len(text)
+                break
+            j -= 1
+        pieces.append(text[pos:end])
+        pos = end
+        i = bisect.bisect_left(starts, end)
+    if pos < len(text):
+        pieces.append(text[pos:])
+    return pieces
+
+
+def pack_units(
+    units: Iterable[Tuple[str, int]],
+    separator: str,
+    separator_tokens: int,
+    max_tokens: int
+) -> Iterator[Tuple[str, int]]:
+    """
+        Greedily packs pre-counted (text, token_count) units into chunks joined by separator.
+        Each unit is tokenized once by the caller, so packing is linear in the number of units.
+        Yields (chunk, token_count) pairs, where token_count is the running estimate for the chunk.
+    """
+    curr = []
+    curr_tokens = 0
+    for unit, unit_tokens in units:
+        extra = unit_tokens + (separator_tokens if curr else 0)
+        if curr and curr_tokens + extra > max_tokens:
+            yield separator.join(curr), curr_tokens
+            curr = [unit]
+            curr_tokens = unit_tokens
+        else:
+            curr.append(unit)
+            curr_tokens += extra
+
+    if curr:
+        yield separator.join(curr), curr_tokens
+
+
+def split_oversized_paragraph(paragraph: str, max_tokens: int) -> Iterator[Tuple[str, int]]:
+    """
+        Splits a paragraph that alone exceeds max_tokens into sentence-level pieces.
+        Sentences longer than max_tokens are further cut on token windows.
+    """
+    units = []
+    for sentence in split_sentences(paragraph):
+        sentence_tokens = count_tokens(sentence)
+        if sentence_tokens > max_tokens:
+            units.extend((piece, count_tokens(piece)) for piece in split_by_token_window(sentence, max_tokens))
+        else:
+            units.append((sentence, sentence_tokens))
+    yield from pack_units(units, SENTENCE_SEPARATOR, count_tokens(SENTENCE_SEPARATOR), max_tokens)
+
+
+def iter_paragraph_units(paragraphs: Iterable[str], max_tokens: int) -> Iterator[Tuple[str, int, bool]]:
+    """
+        Tokenizes each paragraph exactly once.
+        Yields (text, token_count, standalone) triples, where standalone pieces come from a
+        paragraph that had to be split and must not be merged with its neighbours.
+    """
+    for p in paragraphs:
+        if not p:
+            continue
+        p_tokens = count_tokens(p)
+        if p_tokens <= max_tokens:
+            yield p, p_tokens, False
+        else:
+            for piece, piece_tokens in split_oversized_paragraph(p, max_tokens):
+                yield piece, piece_tokens, True
+
+
+class ChunkPacker:
+    """
+        Packs paragraphs, added one at a time, into chunks of at most max_tokens.
+        Each paragraph is tokenized once and token counts are summed, allowing for the
+        separator tokens between paragraphs and the special tokens added on encode.
+        A (chunk, token_count) pair is yielded as soon as the next paragraph no longer fits,
+        so only the chunk being filled is held. The summed counts only decide where to cut:
+        tokens merge differently across the joins, so each finished chunk is counted again
+        and token_count is its real size.
+    """
+    def __init__(self, max_tokens: int = MAX_TOKENS):
+        self.budget = max(max_tokens - len(token_counter.encode("")), 1)
+        self.separator_tokens = count_tokens(PARAGRAPH_SEPARATOR)
+        self.curr = []
+        self.curr_tokens = 0
+
+    def add(self, paragraph: str) -> Iterator[Tuple[str, int]]:
+        for unit, unit_tokens, standalone in iter_paragraph_units((paragraph,), self.budget):
+            if standalone:
+                yield from self.flush()
+                yield unit, count_tokens(unit)
+                continue
+
+            extra = unit_tokens + (self.separator_tokens if self.curr else 0)
+            if self.curr and self.curr_tokens + extra > self.budget:
+                yield from self.flush()
+                self.curr = [unit]
+                self.curr_tokens = unit_tokens
+            else:
+                self.curr.append(unit)
+                self.curr_tokens += extra
+
+    def flush(self) -> Iterator[Tuple[str, int]]:
+        if self.curr:
+            chunk = PARAGRAPH_SEPARATOR.join(self.curr)
+            self.curr = []
+            self.curr_tokens = 0
+            yield chunk, count_tokens(chunk)
+
+
+def iter_chunks_with_tokens(
+    paragraphs: Iterable[str],
+    max_tokens: int = MAX_TOKENS
+) -> Iterator[Tuple[str, int]]:
+    """
+        Linear-time chunker over an iterable of paragraphs (see ChunkPacker).
+        Yields (chunk, token_count) pairs so callers can budget requests without re-tokenizing.
+    """
+    packer = ChunkPacker(max_tokens)
+    for p in paragraphs:
+        yield from packer.add(p)
+    yield from packer.flush()
+
+
+def iter_paragraphs(text: str) -> Iterator[str]:
+    """
+        Yields the same paragraphs as text.split(PARAGRAPH_SEPARATOR), without building the list.
+    """
+    start = 0
+    while (end := text.find(PARAGRAPH_SEPARATOR, start)) >= 0:
+        yield text[start:end]
+        start = end + len(PARAGRAPH_SEPARATOR)
+    yield text[start:]
+
+
+class StreamingChunker:
+    """
+        Chunks a book arriving in pieces, e.g. an upload body decoded as it is read from the socket.
+        Every complete paragraph goes straight to a ChunkPacker, so only the unfinished paragraph
+        and chunk are held, never the whole text.
+        feed() and close() return the chunks completed so far as (chunk, token_count) pairs;
+        together they yield the same chunks as chunk_with_token_counts on the whole text.
+    """
+    def __init__(self, max_tokens: int = MAX_TOKENS):
+        self.packer = ChunkPacker(max_tokens)
+        self.tail = ""
+
+    def feed(self, text: str) -> list[Tuple[str, int]]:
+        paragraphs = (self.tail + text).split(PARAGRAPH_SEPARATOR)
+        self.tail = paragraphs.pop()
+        return [c for p in paragraphs for c in self.packer.add(p)]
+
+    def close(self) -> list[Tuple[str, int]]:
+        last, self.tail = self.tail, ""
+        return [*self.packer.add(last), *self.packer.flush()]
+
+
+def iter_chunks(paragraphs: Iterable[str], max_tokens: int = MAX_TOKENS) -> Iterator[str]:
+    """
+        Same as iter_chunks_with_tokens, yielding only the chunk text.
+    """
+    for chunk, _ in iter_chunks_with_tokens(paragraphs, max_tokens):
+        yield chunk
 
-tokenizer = AutoTokenizer.from_pretrained("aisingapore/Gemma-SEA-LION-v4-27B-IT", trust_remote_code=True)
 
 def chunk_by_tokens(text: str, max_tokens: int = MAX_TOKENS) -> list:
     """
         Splits the input text into chunks, each not exceeding max_tokens when tokenized.
         The splitting is done at paragraph boundaries to maintain coherence.
+        Paragraphs larger than max_tokens are split at sentence boundaries instead.
     """
-    paragraphs = [p for p in text.split("\n\n") if p]
-    chunks = []
-    curr = ""
-    for p in paragraphs:
-        candidate = f"{curr}\n\n{p}" if curr else p
-        if len(tokenizer.encode(candidate)) <= max_tokens:
-            curr = candidate
-        else:
-            if curr:
-                chunks.append(curr)
-            curr = p
-    
-    if curr:
-        chunks.append(curr)
-    return chunks
+    return list(iter_chunks(iter_paragraphs(text), max_tokens))
+
+
+@timed(CHUNKING_SECONDS)
+def chunk_with_token_counts(text: str, max_tokens: int = MAX_TOKENS) -> Tuple[list[str], list[int]]:
+    """
+        Same as chunk_by_tokens, also returning the token count of each chunk.
+    """
+    pairs = list(iter_chunks_with_tokens(iter_paragraphs(text), max_tokens))
+    return [c for c, _ in pairs], [n for _, n in pairs]
 
 
-async def interpret_book_info(chunk: str, language: str) -> str:
+def estimate_request_tokens(chunk_tokens: int) -> int:
+    """
+        Estimates the LLM tokens a translation request consumes: prompt overhead, the chunk,
+        and a translation of roughly OUTPUT_TOKEN_RATIO times its length.
+    """
+    return PROMPT_OVERHEAD_TOKENS + int(chunk_tokens * (1 + OUTPUT_TOKEN_RATIO))
+
+
+async def complete_prompt(prompt: str, backend: LLMBackend | None = None, tokens: int = 0) -> str:
+    """
+        Sends a single user prompt to the backend's model and returns the answer.
+        Response headers are fed back to the backend's rate limiter, and the outcome to its latency and health tracking.
+        Without a backend, the default client and TRANSLATION_MODEL are used (e.g. scripts, benchmarks).
+    """
+    messages = [{ "role": "user", "content": prompt }]
+    if backend is None:
+        completion = await get_llm_client().chat.completions.create(
+            model=TRANSLATION_MODEL,
+            messages=messages,
+            extra_body=DEFAULT_EXTRA_BODY
+        )
+        return completion.choices[0].message.content
+
+    start = time.monotonic()
+    try:
+        response = await backend.client.chat.completions.with_raw_response.create(
+            model=backend.model,
+            messages=messages,
+            extra_body=backend.extra_body
+        )
+    except openai.RateLimitError:
+        LLM_REQUESTS.labels(backend=backend.name, outcome="throttled").inc()
+        raise
+    except Exception:
+        LLM_REQUESTS.labels(backend=backend.name, outcome="error").inc()
+        backend.on_failure()
+        raise
+    LLM_REQUESTS.labels(backend=backend.name, outcome="ok").inc()
+    await backend.rate_limiter.feedback(response.headers)
+    backend.on_success(time.monotonic() - start, tokens)
+    completion = response.parse()
+    return completion.choices[0].message.content
+
+
+async def interpret_book_info(chunk: str, language: str, backend: LLMBackend | None = None, tokens: int = 0) -> str:
     """
         Uses the LLM to extract book title and author in both original and translated languages from the given text chunk.
         Returns a string in the format: [english book title, english book author, translated book title, translated book author]
     """
-    client = OpenAI(
-        api_key=SEALION_API_KEY,
-        base_url=SEALION_API_URL
+    return await complete_prompt(
+        f"Read the text and translate the following text from english to {language}. ONLY return [english book title, english book author, translated book title, translated book author] in this exact format. If there are any missing fields, just leave it as NA. Text: {chunk}",
+        backend,
+        tokens
     )
 
-    completion = client.chat.completions.create(
-        model="aisingapore/Llama-SEA-LION-v3.5-70B-R",
-        messages=[
-            {
-                "role": "user",
-                "content": f"Read the text and translate the following text from english to {language}. ONLY return [english book title, english book author, translated book title, translated book author] in this exact format. If there are any missing fields, just leave it as NA. Text: {chunk}"
-            }
-        ],
-        extra_body={
-            "chat_template_kwargs": {
-                "thinking_mode": "off"
-            }
-        },
-    )
-    return completion.choices[0].message.content
 
-
-async def extract_book_info(chunk: str, language: str, rl: RateLimiter) -> BookInfo:
+@timed(BOOK_INFO_SECONDS)
+async def extract_book_info(
+    chunk: str,
+    language: str,
+    router: LLMRouter,
+    redis_server: redis.Redis | None = None
+) -> BookInfo:
     """
         Extracts book information (title and author in both original and translated languages) from the given text chunk.
-        Utilizes a rate limiter to control the frequency of API calls.
-        Retries up to 2 times in case of failure."""
-    await rl.acquire()
+        Results for a chunk seen before are served from the Redis book-info cache without an API call.
+        Routed to the backends serving book-info extraction, which may be a cheaper model than translation.
+        Retries up to 2 times in case of failure, on another backend when one has budget."""
+    if redis_server:
+        cached = await get_cached_book_info(redis_server, chunk, language)
+        if cached:
+            return BookInfo.from_dict(cached)
+
+    request_tokens = estimate_request_tokens(count_tokens(chunk))
+    backend = await router.route(ROLE_BOOK_INFO, request_tokens)
     res = BookInfo()
 
-    for _ in range(2):
+    for attempt in range(2):
         try:
-            book_info = await interpret_book_info(chunk, language)
+            async with backend.rate_limiter.concurrency:
+                book_info = await interpret_book_info(chunk, language, backend, request_tokens)
             print(f"[RAW LLM OUTPUT]: {book_info}")  # todo: remove when done
             book_info = book_info.strip("[]").split(",")
             res.set_book_info(book_info)
+            if redis_server and res.is_complete():
+                await save_cached_book_info(redis_server, chunk, language, res.get_book_info())
             return res
+        except openai.RateLimitError as e:
+            await backend.rate_limiter.feedback(e.response.headers, throttled=True)
+            if attempt == 1:
+                break
+            backend = await router.route(ROLE_BOOK_INFO, request_tokens)
         except Exception as e:
-            await asyncio.sleep(7)
+            # only take budget on another backend if it will be used
+            if attempt == 1:
+                break
+            failover = await router.try_route(ROLE_BOOK_INFO, request_tokens, exclude=(backend,))
+            if failover is None:
+                await asyncio.sleep(7)
+                failover = await router.route(ROLE_BOOK_INFO, request_tokens)
+            backend = failover
 
     return res
 
 
-async def translate_chunk(chunk: str, language: str) -> str:
+@timed(TRANSLATE_CHUNK_SECONDS)
+async def translate_chunk(chunk: str, language: str, backend: LLMBackend | None = None, tokens: int = 0) -> str:
     """
-        Translates the given text chunk into the specified language using the LLM.
+        Translates the given text chunk into the specified language using the backend's model.
         Returns the translated text.
     """
-    client = OpenAI(
-        api_key=SEALION_API_KEY,
-        base_url=SEALION_API_URL
+    return await complete_prompt(
+        f"Translate the following text from english to {language}. Return ONLY the most accurate translation in ${language}, without any explanation, alternatives, or romanization. Text: {chunk}",
+        backend,
+        tokens
     )
 
-    completion = client.chat.completions.create(
-        model="aisingapore/Llama-SEA-LION-v3.5-70B-R",
-        messages=[
-            {
-                "role": "user",
-                "content": f"Translate the following text from english to {language}. Return ONLY the most accurate translation in ${language}, without any explanation, alternatives, or romanization. Text: {chunk}"
-            }
-        ],
-        extra_body={
-            "chat_template_kwargs": {
-                "thinking_mode": "off"
-            }
-        },
+
+def pack_chunks(chunks: list[str]) -> str:
+    """
+        Joins chunks into one text for a single request, each under its numbered marker line, closed by an end marker.
+    """
+    return "\n\n".join(f"{PACK_MARKER.format(i)}\n{c}" for i, c in enumerate(chunks, 1)) + f"\n\n{PACK_END}"
+
+
+def split_packed_translation(text: str, chunks: list[str]) -> list[str] | None:
+    """
+        Splits the answer to a packed request back into one translation per chunk.
+        Returns None unless it validates: every marker exactly once and in order, then the end marker
+        (so a truncated answer fails), no empty translation, and no translation whose length ratio to its chunk
+        is PACK_RATIO_SPREAD times off the whole pack's, as when the model merged or moved text between segments.
+    """
+    markers = list(PACK_MARKER_LINE.finditer(text or ""))
+    if [m.group(1) for m in markers] != [str(i) for i in range(1, len(chunks) + 1)] + [None]:
+        return None
+    segments = [text[a.end():b.start()].strip() for a, b in zip(markers, markers[1:])]
+    if not all(segments):
+        return None
+    ratio = sum(map(len, segments)) / max(sum(map(len, chunks)), 1)
+    for segment, chunk in zip(segments, chunks):
+        if len(chunk) < PACK_RATIO_MIN_CHARS:
+            continue
+        spread = len(segment) / len(chunk) / ratio
+        if spread > PACK_RATIO_SPREAD or spread < 1 / PACK_RATIO_SPREAD:
+            return None
+    return segments
+
+
+async def translate_packed_chunks(chunks: list[str], language: str, backend: LLMBackend | None = None, tokens: int = 0) -> str:
+    """
+        Translates several chunks in one request (see pack_chunks); the answer keeps each translation under its chunk's marker.
+    """
+    return await complete_prompt(
+        f"Translate each of the {len(chunks)} segments of the following text from english to {language}. Keep every marker line ({PACK_MARKER.format('N')} and the final {PACK_END}) exactly as it is, on its own line, and put the translation of each segment right under its marker. Return ONLY the marker lines and the most accurate translations in {language}, without any explanation, alternatives, or romanization. Text: {pack_chunks(chunks)}",
+        backend,
+        tokens
     )
-    return completion.choices[0].message.content
 
 
-async def worker(
+async def serve_cached_chunk(
     job_id: str,
     chunk_idx: int,
     chunk: str,
     language: str,
     total_chunks: int,
-    rate_limiter: RateLimiter,
+    router: LLMRouter,
     redis_server: redis.Redis
-) -> None:
+) -> bool:
+    """
+        Saves the chunk's translation from the chunk cache (made by any job, with any model of the pool), if there is one,
+        without touching the rate limiters. Returns True if the chunk was served.
+    """
+    cache_keys = [
+        chunk_cache_key(chunk, language, model, TRANSLATE_PROMPT_VERSION)
+        for model in router.models(ROLE_TRANSLATE)
+    ]
+    cached = await get_cached_translation(redis_server, cache_keys)
+    if cached is None:
+        return False
+    async with span(redis_server, job_id, "redis.progress", cached=True):
+        await update_translation_job_progress(
+            redis_server, job_id, chunk_idx, cached, total_chunks
+        )
+    return True
+
+
+async def worker(
+    job_id: str,
+    chunk_idx: int,
+    chunk: str,
+    language: str,
+    total_chunks: int,
+    router: LLMRouter,
+    redis_server: redis.Redis,
+    chunk_tokens: int | None = None
+) -> bool:
     """
         Worker function to translate a single chunk of text.
-        Utilizes a rate limiter to control the frequency of API calls.
-        Retries up to max_retries times in case of failure, with exponential backoff.
+        Chunks already translated (by any job, with any model of the pool) are served from the chunk cache
+        without touching the rate limiters.
+        The request is routed to a translation backend with rate-limit budget (see llm_router.LLMRouter).
+        Rate-limit responses pause that backend's limiter for the server-requested time, lower its concurrency
+        and are retried on whichever backend has budget; other failures (including CHUNK_TIMEOUT) fail over
+        to another backend with budget right now, if any. Otherwise the chunk is not retried in place,
+        the caller requeues it with its own backoff so this worker moves on to the next task.
+        Stragglers may be hedged with a second request, preferably on another backend (see hedging.hedged_call).
         Updates the translation job progress in Redis after successful translation.
+        Returns True if the chunk was translated and saved.
     """
-    await rate_limiter.acquire()
-    max_retries = 5
-    delay = 7
-    for attempt in range(max_retries):  # retry once
+    if await serve_cached_chunk(job_id, chunk_idx, chunk, language, total_chunks, router, redis_server):
+        return True
+
+    if chunk_tokens is None:
+        chunk_tokens = count_tokens(chunk)
+    request_tokens = estimate_request_tokens(chunk_tokens)
+
+    async def ask(b: LLMBackend) -> tuple[str, LLMBackend]:
+        return await translate_chunk(chunk, language, b, request_tokens), b
+
+    async def hedge():
+        alt = await router.try_route(ROLE_TRANSLATE, request_tokens, exclude=(backend,))
+        if alt is None and await backend.rate_limiter.try_acquire(request_tokens):
+            alt = backend
+        if alt is None:
+            return None
+
+        async def ask_alt() -> tuple[str, LLMBackend]:
+            # the primary request's slot is held around hedged_call, the hedge needs its own
+            async with alt.rate_limiter.concurrency:
+                return await ask(alt)
+        return ask_alt
+
+    async def route() -> LLMBackend:
+        async with span(redis_server, job_id, "rate_limit.wait", tokens=request_tokens) as s:
+            routed = await router.route(ROLE_TRANSLATE, request_tokens)
+            s.set(backend=routed.name)
+        return routed
+
+    backend = await route()
+    tried = []
+    for attempt in range(1, MAX_RATE_LIMIT_RETRIES + 1):
+        last_attempt = attempt == MAX_RATE_LIMIT_RETRIES
         try:
-            translation = await translate_chunk(chunk, language)
-            await update_translation_job_progress(
-                redis_server, job_id, chunk_idx, translation, total_chunks
-            )
-            return
+            async with span(redis_server, job_id, "llm.request", backend=backend.name, tokens=request_tokens):
+                async with backend.rate_limiter.concurrency:
+                    translation, answered_by = await hedged_call(lambda: ask(backend), chunk_tokens, hedge)
+            async with span(redis_server, job_id, "redis.progress"):
+                # cached under the model that wrote the translation, which is the hedge's when it won
+                await set_cached_translation(
+                    redis_server,
+                    chunk_cache_key(chunk, language, answered_by.model, TRANSLATE_PROMPT_VERSION),
+                    translation
+                )
+                await update_translation_job_progress(
+                    redis_server, job_id, chunk_idx, translation, total_chunks
+                )
+            return True
+        except openai.RateLimitError as e:
+            await backend.rate_limiter.feedback(e.response.headers, throttled=True)
+            # re-route (and take budget) only for another attempt
+            if last_attempt:
+                break
+            backend = await route()
         except Exception as e:
-            await asyncio.sleep(delay * (2 ** attempt // 2))
-    
-    # After max_retries, log but don't crash; pick up again in next round
-    print(f"Chunk {chunk_idx} failed after {max_retries} attempts.")
+            # log but don't crash; the chunk fails over or is requeued with backoff
+            print(f"Chunk {chunk_idx} of job {job_id} failed on {backend.name}: {e}")
+            timed_out = isinstance(e, asyncio.TimeoutError)
+            CHUNK_FAILURES.labels(reason="timeout" if timed_out else "error").inc()
+            if timed_out:
+                backend.on_failure()
+            tried.append(backend)
+            if last_attempt:
+                return False
+            backend = await router.try_route(ROLE_TRANSLATE, request_tokens, exclude=tuple(tried))
+            if backend is None:
+                return False
+
+    print(f"Chunk {chunk_idx} of job {job_id} still rate limited after {MAX_RATE_LIMIT_RETRIES} attempts.")
+    CHUNK_FAILURES.labels(reason="exhausted").inc()
+    return False
 
 
 async def translate_service(
@@ -169,87 +655,603 @@ async def translate_service(
     language: str,
     book_info: BookInfo,
     chunks: list[str],
-    rate_limiter: RateLimiter,
-    redis_server: redis.Redis
-) -> Tuple[bool, str]:
+    redis_server: redis.Redis,
+    token_counts: list[int] | None = None,
+    max_tokens: int | None = None,
+    model: str | None = None
+) -> JobStart | None:
     """
         Main translation service function.
-        Sets up the translation job, processes chunks with rate limiting, and handles job completion.
-        Returns a tuple indicating success status and the full translated text."""
-    print(f"[TRANSLATE_SERVICE] CALLED in sync mode, job_id={job_id}")
-  # todo: remove when done
-    # set job active and initialise redis cache
+        Sets up the translation job, persists the source chunks and its parameters and enqueues every chunk still to be translated.
+        The chunks are translated by translation workers (see run_translation_worker) in this or any other process.
+        If the same job is already running (submitted by any user), the user joins it instead and nothing is queued twice.
+        Returns JobStart.STARTED if the job was queued, JobStart.JOINED if it was joined, None if it could not start."""
     try:
-        print("[TRANSLATE_SERVICE] CWD:", os.getcwd())  # todo: remove when done
-        if not await start_translation_job(
-            redis_server, email, job_id, book_info.origin_title, book_info.origin_author, len(chunks)
-        ):
-            raise Exception("Ongoing job already in progress!")
-        
-        # process with rate-limiter
-        for _ in range(10):
-            remaining_chunk_indx = await get_todo_job_chunks(redis_server, job_id)
-            if not remaining_chunk_indx:
-                break
-            await asyncio.gather(*[
-                worker(job_id, i, chunks[i], language, len(chunks), rate_limiter, redis_server) for i in remaining_chunk_indx
-            ])
-            await asyncio.sleep(2)
-
-        # return cleaned translations
-        translations = await complete_translation_job(redis_server, email, job_id)
-        cleaned_translations = [t.strip() for t in translations]
-        full_book = "\n\n".join(cleaned_translations)
-        print(f"[TRANSLATE_SERVICE] About to write: {book_info.origin_title}, {book_info.origin_author}")  # todo: remove logging when done
-
-        print(f"[TRANSLATE_SERVICE] About to write file: {book_info.origin_title}, {book_info.origin_author}")  # todo: remove logging when done
-        write_file_to_local_storage(
-            full_book,
-            book_info.origin_title,
-            book_info.origin_author,
-            book_info.trans_title,
-            book_info.trans_author
+        start = await start_translation_job(
+            redis_server, email, job_id, book_info.get_book_info(), language, len(chunks), max_tokens, model
         )
-        print("[TRANSLATE_SERVICE] File written!")  # todo: remove logging when done
-        
-        return True, full_book
+        if start == JobStart.REFUSED:
+            raise Exception("Ongoing job already in progress!")
+        if start == JobStart.JOINED:
+            DEDUPLICATED_WORK.labels(kind="job").inc()
+            return start
+
+        await save_source_chunks(redis_server, job_id, chunks, token_counts)
+        await enqueue_todo_chunks(job_id, redis_server)
+        return start
     except Exception as e:
         print(f"An error has occured in translate_service: {e}")
-        return False, None
-# async def translate_service(  # todo: remove when done testing
-#     job_id, email, language, book_info, chunks, rate_limiter, redis_server
-# ):
-#     print(f"[TRANSLATE_SERVICE] CALLED")
-#     print(f"[INPUT] Chunks: {chunks}")
-#     print(f"[INPUT] Book info: {book_info}")
-#     result = "test text"
-#     from file_management import write_file_to_local_storage
-#     write_file_to_local_storage(
-#         result, book_info.origin_title, book_info.origin_author, book_info.trans_title, book_info.trans_author
-#     )
-#     print("[TRANSLATE_SERVICE] File write attempted")
-#     return True, result
+        return None
+
+
+async def translate_upload_service(
+    job_id: str,
+    email: str,
+    language: str,
+    book_info: BookInfo,
+    upload_id: str,
+    total_chunks: int,
+    redis_server: redis.Redis,
+    max_tokens: int | None = None,
+    model: str | None = None
+) -> JobStart | None:
+    """
+        Same as translate_service for a streamed upload, whose source chunks were staged in Redis
+        under upload_id as they were formed (see stage_upload_chunks); they are moved to the job, not copied.
+        A joined job leaves the staged chunks to be discarded.
+        Returns JobStart.STARTED if the job was queued, JobStart.JOINED if it was joined, None if it could not start.
+    """
+    try:
+        start = await start_translation_job(
+            redis_server, email, job_id, book_info.get_book_info(), language, total_chunks, max_tokens, model
+        )
+        if start == JobStart.REFUSED:
+            raise Exception("Ongoing job already in progress!")
+        if start == JobStart.JOINED:
+            DEDUPLICATED_WORK.labels(kind="job").inc()
+            return start
+
+        await adopt_upload_chunks(redis_server, upload_id, job_id)
+        await enqueue_todo_chunks(job_id, redis_server)
+        return start
+    except Exception as e:
+        print(f"An error has occured in translate_upload_service: {e}")
+        return None
+
+
+async def enqueue_todo_chunks(job_id: str, redis_server: redis.Redis) -> None:
+    """
+        Enqueues every chunk of the job still to be translated.
+    """
+    remaining_chunk_indx = await get_todo_job_chunks(redis_server, job_id)
+    queue_depth = await enqueue_chunk_tasks(redis_server, job_id, remaining_chunk_indx)
+    print(f"[TRANSLATE_SERVICE] Queued {len(remaining_chunk_indx)} chunks for job_id={job_id}, ready tasks={queue_depth}")
+
+
+async def assemble_translated_book(job_id: str, meta: dict, redis_server: redis.Redis) -> int:
+    """
+        Streams the translated chunks of the job, in order and ASSEMBLY_BATCH_CHUNKS at a time, into the book cache file
+        and the job's Redis result, both compressed as they are written and published atomically at the end.
+        Holds one window of chunks rather than the whole book. Returns the number of chunks assembled.
+    """
+    writer = BookFileWriter(
+        meta["origin_title"],
+        meta["origin_author"],
+        meta["trans_title"],
+        meta["trans_author"],
+        meta["language"],
+        keep_output=True
+    )
+    try:
+        chunks = 0
+        first = True
+        async for batch in iter_saved_chunk_batches(redis_server, job_id):
+            for t in batch:
+                writer.write(("\n\n" if chunks else "") + t.strip())
+                chunks += 1
+            await append_job_result(redis_server, job_id, writer.drain(), first)
+            first = False
+        writer.close()
+        await append_job_result(redis_server, job_id, writer.drain(), first)
+        async with span(redis_server, job_id, "finalize.storage"):
+            writer.commit()
+        async with span(redis_server, job_id, "finalize.redis"):
+            await commit_job_result(redis_server, job_id)
+        return chunks
+    except Exception:
+        writer.abort()
+        raise
+
+
+async def finalize_translation_job(job_id: str, redis_server: redis.Redis) -> bool:
+    """
+        Assembles the translated chunks of a finished job, stores the book and releases the job.
+        Only one worker finalizes a given job; returns False for every other caller.
+    """
+    if not await claim_job_finalization(redis_server, job_id):
+        return False
+
+    meta = await get_job_meta(redis_server, job_id)
+    async with span(redis_server, job_id, "finalize") as finalize:
+        chunks = await assemble_translated_book(job_id, meta, redis_server)
+        finalize.set(chunks=chunks)
+        async with span(redis_server, job_id, "finalize.redis"):
+            await register_translated_language(
+                redis_server, meta["origin_title"], meta["origin_author"], meta["language"], job_id
+            )
+    await complete_translation_job(redis_server, meta["email"], job_id)
+    print(f"[FINALIZE] Job {job_id} finished!")
+    return True
+
+
+async def retry_or_fail_chunk(
+    worker_id: str,
+    job_id: str,
+    chunk_idx: int,
+    redis_server: redis.Redis
+) -> None:
+    """
+        Requeues a failed chunk right away, but only ready again after its own exponential backoff;
+        other chunks keep flowing meanwhile.
+        After MAX_CHUNK_ROUNDS failed rounds the whole job is marked as failed.
+    """
+    rounds = await record_chunk_failure(redis_server, job_id, chunk_idx)
+    if rounds < MAX_CHUNK_ROUNDS:
+        delay = min(CHUNK_RETRY_BASE_DELAY * 2 ** (rounds - 1), CHUNK_RETRY_MAX_DELAY)
+        await requeue_chunk_task(redis_server, worker_id, job_id, chunk_idx, delay)
+        CHUNK_RETRIES.inc()
+        now = time.time_ns()
+        await record_span(redis_server, job_id, "chunk.backoff", now, now + int(delay * 1e9), chunk_no=chunk_idx, attempt=rounds)
+        return
+
+    print(f"Chunk {chunk_idx} of job {job_id} failed after {rounds} rounds, failing job.")
+    JOB_FAILURES.inc()
+    await ack_chunk_task(redis_server, worker_id, job_id, chunk_idx)
+    meta = await get_job_meta(redis_server, job_id)
+    await fail_translation_job(redis_server, meta.get("email"), job_id)
+
+
+async def complete_chunk_task(
+    worker_id: str,
+    job_id: str,
+    chunk_idx: int,
+    translated: bool,
+    redis_server: redis.Redis
+) -> None:
+    """
+        Acknowledges a translated chunk task, finalizing the job if it was its last chunk, or requeues a failed one.
+    """
+    if not translated:
+        await retry_or_fail_chunk(worker_id, job_id, chunk_idx, redis_server)
+        return
+
+    await ack_chunk_task(redis_server, worker_id, job_id, chunk_idx)
+    completed, total = await get_completed_chunks(redis_server, job_id)
+    if completed >= total:
+        await finalize_translation_job(job_id, redis_server)
+
+
+async def translate_chunk_task(
+    worker_id: str,
+    job_id: str,
+    chunk_idx: int,
+    ctx: dict,
+    router: LLMRouter,
+    redis_server: redis.Redis
+) -> None:
+    """
+        Translates the chunk of a task leased by the caller in a request of its own, traced as a chunk.attempt span
+        of the job, and completes the task.
+    """
+    async with span(
+        redis_server,
+        job_id,
+        "chunk.attempt",
+        chunk_no=chunk_idx,
+        chunk_tokens=ctx["chunk_tokens"],
+        attempt=ctx["failed_rounds"] + 1,
+        worker=worker_id
+    ) as attempt:
+        translated = await worker(
+            job_id,
+            chunk_idx,
+            ctx["chunk"],
+            ctx["meta"]["language"],
+            ctx["total_chunks"],
+            router,
+            redis_server,
+            ctx["chunk_tokens"]
+        )
+        attempt.set(outcome="translated" if translated else "failed")
+    await complete_chunk_task(worker_id, job_id, chunk_idx, translated, redis_server)
+
+
+async def process_chunk_task(
+    worker_id: str,
+    job_id: str,
+    chunk_idx: int,
+    router: LLMRouter,
+    redis_server: redis.Redis
+) -> None:
+    """
+        Translates one queued chunk task and acknowledges it.
+        Tasks of cancelled, failed or already finished jobs, and of chunks translated already, are dropped.
+        The chunk is leased to this worker while it is translated, so a duplicate task (a job re-enqueued while
+        its chunks were in flight, a reclaimed task of a stalled worker) never puts the same chunk in flight twice.
+        The worker that completes the last chunk finalizes the job.
+    """
+    ctx = await get_chunk_task_context(redis_server, job_id, chunk_idx)
+    if ctx["state"] != "running" or ctx["chunk"] is None or ctx["translated"]:
+        await ack_chunk_task(redis_server, worker_id, job_id, chunk_idx)
+        return
+
+    async with hold_lease(redis_server, chunk_lease_key(job_id, chunk_idx), worker_id, CHUNK_LEASE_TTL) as leased:
+        if leased:
+            await translate_chunk_task(worker_id, job_id, chunk_idx, ctx, router, redis_server)
+    if not leased:
+        # the worker holding the lease acknowledges or requeues the task
+        DEDUPLICATED_WORK.labels(kind="chunk").inc()
+        await drop_duplicate_chunk_task(redis_server, worker_id, job_id, chunk_idx)
+
+
+async def translate_packed_tasks(
+    worker_id: str,
+    packed: list[tuple[str, int, dict]],
+    router: LLMRouter,
+    redis_server: redis.Redis
+) -> list[str] | None:
+    """
+        Sends the chunks of the (job_id, chunk_idx, ctx) tasks as one request, routed and rate limited like a single chunk
+        of their combined size, then saves each translation (chunk cache and job progress).
+        Every chunk gets a chunk.attempt span in its job, with the shared limiter wait and LLM request as children.
+        Returns the translations, or None if the request failed or its answer did not split back per chunk.
+    """
+    chunks = [ctx["chunk"] for _, _, ctx in packed]
+    language = packed[0][2]["meta"]["language"]
+    chunk_tokens = sum(
+        ctx["chunk_tokens"] if ctx["chunk_tokens"] is not None else count_tokens(ctx["chunk"]) for _, _, ctx in packed
+    ) + PACK_SEGMENT_TOKENS * len(chunks)
+    request_tokens = estimate_request_tokens(chunk_tokens)
+
+    start = time.time_ns()
+    backend = await router.route(ROLE_TRANSLATE, request_tokens)
+    routed = time.time_ns()
+
+    async def ask(b: LLMBackend) -> tuple[str, LLMBackend]:
+        return await translate_packed_chunks(chunks, language, b, request_tokens), b
+
+    async def hedge():
+        alt = await router.try_route(ROLE_TRANSLATE, request_tokens, exclude=(backend,))
+        if alt is None and await backend.rate_limiter.try_acquire(request_tokens):
+            alt = backend
+        if alt is None:
+            return None
+
+        async def ask_alt() -> tuple[str, LLMBackend]:
+            # the primary request's slot is held around hedged_call, the hedge needs its own
+            async with alt.rate_limiter.concurrency:
+                return await ask(alt)
+        return ask_alt
+
+    translations = None
+    try:
+        async with backend.rate_limiter.concurrency:
+            answer, answered_by = await hedged_call(lambda: ask(backend), chunk_tokens, hedge)
+        translations = split_packed_translation(answer, chunks)
+        outcome = "ok" if translations else "split_failed"
+    except openai.RateLimitError as e:
+        await backend.rate_limiter.feedback(e.response.headers, throttled=True)
+        outcome = "throttled"
+    except Exception as e:
+        print(f"Packed request of {len(chunks)} chunks failed on {backend.name}: {e}")
+        outcome = "error"
+        if isinstance(e, asyncio.TimeoutError):
+            backend.on_failure()
+    answered = time.time_ns()
+    PACKED_REQUESTS.labels(outcome=outcome).inc()
+    PACKED_CHUNKS.inc(len(chunks))
+    if outcome != "ok":
+        print(f"Packed request of {len(chunks)} chunks: {outcome}, translating them one by one.")
+
+    for i, (job_id, chunk_idx, ctx) in enumerate(packed):
+        if translations:
+            await set_cached_translation(
+                redis_server,
+                # cached under the model that wrote the translation, which is the hedge's when it won
+                chunk_cache_key(ctx["chunk"], language, answered_by.model, TRANSLATE_PROMPT_VERSION),
+                translations[i]
+            )
+            await update_translation_job_progress(redis_server, job_id, chunk_idx, translations[i], ctx["total_chunks"])
+        attempt = await record_span(
+            redis_server,
+            job_id,
+            "chunk.attempt",
+            start,
+            time.time_ns(),
+            chunk_no=chunk_idx,
+            chunk_tokens=ctx["chunk_tokens"],
+            attempt=ctx["failed_rounds"] + 1,
+            worker=worker_id,
+            packed=len(packed),
+            outcome="translated" if translations else outcome
+        )
+        await record_span(redis_server, job_id, "rate_limit.wait", start, routed, attempt, backend=backend.name, tokens=request_tokens)
+        await record_span(redis_server, job_id, "llm.request", routed, answered, attempt, backend=backend.name, tokens=request_tokens, packed=len(packed))
+    return translations
+
+
+async def process_packed_tasks(
+    worker_id: str,
+    tasks: list[tuple[str, int]],
+    router: LLMRouter,
+    redis_server: redis.Redis,
+    settled: set[tuple[str, int]]
+) -> None:
+    """
+        Translates several small chunk tasks, of one or several jobs (see dequeue_packable_chunk_tasks), in one request,
+        so together they spend one request of the rate limit instead of one each.
+        Tasks are screened and leased like in process_chunk_task, and chunks in the chunk cache are served from it.
+        If the packed request fails or its answer does not split back per chunk, the chunks get individual requests.
+        Every task acknowledged, dropped or requeued is added to settled, so a caller recovering from an error
+        only retries the others.
+    """
+    async with AsyncExitStack() as leases:
+        packed = []
+        for job_id, chunk_idx in tasks:
+            ctx = await get_chunk_task_context(redis_server, job_id, chunk_idx)
+            if ctx["state"] != "running" or ctx["chunk"] is None or ctx["translated"]:
+                await ack_chunk_task(redis_server, worker_id, job_id, chunk_idx)
+                settled.add((job_id, chunk_idx))
+                continue
+            lease = hold_lease(redis_server, chunk_lease_key(job_id, chunk_idx), worker_id, CHUNK_LEASE_TTL)
+            if not await leases.enter_async_context(lease):
+                DEDUPLICATED_WORK.labels(kind="chunk").inc()
+                await drop_duplicate_chunk_task(redis_server, worker_id, job_id, chunk_idx)
+                settled.add((job_id, chunk_idx))
+                continue
+            if await serve_cached_chunk(
+                job_id, chunk_idx, ctx["chunk"], ctx["meta"]["language"], ctx["total_chunks"], router, redis_server
+            ):
+                await complete_chunk_task(worker_id, job_id, chunk_idx, True, redis_server)
+                settled.add((job_id, chunk_idx))
+                continue
+            packed.append((job_id, chunk_idx, ctx))
+
+        translations = await translate_packed_tasks(worker_id, packed, router, redis_server) if len(packed) > 1 else None
+        for i, (job_id, chunk_idx, ctx) in enumerate(packed):
+            if translations:
+                await complete_chunk_task(worker_id, job_id, chunk_idx, True, redis_server)
+            else:
+                await translate_chunk_task(worker_id, job_id, chunk_idx, ctx, router, redis_server)
+            settled.add((job_id, chunk_idx))
 
 
+async def run_translation_worker(
+    worker_id: str,
+    router: LLMRouter,
+    redis_server: redis.Redis
+) -> None:
+    """
+        Long-running consumer of the shared translation queue.
+        A small chunk task is packed with other small ready tasks into one request (see process_packed_tasks).
+        On shutdown the in-flight tasks are handed back to the queue for another worker.
+    """
+    print(f"[WORKER {worker_id}] started")
+    while True:
+        task = await dequeue_chunk_task(redis_server, worker_id)
+        if task is None:
+            continue
+
+        tasks = [task]
+        # tasks of a pack already acknowledged or requeued, not to be handed back again on an error
+        settled = set()
+        try:
+            if PACK_CHUNK_TOKENS:
+                tasks += await dequeue_packable_chunk_tasks(
+                    redis_server, worker_id, *task, PACK_CHUNK_TOKENS, PACK_TOKEN_BUDGET, PACK_MAX_CHUNKS - 1
+                )
+            if len(tasks) > 1:
+                await process_packed_tasks(worker_id, tasks, router, redis_server, settled)
+            else:
+                await process_chunk_task(worker_id, *task, router, redis_server)
+        except asyncio.CancelledError:
+            for job_id, chunk_idx in tasks:
+                if (job_id, chunk_idx) not in settled:
+                    await requeue_chunk_task(redis_server, worker_id, job_id, chunk_idx)
+            raise
+        except Exception as e:
+            print(f"An error has occured in run_translation_worker: {e}")
+            for job_id, chunk_idx in tasks:
+                if (job_id, chunk_idx) not in settled:
+                    await retry_or_fail_chunk(worker_id, job_id, chunk_idx, redis_server)
+
+
+async def recover_orphaned_jobs(redis_server: redis.Redis, owner: str, scan: bool = False) -> dict:
+    """
+        Recovery sweep for jobs left behind by crashed or restarted pods:
+        in-flight tasks of worker processes without a heartbeat go back to the queue, and every running job
+        (under a lease, so concurrent sweeps don't race) gets a task again for each chunk that is still to be
+        translated and has none, e.g. tasks of the list queue used before the priority queue.
+        A job whose chunks are all translated but whose finalizer died is finalized; a job whose source chunks
+        are gone can't be resumed and is failed, which releases its user.
+        With scan, running jobs missing from the active jobs set are found too (once, at startup).
+        Returns counts of what was recovered.
+    """
+    stats = { "reclaimed_tasks": 0, "requeued_chunks": 0, "finalized_jobs": 0, "failed_jobs": 0 }
+    stats["reclaimed_tasks"] = await reclaim_dead_worker_tasks(redis_server)
+    RECOVERED_TASKS.labels(source="dead_worker").inc(stats["reclaimed_tasks"])
+    await drain_legacy_queue(redis_server)
+
+    for job_id in await get_running_jobs(redis_server, scan):
+        lease = f"job:{job_id}:recovery"
+        if not await acquire_lease(redis_server, lease, owner, RECOVERY_LEASE_TTL):
+            continue
+        try:
+            meta = await get_job_meta(redis_server, job_id)
+            if time.time() - float(meta.get("started_at", 0)) < RECOVERY_GRACE:
+                continue
+
+            todo = await get_todo_job_chunks(redis_server, job_id)
+            if not todo:
+                if not (await get_completed_chunks(redis_server, job_id))[1]:
+                    print(f"[RECOVERY] Job {job_id} was never set up, failing it.")
+                    await fail_translation_job(redis_server, meta.get("email"), job_id)
+                    stats["failed_jobs"] += 1
+                elif await finalize_translation_job(job_id, redis_server):
+                    stats["finalized_jobs"] += 1
+                continue
+
+            lost = await get_lost_chunk_tasks(redis_server, job_id, todo)
+            if not lost:
+                continue
+            ctx = await get_chunk_task_context(redis_server, job_id, lost[0])
+            if ctx["chunk"] is None:
+                print(f"[RECOVERY] Job {job_id} has no source chunks left, failing it.")
+                await fail_translation_job(redis_server, meta.get("email"), job_id)
+                stats["failed_jobs"] += 1
+                continue
+            await enqueue_chunk_tasks(redis_server, job_id, lost)
+            RECOVERED_TASKS.labels(source="lost").inc(len(lost))
+            stats["requeued_chunks"] += len(lost)
+        except Exception as e:
+            print(f"An error has occured while recovering job {job_id}: {e}")
+        finally:
+            await release_lease(redis_server, lease, owner)
+
+    if any(stats.values()):
+        print(f"[RECOVERY] {stats}")
+    return stats
+
+
+async def run_recovery_sweeper(redis_server: redis.Redis, owner: str, interval: float = RECOVERY_INTERVAL) -> None:
+    """
+        Sweeps for orphaned jobs at startup (scanning for jobs missing from the active set) and then every interval seconds.
+    """
+    scan = True
+    while True:
+        try:
+            await recover_orphaned_jobs(redis_server, owner, scan)
+            scan = False
+        except Exception as e:
+            print(f"An error has occured in run_recovery_sweeper: {e}")
+        await asyncio.sleep(interval)
+
+
+async def run_worker_heartbeat(redis_server: redis.Redis, process_id: str) -> None:
+    """
+        Keeps this process' heartbeat alive, so its workers' processing lists are not reclaimed.
+    """
+    while True:
+        try:
+            await refresh_worker_heartbeat(redis_server, process_id)
+        except Exception as e:
+            print(f"An error has occured in run_worker_heartbeat: {e}")
+        await asyncio.sleep(WORKER_HEARTBEAT_TTL / 3)
+
+
+def start_translation_workers(
+    n: int,
+    router: LLMRouter,
+    redis_server: redis.Redis
+) -> list[asyncio.Task]:
+    """
+        Spawns n queue consumers on the running event loop, with the process' heartbeat and recovery sweeper.
+        Worker ids are unique per host and process so processing lists never collide across replicas.
+    """
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    tasks = []
+    if n:
+        # first, so no sweep takes this process for dead once its workers hold tasks
+        tasks.append(asyncio.create_task(run_worker_heartbeat(redis_server, prefix)))
+    tasks.append(asyncio.create_task(run_recovery_sweeper(redis_server, prefix)))
+    return tasks + [
+        asyncio.create_task(run_translation_worker(f"{prefix}:{i}", router, redis_server))
+        for i in range(n)
+    ]
+
+
+async def stop_translation_workers(tasks: list[asyncio.Task]) -> None:
+    """
+        Cancels the queue consumers and waits for them to hand back their in-flight tasks.
+    """
+    for t in tasks:
+        t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def fetch_translation_by_fingerprint(
+    fingerprint: str,
+    language: str,
+    redis_server: redis.Redis
+) -> Tuple[dict | None, BookInfo | None]:
+    """
+        Answers a repeat request for an already translated book without any LLM call.
+        Returns (response, book_info): response is set only when the translation is finished, book_info whenever
+        the book is known, so a running job is joined through start_translation_job (which registers the user with it)
+        and a stale entry can still skip book-info extraction.
+    """
+    known = await get_book_fingerprint(redis_server, fingerprint)
+    if not known:
+        return None, None
+
+    job_id = known["job_id"]
+    book_info = BookInfo.from_dict(known)
+    res = {
+        "job_id": job_id,
+        "origin_title": book_info.origin_title,
+        "origin_author": book_info.origin_author
+    }
+
+    translated = read_file_in_local_storage(book_info.origin_title, book_info.origin_author, language)
+    if not translated:
+        translated = await get_job_result(redis_server, job_id)
+    if translated:
+        return { "status": JobCompletion.DONE, "result": translated, **res }, book_info
+    return None, book_info
+
+
+async def fetch_translation_variants(
+    origin_title: str,
+    origin_author: str,
+    redis_server: redis.Redis
+) -> dict:
+    """
+        Lists the languages the book has already been translated into, with the job_id of each variant:
+        the ones in the book cache on disk and those recorded in Redis.
+    """
+    languages = {
+        **list_local_languages(origin_title, origin_author),
+        **await get_translated_languages(redis_server, origin_title, origin_author)
+    }
+    return {
+        "origin_title": origin_title,
+        "origin_author": origin_author,
+        "languages": languages
+    }
+
 
 async def cancel_translation_service(
     job_id: str,
     email: str,
     redis_server: redis.Redis
-) -> None:
+) -> bool | None:
     """
         Cancels an ongoing translation job for the given job_id and user email.
+        A job joined by other users keeps running for them; only this user's interest in it is dropped.
+        Returns None if the user has no such running job (see cancel_translation_job).
     """
     try:
-        await cancel_translation_job(redis_server, email, job_id)
+        return await cancel_translation_job(redis_server, email, job_id)
     except Exception as e:
         print(f"An error has occured in book_translation: {e}")
+        return False
 
 
 async def fetch_translation_progress(
     job_id: str,
     origin_title: str,
     origin_author: str,
+    language: str,
     redis_server: redis.Redis
 ) -> dict:
     """
@@ -258,16 +1260,29 @@ async def fetch_translation_progress(
     """
     try:
         # get job status
-        remaining_chunk_idx = await get_todo_job_chunks(redis_server, job_id)
-        is_all_translated = len(remaining_chunk_idx) == 0
+        state = await get_job_state(redis_server, job_id)
+        if state in ("cancelled", "failed"):
+            return { "running": False, "chunks_remaining": 0, "error": f"Translation job {state}." }
+        if state is None:
+            # no Redis state (expired, flushed, or a book from before the queue): the book may still be on disk
+            translated = read_file_in_local_storage(origin_title, origin_author, language)
+            if translated:
+                return { "running": False, "chunks_remaining": 0, "result": translated }
+            return { "running": False, "chunks_remaining": 0, "error": "Translation job not found." }
+
+        is_all_translated = state == "finished"
+        completed, total = (0, 0) if is_all_translated else await get_completed_chunks(redis_server, job_id)
         res = {
             "running": not is_all_translated,
-            "chunks_remaining": len(remaining_chunk_idx)
+            "chunks_remaining": max(total - completed, 0)
         }
 
         if is_all_translated:
             try:
-                translated = read_file_in_local_storage(origin_title, origin_author)
+                translated = read_file_in_local_storage(origin_title, origin_author, language)
+                if not translated:
+                    # another replica may have finalized the job
+                    translated = await get_job_result(redis_server, job_id)
                 if not translated:
                     res["result"] = None
                     res["error"] = "Translation appears complete but no file found."
@@ -282,6 +1297,63 @@ async def fetch_translation_progress(
         return { "error": e }
     
 
+async def fetch_translation_preview(
+    job_id: str,
+    max_chunks: int,
+    redis_server: redis.Redis
+) -> dict:
+    """
+        Returns the already translated opening of a running job: the chunks from the start of the book
+        up to the first one still pending. Chunks are scheduled lowest index first, so this grows early.
+    """
+    completed, total = await get_completed_chunks(redis_server, job_id)
+    prefix = await get_translated_prefix(redis_server, job_id, min(max_chunks, total))
+    return {
+        "job_id": job_id,
+        "chunks": len(prefix),
+        "completed_chunks": completed,
+        "total_chunks": total,
+        "preview": "\n\n".join(t.strip() for t in prefix)
+    }
+
+
+def format_sse(seq: int, event: str, data: dict) -> str:
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_translation_events(
+    job_id: str,
+    last_seq: int,
+    redis_server: redis.Redis
+) -> AsyncIterator[str]:
+    """
+        Yields the job's events as Server-Sent Events, starting after sequence number last_seq:
+        "chunk" events with each newly translated chunk and the progress counters, and "status" events.
+        Replays missed events after a reconnect, then tails the log until the job ends.
+        Chunks replayed after the job ended come without their text; the result is then served by /translation_progress.
+    """
+    while True:
+        events = await read_job_events(redis_server, job_id, last_seq)
+        if not events:
+            state = await get_job_state(redis_server, job_id)
+            if state is None or state in JOB_END_STATES:
+                # unknown job, or an expired log of an ended job
+                yield format_sse(last_seq, "status", { "state": state or "unknown" })
+                return
+            # keeps proxies from closing an idle connection
+            yield ": keep-alive\n\n"
+            continue
+
+        for seq, event, fields in events:
+            last_seq = seq
+            for k in ("chunk_no", "completed", "total", "max_tokens"):
+                if k in fields:
+                    fields[k] = int(fields[k])
+            yield format_sse(seq, event, fields)
+            if event == "status" and fields["state"] in JOB_END_STATES:
+                return
+
+
 async def fetch_last_user_job(
     email: str,
     redis_server: redis.Redis
@@ -302,7 +1374,9 @@ async def fetch_last_user_job(
         book_text = None
         try:
             if "origin_title" in metadata and "origin_author" in metadata:
-                book_text = read_file_in_local_storage(metadata["origin_title"], metadata["origin_author"])
+                book_text = read_file_in_local_storage(
+                    metadata["origin_title"], metadata["origin_author"], metadata.get("language", "")
+                )
         except Exception:
             pass
 
@@ -310,12 +1384,12 @@ async def fetch_last_user_job(
         if not book_text:
             translations = await fetch_saved_chunks(redis_server, job_id)
             cleaned_translations = [t.strip() for t in translations]
-            full_book = "\n\n".join(cleaned_translations)
+            book_text = "\n\n".join(cleaned_translations)
 
         return {
             "job_id": job_id,
             "metadata": metadata,
-            "translated_book": full_book
+            "translated_book": book_text
         }
     except Exception as e:
         print(f"An error has occured in fetch_last_user_job: {e}")
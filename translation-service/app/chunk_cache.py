@@ -0,0 +1,106 @@
+import hashlib
+import os
+import redis.asyncio as redis
+from dotenv import load_dotenv
+from pathlib import Path
+
+from app.job_handler import get_raw
+from app.utils.compression import compress_text, decompress_text
+from app.utils.str_utils import canonize_str
+
+load_dotenv()
+
+CHUNK_CACHE_PREFIX = "chunkcache"
+CHUNK_CACHE_STATS = f"{CHUNK_CACHE_PREFIX}:stats"
+CHUNK_CACHE_TTL = int(os.getenv("CHUNK_CACHE_TTL", 30 * 24 * 60 * 60))
+# optional disk tier, disabled unless a folder is configured
+CHUNK_CACHE_DIR = os.getenv("CHUNK_CACHE_DIR")
+
+
+def chunk_cache_key(chunk: str, language: str, model: str, prompt_version: str) -> str:
+    """
+        Content address of a chunk translation: SHA-256 of the prompt version, model id,
+        canonical target language and the exact chunk text.
+        Identical chunks from re-uploads, other editions or other users map to the same key.
+    """
+    h = hashlib.sha256()
+    for part in (prompt_version, model, canonize_str(language), chunk):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _disk_path(key: str, folder: str) -> Path:
+    return Path(folder) / key[:2] / key
+
+
+def _read_disk(key: str, folder: str | None) -> str | None:
+    if not folder:
+        return None
+    try:
+        with open(_disk_path(key, folder), "rb") as f:
+            return decompress_text(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def _write_disk(key: str, translation: str, folder: str | None) -> None:
+    if not folder:
+        return
+    path = _disk_path(key, folder)
+    os.makedirs(path.parent, exist_ok=True)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(compress_text(translation))
+    os.replace(tmp, path)
+
+
+async def get_cached_translation(
+    server: redis.Redis,
+    key: str | list[str],
+    folder: str | None = CHUNK_CACHE_DIR
+) -> str | None:
+    """
+        Looks up a chunk translation in Redis, then in the disk tier (refilling Redis on a disk hit).
+        Given several keys (e.g. one per model of the backend pool), the first one found wins.
+        Counts hits and misses in a shared stats hash.
+    """
+    keys = [key] if isinstance(key, str) else key
+    values = await get_raw(server, "MGET", *[f"{CHUNK_CACHE_PREFIX}:{k}" for k in keys])
+    translation = next((decompress_text(v) for v in values if v is not None), None)
+    for k in keys:
+        if translation is not None:
+            break
+        translation = _read_disk(k, folder)
+        if translation is not None:
+            await server.set(f"{CHUNK_CACHE_PREFIX}:{k}", compress_text(translation), ex=CHUNK_CACHE_TTL)
+
+    await server.hincrby(CHUNK_CACHE_STATS, "hits" if translation is not None else "misses", 1)
+    return translation
+
+
+async def set_cached_translation(
+    server: redis.Redis,
+    key: str,
+    translation: str,
+    folder: str | None = CHUNK_CACHE_DIR
+) -> None:
+    """
+        Stores a chunk translation in Redis (with CHUNK_CACHE_TTL) and in the disk tier, if enabled.
+    """
+    await server.set(f"{CHUNK_CACHE_PREFIX}:{key}", compress_text(translation), ex=CHUNK_CACHE_TTL)
+    _write_disk(key, translation, folder)
+
+
+async def get_cache_stats(server: redis.Redis) -> dict:
+    """
+        Returns the shared hit/miss counters and the hit ratio.
+    """
+    stats = await server.hgetall(CHUNK_CACHE_STATS)
+    hits = int(stats.get("hits", 0))
+    misses = int(stats.get("misses", 0))
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / (hits + misses) if hits + misses else 0.0
+    }
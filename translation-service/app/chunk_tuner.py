@@ -0,0 +1,189 @@
+import ast
+import math
+import os
+from dotenv import load_dotenv
+from pathlib import Path
+from typing import Tuple
+
+from app.book_translation import MAX_TOKENS, estimate_request_tokens
+from app.hedging import MIN_LATENCY_SAMPLES, LatencyTracker, latency_tracker
+from app.llm_router import LLMRouter, ROLE_TRANSLATE
+
+load_dotenv()
+
+# pick max_tokens per job from the fitted latency model; MAX_TOKENS for every job when off
+CHUNK_TUNING = os.getenv("CHUNK_TUNING", "true").lower() in ("1", "true", "yes")
+CHUNK_TOKENS_MIN = int(os.getenv("CHUNK_TOKENS_MIN", 1000))
+# a chunk's translation (about OUTPUT_TOKEN_RATIO times its size) must fit the model's completion limit
+CHUNK_TOKENS_MAX = int(os.getenv("CHUNK_TOKENS_MAX", 8000))
+# benchmark_chunk_size.py output used as the prior until enough calls are observed ("" to disable)
+CHUNK_TUNER_PRIOR = os.getenv("CHUNK_TUNER_PRIOR", str(Path(__file__).parent / "optimal_token_summary.txt"))
+# each benchmark row counts as this many observed calls
+PRIOR_WEIGHT = 5
+# within this fraction of the best predicted makespan, the smaller chunk size wins (finer progress, cheaper retries)
+TIE_TOLERANCE = 0.02
+# candidate sizes, so re-uploads of a book keep landing on the same chunk boundaries (and chunk cache entries)
+CHUNK_SIZE_LADDER = [500, 750, 1000, 1500, 2000, 3000, 4000, 6000, 8000, 12000, 16000, 24000, 32000, 48000, 64000]
+
+
+class LatencyModel:
+    """
+        Request latency as a fixed overhead plus a per-token cost: seconds = overhead + per_token * chunk_tokens.
+    """
+    def __init__(self, overhead: float, per_token: float, source: str):
+        self.overhead = overhead
+        self.per_token = per_token
+        self.source = source
+
+    def predict(self, chunk_tokens: int) -> float:
+        return self.overhead + self.per_token * chunk_tokens
+
+
+# fallback when there is neither a prior nor observations, fitted on optimal_token_summary.txt
+DEFAULT_LATENCY_MODEL = LatencyModel(3.4, 0.0037, "default")
+
+
+def fit_latency_model(points: list[Tuple[float, float, float]], source: str) -> LatencyModel | None:
+    """
+        Weighted least squares fit of (chunk_tokens, seconds, weight) points.
+        Returns None with fewer than two distinct sizes or a non-increasing fit.
+    """
+    total = sum(w for _, _, w in points)
+    if len({x for x, _, _ in points}) < 2 or total <= 0:
+        return None
+    mean_x = sum(x * w for x, _, w in points) / total
+    mean_y = sum(y * w for _, y, w in points) / total
+    var = sum(w * (x - mean_x) ** 2 for x, _, w in points)
+    per_token = sum(w * (x - mean_x) * (y - mean_y) for x, y, w in points) / var
+    if per_token <= 0:
+        return None
+    return LatencyModel(max(mean_y - per_token * mean_x, 0.0), per_token, source)
+
+
+def load_benchmark_points(path: str | None = CHUNK_TUNER_PRIOR) -> list[Tuple[float, float, float]]:
+    """
+        Reads (max_tokens, avg_chunk_time) rows from the SUMMARY printed by benchmark_chunk_size.py.
+    """
+    if not path or not os.path.exists(path):
+        return []
+    points = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line.startswith("{"):
+                continue
+            try:
+                row = ast.literal_eval(line)
+                points.append((float(row["max_tokens"]), float(row["avg_chunk_time"]), PRIOR_WEIGHT))
+            except (ValueError, SyntaxError, KeyError):
+                continue
+    return points
+
+
+def observed_points(tracker: LatencyTracker = latency_tracker) -> list[Tuple[float, float, float]]:
+    """
+        Returns (bucket middle, p50 latency, samples) of every chunk-size bucket with enough samples.
+    """
+    return [
+        (bucket + tracker.bucket_tokens / 2, s["p50"], s["samples"])
+        for bucket, s in tracker.stats().items()
+        if s["samples"] >= MIN_LATENCY_SAMPLES
+    ]
+
+
+_prior_points: list | None = None
+
+
+def current_latency_model(tracker: LatencyTracker = latency_tracker) -> LatencyModel:
+    """
+        Fits the latency model on this process' observed calls, anchored by the benchmark prior.
+    """
+    global _prior_points
+    if _prior_points is None:
+        _prior_points = load_benchmark_points()
+    observed = observed_points(tracker)
+    return (
+        fit_latency_model(observed + _prior_points, "observed" if observed else "benchmark")
+        or fit_latency_model(_prior_points, "benchmark")
+        or DEFAULT_LATENCY_MODEL
+    )
+
+
+class ThroughputBudget:
+    """
+        The translation capacity of the backend pool: calls per second with their burst,
+        LLM tokens per second with their burst (0 for no token limit) and requests in flight.
+    """
+    def __init__(self, calls_per_sec: float, burst: float, tokens_per_sec: float, token_burst: float, concurrency: float):
+        self.calls_per_sec = calls_per_sec
+        self.burst = burst
+        self.tokens_per_sec = tokens_per_sec
+        self.token_burst = token_burst
+        self.concurrency = concurrency
+
+    @classmethod
+    def from_router(cls, router: LLMRouter) -> "ThroughputBudget":
+        calls_per_sec = burst = tokens_per_sec = token_burst = concurrency = 0.0
+        token_limited = True
+        for b in router.backends:
+            if ROLE_TRANSLATE not in b.roles or not b.is_healthy():
+                continue
+            rl = b.rate_limiter
+            calls_per_sec += rl.max_calls / rl.refill_rate
+            burst += rl.max_calls
+            concurrency += int(rl.concurrency.limit)
+            token_limited = token_limited and rl.max_tokens > 0
+            tokens_per_sec += rl.max_tokens / rl.refill_rate
+            token_burst += rl.max_tokens
+        if not token_limited:
+            tokens_per_sec = token_burst = 0.0
+        return cls(calls_per_sec, burst, tokens_per_sec, token_burst, max(concurrency, 1))
+
+
+def predict_makespan(total_tokens: int, max_tokens: int, model: LatencyModel, budget: ThroughputBudget) -> float:
+    """
+        Predicted seconds to translate total_tokens in chunks of max_tokens:
+        the later of the last request leaving the rate limiter and the last wave of concurrent requests,
+        plus one request latency.
+    """
+    n = max(math.ceil(total_tokens / max_tokens), 1)
+    chunk_tokens = math.ceil(total_tokens / n)
+    latency = model.predict(chunk_tokens)
+    dispatch = max(n - budget.burst, 0) / budget.calls_per_sec if budget.calls_per_sec else 0.0
+    if budget.tokens_per_sec:
+        dispatch = max(dispatch, max(n * estimate_request_tokens(chunk_tokens) - budget.token_burst, 0) / budget.tokens_per_sec)
+    waves = math.ceil(n / budget.concurrency)
+    return max(dispatch, (waves - 1) * latency) + latency
+
+
+def choose_max_tokens(
+    total_tokens: int,
+    router: LLMRouter,
+    floor: int = CHUNK_TOKENS_MIN,
+    ceiling: int = CHUNK_TOKENS_MAX
+) -> Tuple[int, dict]:
+    """
+        Picks the max_tokens of CHUNK_SIZE_LADDER within [floor, ceiling] minimizing the predicted makespan
+        of a book of total_tokens under the router's current rate-limit budget.
+        Returns (max_tokens, details of the prediction).
+    """
+    if not CHUNK_TUNING:
+        return MAX_TOKENS, { "source": "fixed" }
+
+    model = current_latency_model()
+    budget = ThroughputBudget.from_router(router)
+    candidates = [m for m in CHUNK_SIZE_LADDER if floor <= m <= ceiling] or [min(max(MAX_TOKENS, floor), ceiling)]
+    best, best_time = candidates[0], None
+    for m in candidates:
+        predicted = predict_makespan(total_tokens, m, model, budget)
+        if best_time is None or predicted < best_time * (1 - TIE_TOLERANCE):
+            best, best_time = m, predicted
+        if m >= total_tokens:
+            # larger sizes give the same single chunk
+            break
+    return best, {
+        "source": model.source,
+        "overhead_s": round(model.overhead, 3),
+        "ms_per_token": round(model.per_token * 1000, 3),
+        "predicted_s": round(best_time, 1)
+    }
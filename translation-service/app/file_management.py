@@ -1,11 +1,23 @@
 import os
-import re
+import sqlite3
+import threading
 import time
+from dotenv import load_dotenv
 from pathlib import Path
+from typing import BinaryIO
 
-from app.utils.str_utils import generate_file_name, generate_file_regex_pattern
+from app.job_handler import create_book_id, create_job_id
+from app.metrics import BOOK_CACHE_LOOKUPS, FILE_IO_SECONDS, timed
+from app.utils.compression import CompressedWriter, decompress_text
+from app.utils.str_utils import canonize_str, generate_file_name, parse_file_name
+
+load_dotenv()
 
 TRANSLATED_BOOK_CACHE = "translated_books_cache"
+CACHE_INDEX_FILE = "index.sqlite3"
+# eviction bounds of the translated book cache, by total bytes and by number of books
+MAX_CACHE_BYTES = int(os.getenv("MAX_CACHE_BYTES", 1024 * 1024 * 1024))
+MAX_CACHE_ENTRIES = int(os.getenv("MAX_CACHE_ENTRIES", 1000))
 
 class BookInfo:
     def __init__(self) -> None:
@@ -29,67 +41,288 @@ class BookInfo:
         self.trans_title = fields[2]
         self.trans_author = fields[3]
 
+    def is_complete(self) -> bool:
+        return (
+            bool(self.origin_title) and
+            bool(self.origin_author) and
+            self.origin_title != "NA" and
+            self.origin_author != "NA"
+        )
+
+    @classmethod
+    def from_dict(cls, info: dict) -> "BookInfo":
+        res = cls()
+        res.set_book_info([
+            info.get("origin_title", "NA"),
+            info.get("origin_author", "NA"),
+            info.get("trans_title", "NA"),
+            info.get("trans_author", "NA")
+        ])
+        return res
+
+
+# ------ CACHE INDEX ----------
+
+_indexes: dict[str, sqlite3.Connection] = {}
+_index_lock = threading.RLock()
+
+
+def _open_index(folder: str) -> sqlite3.Connection:
+    """
+        Returns this process' connection to the folder's SQLite index, creating it on first use.
+        A new index is seeded with the books already in the folder (e.g. after a migration).
+    """
+    folder = os.path.abspath(folder)
+    with _index_lock:
+        conn = _indexes.get(folder)
+        if conn is None:
+            os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(
+                os.path.join(folder, CACHE_INDEX_FILE),
+                timeout=30,
+                isolation_level=None,
+                check_same_thread=False
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS books ("
+                "key TEXT PRIMARY KEY, file_name TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL, "
+                "book_id TEXT NOT NULL, language TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS books_last_access ON books (last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS books_book_id ON books (book_id)")
+            _indexes[folder] = conn
+            if conn.execute("SELECT COUNT(*) FROM books").fetchone()[0] == 0:
+                index_existing_files(folder)
+        return conn
 
+
+def index_existing_files(folder: str = TRANSLATED_BOOK_CACHE) -> int:
+    """
+        Adds every book file of the folder that the index doesn't know yet, using its mtime as last access.
+        Titles and authors truncated in the file name won't match lookups and simply age out.
+        Returns the number of indexed files.
+    """
+    conn = _open_index(folder)
+    rows = []
+    for entry in os.scandir(folder):
+        fields = parse_file_name(entry.name)
+        if fields is None:
+            continue
+        origin_title, origin_author, language = fields[:3]
+        stat = entry.stat()
+        rows.append((
+            create_job_id(origin_title, origin_author, language),
+            entry.name,
+            stat.st_size,
+            stat.st_mtime,
+            create_book_id(origin_title, origin_author),
+            language
+        ))
+    conn.executemany(
+        "INSERT OR IGNORE INTO books (key, file_name, size, last_access, book_id, language) VALUES (?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    return len(rows)
+
+# ------ BOOK STORAGE ----------
+
+@timed(FILE_IO_SECONDS, op="read")
 def read_file_in_local_storage(
     origin_title: str = "",
     origin_author: str = "",
+    language: str = "",
     folder: str = TRANSLATED_BOOK_CACHE
 ) -> str:
-    # ensure dir exists
-    os.makedirs(folder, exist_ok=True)
-
-    # find file
+    """
+        Looks the book up in the cache index (one primary-key query) and returns its text, or "" if not cached.
+        Records the access time in the index, so recency doesn't depend on filesystem atime.
+    """
     try:
-        if origin_title and origin_author:
-            regex_pattern = generate_file_regex_pattern(origin_title, origin_author)
-        else:
-            raise ValueError("Missing Title and Author")
-        
-        text = ""
-        for entry in os.scandir(folder):
-            if regex_pattern.match(entry.name):
-                os.utime(entry.path)
-                LRU_update(folder)
-                with open(entry.path, "r", encoding="utf-8") as f:
-                    text = f.read()
-                break
+        if not (origin_title and origin_author and language):
+            raise ValueError("Missing Title, Author or Language")
+
+        conn = _open_index(folder)
+        key = create_job_id(origin_title, origin_author, language)
+        row = conn.execute("SELECT file_name FROM books WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            BOOK_CACHE_LOOKUPS.labels(result="miss").inc()
+            return ""
+        try:
+            with open(Path(folder) / row[0], "rb") as f:
+                text = decompress_text(f.read())
+        except FileNotFoundError:
+            # removed behind the index's back
+            conn.execute("DELETE FROM books WHERE key = ?", (key,))
+            BOOK_CACHE_LOOKUPS.labels(result="miss").inc()
+            return ""
+        conn.execute("UPDATE books SET last_access = ? WHERE key = ?", (time.time(), key))
+        BOOK_CACHE_LOOKUPS.labels(result="hit").inc()
         return text
     except Exception as e:
         print(f"An error has occured in file_management: {e}")
 
 
+def list_local_languages(
+    origin_title: str,
+    origin_author: str,
+    folder: str = TRANSLATED_BOOK_CACHE
+) -> dict:
+    """
+        Lists the languages the book is cached in on disk as { language: job_id } (one indexed query).
+        Unlike the Redis language index, this covers books whose Redis state expired or was never written
+        (e.g. migrated ones).
+    """
+    conn = _open_index(folder)
+    rows = conn.execute(
+        "SELECT language, key FROM books WHERE book_id = ?",
+        (create_book_id(origin_title, origin_author),)
+    ).fetchall()
+    return dict(rows)
+
+
+class CompressedOutput:
+    """
+        Target of a CompressedWriter: passes the compressed bytes to the file and, if kept, buffers them until drained.
+    """
+    def __init__(self, f: BinaryIO, keep: bool):
+        self.f = f
+        self.kept = bytearray() if keep else None
+
+    def write(self, data: bytes) -> int:
+        if self.kept is not None:
+            self.kept += data
+        return self.f.write(data)
+
+    def flush(self) -> None:
+        self.f.flush()
+
+
+class BookFileWriter:
+    """
+        Writes a translated book to the cache folder piece by piece, compressed as it is written into a temp file,
+        so the whole book is never held in memory. commit() renames the file into place, records it in the cache
+        index and evicts as write_file_to_local_storage does; abort() drops it.
+        With keep_output, the compressed bytes written so far can be taken with drain() (e.g. to copy them to Redis).
+    """
+    def __init__(
+        self,
+        origin_title: str,
+        origin_author: str,
+        trans_title: str,
+        trans_author: str,
+        language: str,
+        folder: str = TRANSLATED_BOOK_CACHE,
+        keep_output: bool = False
+    ):
+        self.conn = _open_index(folder)
+        self.folder = folder
+        self.key = create_job_id(origin_title, origin_author, language)
+        self.book_id = create_book_id(origin_title, origin_author)
+        self.language = canonize_str(language)
+        # filename sanitized and truncated to avoid OS limits
+        self.file_name = generate_file_name(origin_title, origin_author, language, trans_title, trans_author)
+        self.path = Path(folder) / self.file_name
+        self.tmp = self.path.with_name(f".{self.file_name}.{os.getpid()}.tmp")
+        self.file = open(self.tmp, "wb")
+        self.output = CompressedOutput(self.file, keep_output)
+        # the .txt name is kept for the index; the content starts with a compression marker
+        self.writer = CompressedWriter(self.output)
+
+    def write(self, text: str) -> None:
+        self.writer.write(text)
+
+    def drain(self) -> bytes:
+        data = bytes(self.output.kept)
+        self.output.kept.clear()
+        return data
+
+    def close(self) -> None:
+        """
+            Ends the compressed stream; drain() then returns its last bytes.
+        """
+        if not self.file.closed:
+            self.writer.close()
+            self.file.close()
+
+    def commit(self) -> str:
+        """
+            Moves the finished file into place atomically and indexes it. Returns its path.
+        """
+        self.close()
+        os.replace(self.tmp, self.path)
+
+        old = self.conn.execute("SELECT file_name FROM books WHERE key = ?", (self.key,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO books (key, file_name, size, last_access, book_id, language) VALUES (?, ?, ?, ?, ?, ?)",
+            (self.key, self.file_name, self.path.stat().st_size, time.time(), self.book_id, self.language)
+        )
+        if old and old[0] != self.file_name:
+            # an older translation of the same book and language
+            (Path(self.folder) / old[0]).unlink(missing_ok=True)
+        LRU_update(self.folder, keep=self.key)
+        return str(self.path)
+
+    def abort(self) -> None:
+        self.file.close()
+        self.tmp.unlink(missing_ok=True)
+
+
+@timed(FILE_IO_SECONDS, op="write")
 def write_file_to_local_storage(
     translated_text: str,
     origin_title: str,
     origin_author: str,
     trans_title: str,
     trans_author: str,
+    language: str,
     folder: str = TRANSLATED_BOOK_CACHE
 ) -> str:
-    print(f"[DEBUG] write_file_to_local_storage: cwd={os.getcwd()}")  # todo: remove when done
-    # ensure dir exists
-    os.makedirs(folder, exist_ok=True)
-    print(f"Writing to path: {os.path.abspath(folder)}")  # todo: remove when done
-
-    # filename sanitized and truncated to avoid OS limits
-    file_name = generate_file_name(origin_title, origin_author, trans_title, trans_author)
-    path = Path(folder) / file_name
-
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(translated_text)
-    print(f"[WRITE] File written!")  # todo: remove when done
-    # Maintain only the LRU top 10
-    os.utime(path)
-    LRU_update(folder)
-
-    return str(path)
-
-
-def LRU_update(folder: str, n: int = 10) -> None:
-    files = sorted(
-                Path(folder).glob("*.txt"),
-                key=lambda f: f.stat().st_atime,
-                reverse=True
-            )
-    for f in files[n:]:
-        os.remove(f)
\ No newline at end of file
+    """
+        Writes the book compressed and atomically (temp file, then rename), records it in the cache index
+        and evicts the least recently used books beyond MAX_CACHE_BYTES / MAX_CACHE_ENTRIES.
+        Returns the path of the written file.
+    """
+    writer = BookFileWriter(origin_title, origin_author, trans_title, trans_author, language, folder)
+    try:
+        writer.write(translated_text)
+        return writer.commit()
+    except Exception:
+        writer.abort()
+        raise
+
+
+@timed(FILE_IO_SECONDS, op="evict")
+def LRU_update(
+    folder: str,
+    max_bytes: int | None = None,
+    max_entries: int | None = None,
+    keep: str | None = None
+) -> int:
+    """
+        Evicts least recently used books until the cache fits in max_bytes and max_entries.
+        The keep entry (the book just written) is never evicted.
+        Returns the number of evicted books.
+    """
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    max_entries = MAX_CACHE_ENTRIES if max_entries is None else max_entries
+    conn = _open_index(folder)
+    total_bytes, entries = conn.execute("SELECT COALESCE(SUM(size), 0), COUNT(*) FROM books").fetchone()
+    if total_bytes <= max_bytes and entries <= max_entries:
+        return 0
+
+    evicted = []
+    for key, file_name, size in conn.execute("SELECT key, file_name, size FROM books ORDER BY last_access").fetchall():
+        if total_bytes <= max_bytes and entries <= max_entries:
+            break
+        if key == keep:
+            continue
+        evicted.append((key, file_name))
+        total_bytes -= size
+        entries -= 1
+
+    conn.executemany("DELETE FROM books WHERE key = ?", [(key,) for key, _ in evicted])
+    for _, file_name in evicted:
+        (Path(folder) / file_name).unlink(missing_ok=True)
+    return len(evicted)
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import time
+from collections import deque
+from dotenv import load_dotenv
+from typing import Awaitable, Callable, TypeVar
+
+from app.metrics import HEDGED_REQUESTS
+
+load_dotenv()
+
+# off by default: a hedge spends a second request of the rate limit on the same chunk
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+# fire the hedge once a request runs past this percentile of the latency seen for its size
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", 0.95))
+# at most this fraction of recent requests may be hedged
+HEDGE_MAX_RATE = float(os.getenv("HEDGE_MAX_RATE", 0.1))
+# no per-request deadline when 0; a timed out chunk is requeued with backoff
+CHUNK_TIMEOUT = float(os.getenv("CHUNK_TIMEOUT", 300))
+
+LATENCY_BUCKET_TOKENS = 250
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 20
+HEDGE_RATE_WINDOW = 500
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """
+        Rolling request latencies per chunk size, in buckets of LATENCY_BUCKET_TOKENS tokens.
+        Keeps the last LATENCY_WINDOW samples per bucket, so it follows the provider's current speed.
+    """
+    def __init__(self, bucket_tokens: int = LATENCY_BUCKET_TOKENS, window: int = LATENCY_WINDOW):
+        self.bucket_tokens = bucket_tokens
+        self.window = window
+        self.samples: dict[int, deque] = {}
+
+    def bucket(self, tokens: int) -> int:
+        return tokens // self.bucket_tokens
+
+    def record(self, tokens: int, seconds: float) -> None:
+        self.samples.setdefault(self.bucket(tokens), deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, tokens: int, q: float, min_samples: int = MIN_LATENCY_SAMPLES) -> float | None:
+        """
+            Returns the q-quantile latency of requests of about this size, or None with too few samples.
+        """
+        samples = self.samples.get(self.bucket(tokens))
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+    def stats(self) -> dict:
+        """
+            Returns p50/p95/max latency per bucket, keyed by the bucket's lower token bound.
+        """
+        res = {}
+        for bucket, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+            res[bucket * self.bucket_tokens] = {
+                "samples": len(ordered),
+                "p50": ordered[len(ordered) // 2],
+                "p95": ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)],
+                "max": ordered[-1]
+            }
+        return res
+
+
+class HedgeBudget:
+    """
+        Caps hedges at max_rate of the primary requests among the last window events.
+    """
+    def __init__(self, max_rate: float = HEDGE_MAX_RATE, window: int = HEDGE_RATE_WINDOW):
+        self.max_rate = max_rate
+        # 0 for a primary request, 1 for a hedge
+        self.events = deque(maxlen=window)
+
+    def on_request(self) -> None:
+        self.events.append(0)
+
+    def allow(self) -> bool:
+        """
+            Whether one more hedge keeps the hedge rate within max_rate. Only on_hedge() books it.
+        """
+        hedges = sum(self.events)
+        return hedges + 1 <= self.max_rate * (len(self.events) - hedges)
+
+    def on_hedge(self) -> None:
+        self.events.append(1)
+
+
+latency_tracker = LatencyTracker()
+hedge_budget = HedgeBudget()
+
+
+async def hedged_call(
+    call: Callable[[], Awaitable[T]],
+    chunk_tokens: int,
+    hedge: Callable[[], Awaitable[Callable[[], Awaitable[T]] | None]],
+    enabled: bool = HEDGE_ENABLED,
+    timeout: float = CHUNK_TIMEOUT
+) -> T:
+    """
+        Runs call() under the CHUNK_TIMEOUT deadline and records its latency for the chunk size.
+        When hedging is enabled and the request runs past the HEDGE_PERCENTILE latency of its size,
+        a second identical request is fired if the hedge rate cap allows it and hedge() returns a call,
+        i.e. some backend has rate-limit budget for it right now (see llm_router.LLMRouter.try_route).
+        The hedge call takes its backend's concurrency slot itself; call() runs in the caller's.
+        The first successful answer wins and the other request is cancelled; callers that need to know which
+        request answered (e.g. its backend) have both calls return it along with the answer.
+    """
+    start = time.monotonic()
+    hedge_budget.on_request()
+    primary = asyncio.create_task(call())
+    pending = { primary }
+    try:
+        hedge_after = latency_tracker.percentile(chunk_tokens, HEDGE_PERCENTILE) if enabled else None
+        if hedge_after is not None:
+            done, _ = await asyncio.wait(pending, timeout=min(hedge_after, timeout) if timeout else hedge_after)
+            hedge_call = await hedge() if not done and hedge_budget.allow() else None
+            # booked only once a backend had room for the hedge
+            if hedge_call is not None:
+                hedge_budget.on_hedge()
+                HEDGED_REQUESTS.inc()
+                pending.add(asyncio.create_task(hedge_call()))
+
+        deadline = start + timeout if timeout else None
+        error = None
+        while pending:
+            remaining = deadline - time.monotonic() if deadline else None
+            if remaining is not None and remaining <= 0:
+                raise asyncio.TimeoutError(f"no answer within {timeout}s")
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    # when the hedge wins, this is still a lower bound of the straggler's latency
+                    latency_tracker.record(chunk_tokens, time.monotonic() - start)
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        # cancel the losing (or timed out) request so it stops holding a connection
+        for task in pending:
+            task.cancel()
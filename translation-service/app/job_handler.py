@@ -1,8 +1,249 @@
+import asyncio
 import hashlib
+import os
 import redis.asyncio as redis
+import time
+from contextlib import asynccontextmanager
 from enum import Enum
+from redis.client import NEVER_DECODE
+from typing import AsyncIterator
+
+from app.metrics import timed_redis
+from app.tracing import end_job_trace, job_trace_keys
+from app.utils.compression import compress_text, decompress_text
+from app.utils.str_utils import canonize_str, normalize_book_line
+
+TRANSLATION_QUEUE = "queue:translation"
+# ready tasks by priority, delayed retries by due time, and each task's priority while it is in flight
+READY_QUEUE = f"{TRANSLATION_QUEUE}:ready"
+DELAYED_QUEUE = f"{TRANSLATION_QUEUE}:delayed"
+TASK_PRIORITY = f"{TRANSLATION_QUEUE}:priority"
+# chunk i of a job is scheduled as if it arrived i * CHUNK_PRIORITY_SECONDS after the job:
+# opening chunks of every job go first, yet later chunks of older jobs still beat newer jobs eventually
+CHUNK_PRIORITY_SECONDS = float(os.getenv("CHUNK_PRIORITY_SECONDS", 2))
+QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", 0.5))
+RESULT_TTL = 7 * 24 * 60 * 60
+# source chunks of a streamed upload are staged this long before a job adopts them
+UPLOAD_TTL = 60 * 60
+# a finished book is assembled from windows of this many chunks
+ASSEMBLY_BATCH_CHUNKS = int(os.getenv("ASSEMBLY_BATCH_CHUNKS", 64))
+# a book is fingerprinted in pieces of this many characters
+FINGERPRINT_PIECE_CHARS = 1 << 20
+FINGERPRINT_TTL = 30 * 24 * 60 * 60
+# how long a job's event log stays replayable after its last event
+JOB_EVENTS_TTL = 60 * 60
+JOB_END_STATES = ("finished", "cancelled", "failed")
+# ids of the jobs currently running
+ACTIVE_JOBS = "jobs:active"
+# every worker process refreshes its heartbeat key; processing lists of processes without one are reclaimed
+WORKER_HEARTBEAT_TTL = int(os.getenv("WORKER_HEARTBEAT_TTL", 30))
+# a user's semaphore expires unless the job it was taken for is set up within this many seconds
+JOB_START_GRACE = 60
+# a chunk in flight is leased to its worker for this many seconds, renewed while the worker is on it
+CHUNK_LEASE_TTL = 30
+
+# Appends an event to the job's log stream under the next sequence number.
+# The stream ID is 0-<seq>, so readers resume with XREAD from the last sequence number they saw.
+APPEND_EVENT_SCRIPT = """
+local seq = redis.call('INCR', KEYS[2])
+redis.call('XADD', KEYS[1], '0-' .. seq, unpack(ARGV, 2))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return seq
+"""
+
+# One round trip per finished chunk: stores the chunk, counts completions with HLEN (O(1)),
+# updates the progress string and appends the "chunk" event. Returns the progress string.
+# The event only carries the counters; readers take the text from the chunks hash (see read_job_events).
+CHUNK_DONE_SCRIPT = """
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+local completed = redis.call('HLEN', KEYS[1])
+local progress = completed .. '/' .. ARGV[3]
+redis.call('SET', KEYS[2], progress)
+local seq = redis.call('INCR', KEYS[4])
+redis.call('XADD', KEYS[3], '0-' .. seq,
+    'event', 'chunk', 'chunk_no', ARGV[1], 'completed', completed, 'total', ARGV[3])
+redis.call('EXPIRE', KEYS[3], ARGV[4])
+redis.call('EXPIRE', KEYS[4], ARGV[4])
+return progress
+"""
+
+# Claims a job for the user (KEYS[1] semaphore) in one atomic step, so identical submissions of several users
+# run the job once. Returns -1 if the user runs a different job, 0 if the job is already running (the user joins it)
+# and 1 if the caller owns a new run: status, active set, users and start time are set, the state of a previous run is dropped.
+START_JOB_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current and current ~= ARGV[1] then
+    return -1
+end
+if redis.call('GET', KEYS[2]) == 'running' then
+    redis.call('SADD', KEYS[3], ARGV[2])
+    if not current then
+        redis.call('SET', KEYS[1], ARGV[1])
+    end
+    return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[3])
+redis.call('SET', KEYS[2], 'running')
+redis.call('SADD', KEYS[5], ARGV[1])
+redis.call('DEL', KEYS[3], KEYS[4], unpack(KEYS, 6))
+redis.call('SADD', KEYS[3], ARGV[2])
+redis.call('HSET', KEYS[4], 'email', ARGV[2], 'started_at', ARGV[4])
+return 1
+"""
+
+# Moves a job to an end state in one atomic step: sets the status, drops the working keys,
+# releases the semaphore of every user of the job (and of KEYS[6]) only if it still points at this job
+# and appends the "status" event. User semaphore keys are built here, so no user can join in between.
+END_JOB_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[1])
+redis.call('DEL', KEYS[2], KEYS[3], KEYS[4], KEYS[5])
+if redis.call('GET', KEYS[6]) == ARGV[2] then
+    redis.call('DEL', KEYS[6])
+end
+for _, user in ipairs(redis.call('SMEMBERS', KEYS[10])) do
+    local semaphore = 'user:' .. user .. ':active_job'
+    if redis.call('GET', semaphore) == ARGV[2] then
+        redis.call('DEL', semaphore)
+    end
+end
+redis.call('DEL', KEYS[10])
+redis.call('SREM', KEYS[9], ARGV[2])
+local seq = redis.call('INCR', KEYS[8])
+redis.call('XADD', KEYS[7], '0-' .. seq, 'event', 'status', 'state', ARGV[1])
+redis.call('EXPIRE', KEYS[7], ARGV[3])
+redis.call('EXPIRE', KEYS[8], ARGV[3])
+return seq
+"""
+
+
+# Promotes due retries to the ready queue, then pops the highest-priority task into the worker's processing list.
+DEQUEUE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local due = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now, 'LIMIT', 0, 100)
+for _, task in ipairs(due) do
+    redis.call('ZADD', KEYS[1], redis.call('HGET', KEYS[3], task) or now, task)
+    redis.call('ZREM', KEYS[2], task)
+end
+local head = redis.call('ZPOPMIN', KEYS[1])
+if #head == 0 then
+    return false
+end
+redis.call('RPUSH', KEYS[4], head[1])
+return head[1]
+"""
+
+# Takes up to ARGV[4] more small tasks (at most ARGV[2] source tokens each, ARGV[3] in total with the worker's task ARGV[1])
+# in the same language as ARGV[1] from the first ARGV[5] ready tasks, of any job, into the worker's processing list.
+# Token counts and languages are read from the tasks' job keys, built here. Returns the tasks taken.
+DEQUEUE_PACK_SCRIPT = """
+local function tokens(task)
+    local job_id, chunk_no = string.match(task, '^(.*):(%d+)$')
+    return tonumber(redis.call('HGET', 'job:' .. job_id .. ':source_tokens', chunk_no))
+end
+local function language(task)
+    return redis.call('HGET', 'job:' .. string.match(task, '^(.*):%d+$') .. ':meta', 'language')
+end
+local small = tonumber(ARGV[2])
+local first = tokens(ARGV[1])
+local taken = {}
+if not first or first > small then
+    return taken
+end
+local budget = tonumber(ARGV[3]) - first
+local lang = language(ARGV[1])
+for _, task in ipairs(redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[5]) - 1)) do
+    if #taken >= tonumber(ARGV[4]) or budget <= 0 then
+        break
+    end
+    local n = tokens(task)
+    if n and n <= small and n <= budget and language(task) == lang then
+        redis.call('ZREM', KEYS[1], task)
+        redis.call('RPUSH', KEYS[2], task)
+        taken[#taken + 1] = task
+        budget = budget - n
+    end
+end
+return taken
+"""
+
+# Moves a task from the worker's processing list back to the ready queue at its original priority,
+# or to the delayed queue for ARGV[2] seconds. A task no longer in the list (acknowledged already) stays put.
+REQUEUE_SCRIPT = """
+if redis.call('LREM', KEYS[4], 1, ARGV[1]) == 0 then
+    return 0
+end
+local delay = tonumber(ARGV[2])
+if delay > 0 then
+    local t = redis.call('TIME')
+    redis.call('ZADD', KEYS[2], tonumber(t[1]) + tonumber(t[2]) / 1000000 + delay, ARGV[1])
+else
+    redis.call('ZADD', KEYS[1], redis.call('HGET', KEYS[3], ARGV[1]) or 0, ARGV[1])
+end
+return 1
+"""
+
+
+# Puts the tasks of a dead worker's processing list back in the ready queue at their priority,
+# unless its process (KEYS[4] heartbeat) turned out to be alive. Returns the number of tasks.
+RECLAIM_SCRIPT = """
+if redis.call('EXISTS', KEYS[4]) == 1 then
+    return 0
+end
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local tasks = redis.call('LRANGE', KEYS[3], 0, -1)
+for _, task in ipairs(tasks) do
+    local priority = redis.call('HGET', KEYS[2], task) or now
+    redis.call('HSET', KEYS[2], task, priority)
+    redis.call('ZADD', KEYS[1], priority, task)
+end
+redis.call('DEL', KEYS[3])
+return #tasks
+"""
+
+# Removes the user ARGV[2] from the users (KEYS[1]) of the running job (KEYS[3] status) and releases their semaphore (KEYS[2]).
+# Returns 1 when nobody is left waiting for the job, so it can be cancelled, 0 while other users still wait for it,
+# and -1 if the job isn't running or the user isn't one of its users (for a job from before the users set: its owner).
+LEAVE_JOB_SCRIPT = """
+if redis.call('GET', KEYS[3]) ~= 'running' then
+    return -1
+end
+if redis.call('SCARD', KEYS[1]) == 0 then
+    if redis.call('GET', KEYS[2]) ~= ARGV[1] then
+        return -1
+    end
+    return 1
+end
+if redis.call('SREM', KEYS[1], ARGV[2]) == 0 then
+    return -1
+end
+if redis.call('GET', KEYS[2]) == ARGV[1] then
+    redis.call('DEL', KEYS[2])
+end
+if redis.call('SCARD', KEYS[1]) == 0 then
+    return 1
+end
+return 0
+"""
+
+# Deletes a lease only if ARGV[1] still holds it.
+RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Extends a lease by ARGV[2] milliseconds only if ARGV[1] still holds it.
+EXTEND_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
 
-from app.utils.str_utils import canonize_str
 
 class JobStatus(Enum):
     NO_JOB = 0
@@ -10,6 +251,12 @@ class JobStatus(Enum):
     DIFFERENT_JOB = -1
 
 
+class JobStart(Enum):
+    STARTED = 1
+    JOINED = 0
+    REFUSED = -1
+
+
 class JobCompletion(Enum):
     DONE = "DONE"
     RUNNING = "RUNNING"
@@ -17,6 +264,13 @@ class JobCompletion(Enum):
     CANCELLED = "CANCELLED"
 
 
+async def get_raw(server: redis.Redis, *command) -> object:
+    """
+        Runs a read command without decoding the reply, for values stored compressed (binary) by compress_text.
+    """
+    return await server.execute_command(*command, **{ NEVER_DECODE: True })
+
+
 def init_redis(port: int) -> redis.Redis:
     """
         Initializes and returns a Redis client connected to the specified port.
@@ -26,58 +280,237 @@ def init_redis(port: int) -> redis.Redis:
 
 def create_job_id(
     origin_title: str,
-    origin_author: str
+    origin_author: str,
+    language: str
 ) -> str:
     """
-        Creates a unique job ID based on the book's original title and author.
-        The ID is a SHA-256 hash of the canonicalized title and author, truncated to 32 characters.
+        Creates a unique job ID based on the book's original title, author and target language.
+        The ID is a SHA-256 hash of the canonicalized title, author and language, truncated to 32 characters.
     """
     canonical = (
         canonize_str(origin_title) + "|" +
-        canonize_str(origin_author)
+        canonize_str(origin_author) + "|" +
+        canonize_str(language)
     )
     
     return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
 
 
-async def start_translation_job(
+def create_book_id(origin_title: str, origin_author: str) -> str:
+    """
+        Creates a language-agnostic ID for a book, grouping all of its translations.
+    """
+    canonical = canonize_str(origin_title) + "|" + canonize_str(origin_author)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+@timed_redis
+async def register_translated_language(
     server: redis.Redis,
-    user_id: str,
+    origin_title: str,
+    origin_author: str,
+    language: str,
     job_id: str,
+    ttl: int = RESULT_TTL
+) -> None:
+    """
+        Records a finished translation of the book in the book's language index (language -> job_id).
+    """
+    key = f"book:{create_book_id(origin_title, origin_author)}:languages"
+    await server.hset(key, canonize_str(language), job_id)
+    await server.expire(key, ttl)
+
+
+@timed_redis
+async def get_translated_languages(
+    server: redis.Redis,
+    origin_title: str,
+    origin_author: str
+) -> dict:
+    """
+        Fetches every cached language variant of the book as { language: job_id }.
+    """
+    return await server.hgetall(f"book:{create_book_id(origin_title, origin_author)}:languages")
+
+
+@timed_redis
+async def get_translated_language_job(
+    server: redis.Redis,
     origin_title: str,
     origin_author: str,
-    total_chunks: int
-) -> bool:
+    language: str
+) -> str | None:
     """
-        Starts a translation job for the user if no other job is active.
-        Sets up necessary Redis keys to track the job's progress and metadata.
-        Returns True if the job was started successfully, False if another job is already active."""
-    semaphore_key = f"user:{user_id}:active_job"
+        Fetches the job_id of a finished translation of the book into language, or None (single HGET).
+    """
+    key = f"book:{create_book_id(origin_title, origin_author)}:languages"
+    return await server.hget(key, canonize_str(language))
 
-    # auto set only if job doesn't exist
-    job_status = await check_job_status(server, user_id, job_id)
-    if job_status == JobStatus.DIFFERENT_JOB:
-        return False  # different job already running for user
-    elif job_status == JobStatus.NO_JOB:
-        await server.setnx(semaphore_key, job_id)
-        await server.set(f"job:{job_id}:total_chunks", total_chunks)
-        await server.hmset(f"job:{job_id}:meta", {
-            "origin_title": origin_title,
-            "origin_author": origin_author
-        })
-    return True
+
+class BookFingerprinter:
+    """
+        Fingerprints a book text arriving in pieces: update() with each piece, then hexdigest().
+        The text is normalized as in normalize_book_text (so line endings and trailing whitespace don't change
+        the fingerprint), one line at a time as lines complete, so only the current line is buffered.
+    """
+    def __init__(self, language: str):
+        self.hash = hashlib.sha256()
+        self.hash.update(canonize_str(language).encode("utf-8"))
+        self.hash.update(b"\0")
+        self.partial = ""
+        self.started = False
+        self.blank_lines = 0
+
+    def update(self, text: str) -> None:
+        text = self.partial + text
+        # a trailing \r may be the first half of a \r\n
+        cut = len(text) - 1 if text.endswith("\r") else len(text)
+        lines = text[:cut].replace("\r\n", "\n").replace("\r", "\n").split("\n")
+        self.partial = lines.pop() + text[cut:]
+        for line in lines:
+            self.add_line(line)
+
+    def add_line(self, line: str) -> None:
+        line = normalize_book_line(line)
+        if not self.started:
+            # leading blank lines and indentation are stripped
+            line = line.lstrip()
+            if line:
+                self.started = True
+                self.hash.update(line.encode("utf-8"))
+        elif not line:
+            # held back until more text follows, trailing blank lines are stripped
+            self.blank_lines += 1
+        else:
+            self.hash.update(("\n" * (self.blank_lines + 1) + line).encode("utf-8"))
+            self.blank_lines = 0
+
+    def hexdigest(self) -> str:
+        for line in self.partial.replace("\r", "\n").split("\n"):
+            self.add_line(line)
+        self.partial = ""
+        return self.hash.hexdigest()
+
+
+def create_book_fingerprint(book: str, language: str) -> str:
+    """
+        Creates a fingerprint of the uploaded book text and target language (see BookFingerprinter).
+    """
+    fingerprinter = BookFingerprinter(language)
+    for i in range(0, len(book), FINGERPRINT_PIECE_CHARS):
+        fingerprinter.update(book[i:i + FINGERPRINT_PIECE_CHARS])
+    return fingerprinter.hexdigest()
+
+
+@timed_redis
+async def save_book_fingerprint(
+    server: redis.Redis,
+    fingerprint: str,
+    job_id: str,
+    book_info: dict,
+    ttl: int = FINGERPRINT_TTL
+) -> None:
+    """
+        Maps a book fingerprint to its translation job and book info.
+    """
+    key = f"fingerprint:{fingerprint}"
+    await server.hset(key, mapping={ "job_id": job_id, **book_info })
+    await server.expire(key, ttl)
+
+
+@timed_redis
+async def get_book_fingerprint(server: redis.Redis, fingerprint: str) -> dict | None:
+    """
+        Fetches the job_id and book info recorded for a book fingerprint, or None if unknown.
+    """
+    entry = await server.hgetall(f"fingerprint:{fingerprint}")
+    return entry or None
 
 
-async def end_translation_job(server: redis.Redis, user_id: str, job_id: str) -> None:
+@timed_redis
+async def save_cached_book_info(
+    server: redis.Redis,
+    chunk: str,
+    language: str,
+    book_info: dict,
+    ttl: int = FINGERPRINT_TTL
+) -> None:
     """
-        Ends the translation job for the user by cleaning up Redis keys.
-        Deletes the job chunks and releases the semaphore indicating no active job for the user.
+        Caches the book info extracted from a first chunk, keyed by a hash of the chunk and language.
     """
-    semaphore_key =  f"user:{user_id}:active_job"
-    await server.delete(f"job:{job_id}:chunks")
-    await server.delete(semaphore_key)
+    key = f"bookinfo:{create_book_fingerprint(chunk, language)}"
+    await server.hset(key, mapping=book_info)
+    await server.expire(key, ttl)
+
 
+@timed_redis
+async def get_cached_book_info(server: redis.Redis, chunk: str, language: str) -> dict | None:
+    """
+        Fetches book info previously extracted from the same first chunk and language, or None.
+    """
+    entry = await server.hgetall(f"bookinfo:{create_book_fingerprint(chunk, language)}")
+    return entry or None
 
+
+@timed_redis
+async def start_translation_job(
+    server: redis.Redis,
+    user_id: str,
+    job_id: str,
+    book_info: dict,
+    language: str,
+    total_chunks: int,
+    max_tokens: int | None = None,
+    model: str | None = None
+) -> JobStart:
+    """
+        Starts a translation job for the user if no other job of theirs is active.
+        The job runs once however many users submit it: the first submission owns the run and sets up the Redis keys
+        tracking its progress and metadata, including the chunk size it was split with, the translation model and its
+        start time, so the job can be resumed by any process (see recover_orphaned_jobs).
+        Later submissions, by any user, join the running job and share its progress and result.
+        Returns JobStart.STARTED for the owner, JobStart.JOINED if the job was already running
+        and JobStart.REFUSED if another job of the user is active."""
+    semaphore_key = f"user:{user_id}:active_job"
+    script = server.register_script(START_JOB_SCRIPT)
+    # the user's semaphore expires by itself if this process dies before the job is set up
+    start = JobStart(await script(
+        keys=[
+            semaphore_key,
+            f"job:{job_id}:status",
+            f"job:{job_id}:users",
+            f"job:{job_id}:meta",
+            ACTIVE_JOBS,
+            # state of a previous run
+            f"job:{job_id}:finalizing",
+            f"job:{job_id}:events",
+            f"job:{job_id}:events:seq",
+            *job_trace_keys(job_id)
+        ],
+        args=[job_id, user_id, JOB_START_GRACE, time.time()]
+    ))
+    if start != JobStart.STARTED:
+        return start
+
+    async with server.pipeline(transaction=True) as pipe:
+        pipe.set(f"job:{job_id}:total_chunks", total_chunks)
+        pipe.hset(f"job:{job_id}:meta", mapping={
+            **book_info,
+            "language": language,
+            **({ "max_tokens": max_tokens } if max_tokens else {}),
+            **({ "model": model } if model else {})
+        })
+        pipe.persist(semaphore_key)
+        await pipe.execute()
+    await append_job_event(server, job_id, "status", {
+        "state": "running",
+        "total": total_chunks,
+        **({ "max_tokens": max_tokens } if max_tokens else {})
+    })
+    return start
+
+
+@timed_redis
 async def check_user_allowed(server: redis.Redis, user_id: str) -> bool:
     """
         Checks if the user is allowed to start a new translation job.
@@ -89,6 +522,7 @@ async def check_user_allowed(server: redis.Redis, user_id: str) -> bool:
     return True
 
 
+@timed_redis
 async def check_job_status(server: redis.Redis, user_id: str, job_id: str) -> JobStatus:
     """
         Checks the status of a translation job for the user.
@@ -106,6 +540,7 @@ async def check_job_status(server: redis.Redis, user_id: str, job_id: str) -> Jo
         return JobStatus.DIFFERENT_JOB
     
 
+@timed_redis
 async def get_last_user_job(server: redis.Redis, user_id: str) -> dict:
     """
         Fetches metadata of the last translation job for the given user ID.
@@ -118,6 +553,7 @@ async def get_last_user_job(server: redis.Redis, user_id: str) -> dict:
     return { "job_id": job_id, **metadata }
 
 
+@timed_redis
 async def update_translation_job_progress(
     server: redis.Redis,     
     job_id: str,
@@ -130,45 +566,143 @@ async def update_translation_job_progress(
         Also updates the overall progress status in the format "completed_chunks/total_chunks".
         Returns the updated progress string.
     """
-    completed_chunks = len(set(map(int, await server.hkeys(f"job:{job_id}:chunks"))))
-    progress = f"{completed_chunks}/{total_chunks}"
-    await server.hset(f"job:{job_id}:chunks", chunk_no, translated_chunk)
-    await server.set(f"job:{job_id}:progress", progress)
-    return progress
+    script = server.register_script(CHUNK_DONE_SCRIPT)
+    return await script(
+        keys=[
+            f"job:{job_id}:chunks",
+            f"job:{job_id}:progress",
+            f"job:{job_id}:events",
+            f"job:{job_id}:events:seq"
+        ],
+        args=[chunk_no, compress_text(translated_chunk), total_chunks, JOB_EVENTS_TTL]
+    )
 
 
+@timed_redis
 async def fetch_saved_chunks(server: redis.Redis, job_id: str) -> list[str]:
     """
         Fetches all saved translated chunks for the given job_id from Redis.
         Returns a list of translated chunks ordered by their chunk number.
     """
-    chunks = await server.hgetall(f"job:{job_id}:chunks")
-    keys = sorted(map(int, chunks.keys()))
-    ordered_chunks = [chunks[str(k)] for k in keys]
+    chunks = await get_raw(server, "HGETALL", f"job:{job_id}:chunks")
+    chunks = { int(k): v for k, v in chunks.items() }
+    ordered_chunks = [decompress_text(chunks[k]) for k in sorted(chunks)]
     return ordered_chunks
 
 
-async def complete_translation_job(server: redis.Redis, user_id: str, job_id: str) -> list[str]:
+async def iter_saved_chunk_batches(
+    server: redis.Redis,
+    job_id: str,
+    batch_size: int = ASSEMBLY_BATCH_CHUNKS
+) -> AsyncIterator[list[str]]:
+    """
+        Yields the saved translated chunks of the job in chunk order, batch_size chunks per HMGET,
+        so assembling a book holds one window of chunks instead of the whole hash.
+        Missing chunks are skipped, like fetch_saved_chunks does.
     """
-        Completes the translation job by fetching all saved chunks and marking the job as finished.
+    total = await get_total_chunks(server, job_id)
+    for start in range(0, total, batch_size):
+        window = await get_raw(server, "HMGET", f"job:{job_id}:chunks", *range(start, min(start + batch_size, total)))
+        yield [decompress_text(c) for c in window if c is not None]
+
+
+@timed_redis
+async def complete_translation_job(server: redis.Redis, user_id: str, job_id: str) -> None:
+    """
+        Completes the translation job by marking it as finished.
         Cleans up Redis keys related to the job and releases the semaphore for the user.
-        Returns the list of translated chunks.
     """
-    translations = await fetch_saved_chunks(server, job_id)
-    await server.set(f"job:{job_id}:status", "finished")
-    await end_translation_job(server, user_id, job_id)
-    return translations
+    await finish_translation_job(server, user_id, job_id, "finished")
+
+
+@timed_redis
+async def cancel_translation_job(server: redis.Redis, user_id: str, job_id: str) -> bool | None:
+    """
+        Withdraws the user from the running translation job for the given job_id.
+        The job is only cancelled (marked as cancelled in Redis, related keys cleaned up) once no other user waits for it.
+        Returns True if the job was cancelled, False if it keeps running for other users
+        and None if it isn't a running job of the user (finished jobs stay finished).
+    """
+    script = server.register_script(LEAVE_JOB_SCRIPT)
+    left = await script(
+        keys=[f"job:{job_id}:users", f"user:{user_id}:active_job", f"job:{job_id}:status"],
+        args=[job_id, user_id]
+    )
+    if left < 0:
+        return None
+    if left == 0:
+        return False
+    await finish_translation_job(server, user_id, job_id, "cancelled")
+    return True
+
+
+@timed_redis
+async def finish_translation_job(server: redis.Redis, user_id: str, job_id: str, state: str) -> None:
+    """
+        Atomically sets the job's end state, cleans up its working keys, releases the semaphores of the user and of every
+        user who joined the job (if they still belong to this job), drops it from the active jobs and publishes the state
+        to the job's event log.
+        Closes the job's trace with the state.
+    """
+    script = server.register_script(END_JOB_SCRIPT)
+    await script(
+        keys=[
+            f"job:{job_id}:status",
+            f"job:{job_id}:chunks",
+            f"job:{job_id}:source",
+            f"job:{job_id}:source_tokens",
+            f"job:{job_id}:attempts",
+            f"user:{user_id}:active_job",
+            f"job:{job_id}:events",
+            f"job:{job_id}:events:seq",
+            ACTIVE_JOBS,
+            f"job:{job_id}:users"
+        ],
+        args=[state, job_id, JOB_EVENTS_TTL]
+    )
+    await end_job_trace(server, job_id, state)
+
+
+@timed_redis
+async def get_completed_chunks(server: redis.Redis, job_id: str) -> tuple[int, int]:
+    """
+        Returns (completed, total) chunk counts of the job in one round trip, without listing the chunk hash.
+    """
+    async with server.pipeline(transaction=False) as pipe:
+        pipe.hlen(f"job:{job_id}:chunks")
+        pipe.get(f"job:{job_id}:total_chunks")
+        completed, total = await pipe.execute()
+    return completed, int(total) if total else 0
 
 
-async def cancel_translation_job(server: redis.Redis, user_id: str, job_id: str) -> None:
+@timed_redis
+async def get_chunk_task_context(server: redis.Redis, job_id: str, chunk_no: int) -> dict:
     """
-        Cancels an ongoing translation job for the given job_id and user ID.
-        Marks the job as cancelled in Redis and cleans up related keys.
+        Fetches everything a worker needs for one chunk task in one round trip:
+        source chunk, its token count, job state, metadata, total chunk count, the chunk's failed rounds so far
+        and whether it is translated already.
     """
-    await server.set(f"job:{job_id}:status", "cancelled")
-    await end_translation_job(server, user_id, job_id)
+    async with server.pipeline(transaction=False) as pipe:
+        pipe.hget(f"job:{job_id}:source", chunk_no)
+        pipe.hget(f"job:{job_id}:source_tokens", chunk_no)
+        pipe.get(f"job:{job_id}:status")
+        pipe.hgetall(f"job:{job_id}:meta")
+        pipe.get(f"job:{job_id}:total_chunks")
+        pipe.hget(f"job:{job_id}:attempts", chunk_no)
+        pipe.hexists(f"job:{job_id}:chunks", chunk_no)
+        chunk, tokens, state, meta, total, failed_rounds, translated = await pipe.execute()
+    return {
+        "chunk": chunk,
+        "translated": bool(translated),
+        "chunk_tokens": int(tokens) if tokens is not None else None,
+        "state": state,
+        "meta": meta,
+        "total_chunks": int(total) if total else 0,
+        "failed_rounds": int(failed_rounds) if failed_rounds else 0
+    }
 
 
+@timed_redis
 async def get_todo_job_chunks(server: redis.Redis, job_id: str) -> set:
     """
         Fetches the indices of chunks that are yet to be translated for the given job_id.
@@ -180,10 +714,499 @@ async def get_todo_job_chunks(server: redis.Redis, job_id: str) -> set:
     return sorted(all_indices-completed_indices)
 
 
+@timed_redis
 async def get_total_chunks(server: redis.Redis, job_id: str) -> int:
     """
         Fetches the total number of chunks for the given job_id from Redis.
         Returns the total chunk count as an integer.
     """
     total_chunks = await server.get(f"job:{job_id}:total_chunks")
-    return int(total_chunks) if total_chunks else 0
\ No newline at end of file
+    return int(total_chunks) if total_chunks else 0
+
+
+@timed_redis
+async def get_job_meta(server: redis.Redis, job_id: str) -> dict:
+    """
+        Fetches the metadata (book info, language and owner email) stored for the given job_id.
+    """
+    return await server.hgetall(f"job:{job_id}:meta")
+
+
+@timed_redis
+async def get_job_state(server: redis.Redis, job_id: str) -> str | None:
+    """
+        Fetches the lifecycle state of the job: "running", "finished", "cancelled" or "failed".
+        Returns None if the job was never started.
+    """
+    return await server.get(f"job:{job_id}:status")
+
+
+@timed_redis
+async def fail_translation_job(server: redis.Redis, user_id: str, job_id: str) -> None:
+    """
+        Marks the job as failed after a chunk ran out of attempts and cleans up related keys.
+    """
+    await finish_translation_job(server, user_id, job_id, "failed")
+
+
+@timed_redis
+async def save_source_chunks(
+    server: redis.Redis,
+    job_id: str,
+    chunks: list[str],
+    token_counts: list[int] | None = None
+) -> None:
+    """
+        Persists the source chunks of a job (and their token counts, if known) so that any worker process can translate them.
+    """
+    await server.delete(f"job:{job_id}:source", f"job:{job_id}:source_tokens")
+    if chunks:
+        await server.hset(f"job:{job_id}:source", mapping={ i: c for i, c in enumerate(chunks) })
+    if token_counts:
+        await server.hset(f"job:{job_id}:source_tokens", mapping={ i: n for i, n in enumerate(token_counts) })
+
+
+@timed_redis
+async def stage_upload_chunks(
+    server: redis.Redis,
+    upload_id: str,
+    first_chunk_no: int,
+    chunks: list[tuple[str, int]]
+) -> None:
+    """
+        Persists (chunk, token_count) pairs of a streamed upload, numbered from first_chunk_no, as they are formed.
+        They are staged under the upload until the job they belong to is known and adopts them (see adopt_upload_chunks).
+    """
+    async with server.pipeline(transaction=False) as pipe:
+        pipe.hset(f"upload:{upload_id}:source", mapping={ first_chunk_no + i: c for i, (c, _) in enumerate(chunks) })
+        pipe.hset(f"upload:{upload_id}:source_tokens", mapping={ first_chunk_no + i: n for i, (_, n) in enumerate(chunks) })
+        pipe.expire(f"upload:{upload_id}:source", UPLOAD_TTL)
+        pipe.expire(f"upload:{upload_id}:source_tokens", UPLOAD_TTL)
+        await pipe.execute()
+
+
+@timed_redis
+async def adopt_upload_chunks(server: redis.Redis, upload_id: str, job_id: str) -> None:
+    """
+        Makes the staged chunks of an upload the job's source chunks, replacing any previous ones.
+        The hashes are renamed, not copied.
+    """
+    async with server.pipeline(transaction=True) as pipe:
+        pipe.rename(f"upload:{upload_id}:source", f"job:{job_id}:source")
+        pipe.rename(f"upload:{upload_id}:source_tokens", f"job:{job_id}:source_tokens")
+        pipe.persist(f"job:{job_id}:source")
+        pipe.persist(f"job:{job_id}:source_tokens")
+        await pipe.execute()
+
+
+@timed_redis
+async def discard_upload(server: redis.Redis, upload_id: str) -> None:
+    """
+        Drops the staged chunks of an upload that did not start a job.
+    """
+    await server.delete(f"upload:{upload_id}:source", f"upload:{upload_id}:source_tokens")
+
+
+@timed_redis
+async def get_source_chunk(server: redis.Redis, job_id: str, chunk_no: int) -> str | None:
+    """
+        Fetches a single source chunk of the job, or None if the job's sources were cleaned up.
+    """
+    return await server.hget(f"job:{job_id}:source", chunk_no)
+
+
+@timed_redis
+async def get_source_chunk_tokens(server: redis.Redis, job_id: str, chunk_no: int) -> int | None:
+    """
+        Fetches the token count the chunker recorded for a source chunk, or None if unknown.
+    """
+    n = await server.hget(f"job:{job_id}:source_tokens", chunk_no)
+    return int(n) if n is not None else None
+
+
+def encode_chunk_task(job_id: str, chunk_no: int) -> str:
+    return f"{job_id}:{chunk_no}"
+
+
+def decode_chunk_task(task: str) -> tuple[str, int]:
+    job_id, chunk_no = task.rsplit(":", 1)
+    return job_id, int(chunk_no)
+
+
+@timed_redis
+async def enqueue_chunk_tasks(server: redis.Redis, job_id: str, chunk_indices: list[int]) -> int:
+    """
+        Adds one task per chunk index to the shared priority queue, lower chunk indices first.
+        Any worker process connected to the same Redis can consume them.
+        Returns the number of ready tasks after the push.
+    """
+    if not chunk_indices:
+        return await server.zcard(READY_QUEUE)
+    base = time.time()
+    tasks = { encode_chunk_task(job_id, i): base + i * CHUNK_PRIORITY_SECONDS for i in chunk_indices }
+    async with server.pipeline(transaction=True) as pipe:
+        pipe.hset(TASK_PRIORITY, mapping=tasks)
+        pipe.zadd(READY_QUEUE, tasks)
+        pipe.zcard(READY_QUEUE)
+        res = await pipe.execute()
+    return res[-1]
+
+
+async def dequeue_chunk_task(
+    server: redis.Redis,
+    worker_id: str,
+    timeout: float = 5
+) -> tuple[str, int] | None:
+    """
+        Waits up to timeout seconds for the highest-priority chunk task (polling every QUEUE_POLL_INTERVAL).
+        The task is atomically moved to the worker's processing list until it is acknowledged,
+        so a crashed worker never silently loses a task.
+        Returns (job_id, chunk_no), or None on timeout.
+    """
+    script = server.register_script(DEQUEUE_SCRIPT)
+    deadline = time.monotonic() + timeout
+    while True:
+        task = await script(keys=[
+            READY_QUEUE, DELAYED_QUEUE, TASK_PRIORITY, f"{TRANSLATION_QUEUE}:processing:{worker_id}"
+        ])
+        if task is not None:
+            return decode_chunk_task(task)
+        if time.monotonic() >= deadline:
+            return None
+        await asyncio.sleep(QUEUE_POLL_INTERVAL)
+
+
+@timed_redis
+async def dequeue_packable_chunk_tasks(
+    server: redis.Redis,
+    worker_id: str,
+    job_id: str,
+    chunk_no: int,
+    small_tokens: int,
+    budget_tokens: int,
+    max_tasks: int,
+    scan: int = 100
+) -> list[tuple[str, int]]:
+    """
+        Takes more ready tasks to translate in one request with the worker's task (job_id, chunk_no), if it is small:
+        up to max_tasks chunks of at most small_tokens, from any job with the same language, within budget_tokens
+        source tokens together, picked from the scan highest-priority ready tasks.
+        They are moved to the worker's processing list like dequeue_chunk_task does. Returns their (job_id, chunk_no).
+    """
+    script = server.register_script(DEQUEUE_PACK_SCRIPT)
+    tasks = await script(
+        keys=[READY_QUEUE, f"{TRANSLATION_QUEUE}:processing:{worker_id}"],
+        args=[encode_chunk_task(job_id, chunk_no), small_tokens, budget_tokens, max_tasks, scan]
+    )
+    return [decode_chunk_task(t) for t in tasks]
+
+
+@timed_redis
+async def ack_chunk_task(server: redis.Redis, worker_id: str, job_id: str, chunk_no: int) -> None:
+    """
+        Removes a finished (or dropped) task from the worker's processing list.
+    """
+    task = encode_chunk_task(job_id, chunk_no)
+    async with server.pipeline(transaction=True) as pipe:
+        pipe.lrem(f"{TRANSLATION_QUEUE}:processing:{worker_id}", 1, task)
+        pipe.hdel(TASK_PRIORITY, task)
+        await pipe.execute()
+
+
+@timed_redis
+async def drop_duplicate_chunk_task(server: redis.Redis, worker_id: str, job_id: str, chunk_no: int) -> None:
+    """
+        Removes a copy of a task from the worker's processing list while another worker holds the chunk's lease.
+        Unlike ack_chunk_task the task stays tracked in TASK_PRIORITY, as the copy in flight is still live.
+    """
+    await server.lrem(f"{TRANSLATION_QUEUE}:processing:{worker_id}", 1, encode_chunk_task(job_id, chunk_no))
+
+
+@timed_redis
+async def requeue_chunk_task(
+    server: redis.Redis,
+    worker_id: str,
+    job_id: str,
+    chunk_no: int,
+    delay: float = 0
+) -> None:
+    """
+        Moves a task from the worker's processing list back to the queue at its original priority.
+        With a delay, the task only becomes ready again after delay seconds (retry backoff) and frees the worker meanwhile.
+    """
+    script = server.register_script(REQUEUE_SCRIPT)
+    await script(
+        keys=[READY_QUEUE, DELAYED_QUEUE, TASK_PRIORITY, f"{TRANSLATION_QUEUE}:processing:{worker_id}"],
+        args=[encode_chunk_task(job_id, chunk_no), delay]
+    )
+
+
+@timed_redis
+async def get_queue_depth(server: redis.Redis) -> dict:
+    """
+        Returns the number of ready and delayed (backing off) chunk tasks in the shared queue.
+    """
+    async with server.pipeline(transaction=False) as pipe:
+        pipe.zcard(READY_QUEUE)
+        pipe.zcard(DELAYED_QUEUE)
+        ready, delayed = await pipe.execute()
+    return { "ready": ready, "delayed": delayed }
+
+
+@timed_redis
+async def get_active_job_count(server: redis.Redis) -> int:
+    """
+        Returns the number of running jobs.
+    """
+    return await server.scard(ACTIVE_JOBS)
+
+
+@timed_redis
+async def refresh_worker_heartbeat(server: redis.Redis, process_id: str, ttl: int = WORKER_HEARTBEAT_TTL) -> None:
+    """
+        Marks the worker process (the prefix of its worker ids) as alive for ttl seconds.
+    """
+    await server.set(f"{TRANSLATION_QUEUE}:heartbeat:{process_id}", 1, ex=ttl)
+
+
+@timed_redis
+async def reclaim_dead_worker_tasks(server: redis.Redis) -> int:
+    """
+        Finds the processing lists of worker processes without a heartbeat (crashed or restarted pods,
+        or workers from before heartbeats) and puts their in-flight tasks back in the ready queue.
+        Returns the number of reclaimed tasks.
+    """
+    script = server.register_script(RECLAIM_SCRIPT)
+    prefix = f"{TRANSLATION_QUEUE}:processing:"
+    reclaimed = 0
+    async for key in server.scan_iter(match=f"{prefix}*", count=1000):
+        process_id = key[len(prefix):].rsplit(":", 1)[0]
+        reclaimed += await script(keys=[
+            READY_QUEUE, TASK_PRIORITY, key, f"{TRANSLATION_QUEUE}:heartbeat:{process_id}"
+        ])
+    return reclaimed
+
+
+@timed_redis
+async def drain_legacy_queue(server: redis.Redis) -> int:
+    """
+        Deletes the list queue that held chunk tasks before the priority queue; the recovery sweep re-enqueues
+        the tasks of their running jobs. Returns the number of dropped tasks.
+    """
+    if await server.type(TRANSLATION_QUEUE) != "list":
+        return 0
+    async with server.pipeline(transaction=True) as pipe:
+        pipe.llen(TRANSLATION_QUEUE)
+        pipe.delete(TRANSLATION_QUEUE)
+        n, _ = await pipe.execute()
+    return n
+
+
+@timed_redis
+async def get_running_jobs(server: redis.Redis, scan: bool = False) -> list[str]:
+    """
+        Returns the ids of the running jobs.
+        With scan, also finds running jobs missing from ACTIVE_JOBS (started before it existed) and adds them.
+    """
+    if scan:
+        async for key in server.scan_iter(match="job:*:status", count=1000):
+            if await server.get(key) == "running":
+                await server.sadd(ACTIVE_JOBS, key.split(":")[1])
+    return list(await server.smembers(ACTIVE_JOBS))
+
+
+@timed_redis
+async def get_lost_chunk_tasks(server: redis.Redis, job_id: str, chunk_indices: list[int]) -> list[int]:
+    """
+        Returns the chunk indices that have no task anywhere: neither queued, delayed nor in flight.
+        Every live task has an entry in TASK_PRIORITY from enqueue to acknowledgement.
+    """
+    if not chunk_indices:
+        return []
+    found = await server.hmget(TASK_PRIORITY, [encode_chunk_task(job_id, i) for i in chunk_indices])
+    return [i for i, priority in zip(chunk_indices, found) if priority is None]
+
+
+@timed_redis
+async def acquire_lease(server: redis.Redis, key: str, owner: str, ttl: float) -> bool:
+    """
+        Takes the lease key for owner for ttl seconds, unless someone else holds it.
+        Leases expire by themselves, so a crashed holder never blocks the resource for longer than ttl.
+    """
+    return bool(await server.set(key, owner, nx=True, px=int(ttl * 1000)))
+
+
+@timed_redis
+async def release_lease(server: redis.Redis, key: str, owner: str) -> None:
+    """
+        Releases the lease key if owner still holds it.
+    """
+    script = server.register_script(RELEASE_LEASE_SCRIPT)
+    await script(keys=[key], args=[owner])
+
+
+@timed_redis
+async def extend_lease(server: redis.Redis, key: str, owner: str, ttl: float) -> bool:
+    """
+        Extends the lease key by ttl seconds from now. Returns False if owner lost it meanwhile.
+    """
+    script = server.register_script(EXTEND_LEASE_SCRIPT)
+    return bool(await script(keys=[key], args=[owner, int(ttl * 1000)]))
+
+
+@asynccontextmanager
+async def hold_lease(server: redis.Redis, key: str, owner: str, ttl: float) -> AsyncIterator[bool]:
+    """
+        Takes the lease key for owner and keeps renewing it (every ttl / 3 seconds) until the block exits,
+        so it never expires under a live holder however long the work takes, yet a crashed holder frees it within ttl.
+        Yields whether the lease was taken; the block runs either way.
+    """
+    if not await acquire_lease(server, key, owner, ttl):
+        yield False
+        return
+
+    async def renew():
+        while True:
+            await asyncio.sleep(ttl / 3)
+            if not await extend_lease(server, key, owner, ttl):
+                return
+
+    keeper = asyncio.create_task(renew())
+    try:
+        yield True
+    finally:
+        keeper.cancel()
+        await release_lease(server, key, owner)
+
+
+def chunk_lease_key(job_id: str, chunk_no: int) -> str:
+    return f"job:{job_id}:lease:{chunk_no}"
+
+
+@timed_redis
+async def get_translated_prefix(server: redis.Redis, job_id: str, max_chunks: int) -> list[str]:
+    """
+        Fetches the translated chunks 0, 1, 2, ... up to the first one not translated yet (at most max_chunks),
+        i.e. the opening of the book that can already be previewed.
+    """
+    if max_chunks <= 0:
+        return []
+    chunks = await get_raw(server, "HMGET", f"job:{job_id}:chunks", *range(max_chunks))
+    prefix = []
+    for chunk in chunks:
+        if chunk is None:
+            break
+        prefix.append(decompress_text(chunk))
+    return prefix
+
+
+@timed_redis
+async def record_chunk_failure(server: redis.Redis, job_id: str, chunk_no: int) -> int:
+    """
+        Counts a failed translation round for the chunk.
+        Returns how many rounds the chunk has failed so far.
+    """
+    return await server.hincrby(f"job:{job_id}:attempts", chunk_no, 1)
+
+
+@timed_redis
+async def claim_job_finalization(server: redis.Redis, job_id: str, ttl: int = 600) -> bool:
+    """
+        Ensures only one worker assembles and stores the finished book.
+        Returns True for the single caller that won the claim.
+    """
+    return bool(await server.set(f"job:{job_id}:finalizing", 1, nx=True, ex=ttl))
+
+
+@timed_redis
+async def save_job_result(server: redis.Redis, job_id: str, translated_book: str, ttl: int = RESULT_TTL) -> None:
+    """
+        Stores the assembled translation in Redis so every replica can serve it,
+        not only the pod whose disk cache holds the file.
+    """
+    await server.set(f"job:{job_id}:result", compress_text(translated_book), ex=ttl)
+
+
+@timed_redis
+async def append_job_result(server: redis.Redis, job_id: str, data: bytes, first: bool = False) -> None:
+    """
+        Appends a piece of the compressed assembled translation, as it streams to disk, to a staging key.
+        The first piece replaces whatever an interrupted assembly left there.
+    """
+    key = f"job:{job_id}:result:partial"
+    if first:
+        await server.set(key, data, ex=RESULT_TTL)
+    elif data:
+        await server.append(key, data)
+
+
+@timed_redis
+async def commit_job_result(server: redis.Redis, job_id: str, ttl: int = RESULT_TTL) -> None:
+    """
+        Publishes the staged result (see append_job_result) atomically as the job's result, like save_job_result.
+    """
+    async with server.pipeline(transaction=True) as pipe:
+        pipe.rename(f"job:{job_id}:result:partial", f"job:{job_id}:result")
+        pipe.expire(f"job:{job_id}:result", ttl)
+        await pipe.execute()
+
+
+@timed_redis
+async def get_job_result(server: redis.Redis, job_id: str) -> str | None:
+    """
+        Fetches the assembled translation for the given job_id, or None if it expired or was never stored.
+    """
+    return decompress_text(await get_raw(server, "GET", f"job:{job_id}:result"))
+
+
+@timed_redis
+async def append_job_event(
+    server: redis.Redis,
+    job_id: str,
+    event: str,
+    fields: dict,
+    ttl: int = JOB_EVENTS_TTL
+) -> int:
+    """
+        Appends an event ("chunk" or "status") to the job's replayable event log.
+        Fields set to None are left out, as Redis streams cannot store them.
+        Returns its sequence number; sequence numbers of a job run are consecutive from 1.
+    """
+    args = [ttl, "event", event]
+    for k, v in fields.items():
+        if v is not None:
+            args += [k, v]
+    script = server.register_script(APPEND_EVENT_SCRIPT)
+    return int(await script(keys=[f"job:{job_id}:events", f"job:{job_id}:events:seq"], args=args))
+
+
+async def read_job_events(
+    server: redis.Redis,
+    job_id: str,
+    after_seq: int = 0,
+    block_ms: int = 15000,
+    count: int = 100
+) -> list[tuple[int, str, dict]]:
+    """
+        Reads up to count events with a sequence number above after_seq, waiting up to block_ms for new ones.
+        Returns (seq, event, fields) tuples. "chunk" events get the chunk's text from the job's chunks hash
+        (one HMGET per read); it is left out once the job ended and its chunks were dropped.
+    """
+    res = await get_raw(
+        server, "XREAD", "COUNT", count, "BLOCK", block_ms,
+        "STREAMS", f"job:{job_id}:events", f"0-{after_seq}"
+    )
+    events = []
+    for _, entries in res or []:
+        for entry_id, raw in entries:
+            fields = { k.decode("utf-8"): v.decode("utf-8") for k, v in raw.items() }
+            event = fields.pop("event")
+            events.append((int(entry_id.split(b"-")[1]), event, fields))
+
+    chunk_fields = [fields for _, event, fields in events if event == "chunk"]
+    if chunk_fields:
+        texts = await get_raw(server, "HMGET", f"job:{job_id}:chunks", *[f["chunk_no"] for f in chunk_fields])
+        for fields, text in zip(chunk_fields, texts):
+            if text is not None:
+                fields["text"] = decompress_text(text)
+    return events
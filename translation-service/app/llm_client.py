@@ -0,0 +1,65 @@
+import httpx
+import os
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+load_dotenv()
+
+SEALION_API_KEY = os.getenv("SEALION_API_KEY")
+SEALION_API_URL = os.getenv("SEALION_API_URL")
+
+# connection pool & timeouts
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", 10))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", 60))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", 10))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", 600))
+# SDK-level retries would bypass the rate limiter; workers retry through it instead
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 0))
+
+_http_client: httpx.AsyncClient | None = None
+# one client per (base_url, api_key), all sharing the pooled _http_client
+_clients: dict[tuple[str | None, str | None], AsyncOpenAI] = {}
+
+def init_llm_client(base_url: str | None = SEALION_API_URL, api_key: str | None = SEALION_API_KEY) -> AsyncOpenAI:
+    """
+        Creates the process-wide AsyncOpenAI client for an endpoint on top of a pooled httpx.AsyncClient.
+        Keep-alive connections are reused across chunks, so only the first call pays for the TCP/TLS handshake.
+        Clients for other endpoints (see llm_router) share the same connection pool.
+    """
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        )
+    if (base_url, api_key) not in _clients:
+        _clients[(base_url, api_key)] = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=_http_client
+        )
+    return _clients[(base_url, api_key)]
+
+
+def get_llm_client(base_url: str | None = SEALION_API_URL, api_key: str | None = SEALION_API_KEY) -> AsyncOpenAI:
+    """
+        Returns the shared client for an endpoint, creating it on first use outside the FastAPI lifespan (e.g. scripts, benchmarks).
+    """
+    return _clients.get((base_url, api_key)) or init_llm_client(base_url, api_key)
+
+
+async def close_llm_client() -> None:
+    """
+        Closes every shared client and their connection pool.
+    """
+    global _http_client
+    _clients.clear()
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
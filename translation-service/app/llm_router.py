@@ -0,0 +1,245 @@
+import json
+import os
+import random
+import redis.asyncio as redis
+import time
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+from app.llm_client import SEALION_API_KEY, SEALION_API_URL, get_llm_client
+from app.rate_limiter import RateLimiter, RedisRateLimiter
+
+load_dotenv()
+
+# JSON list of backends, inline or in a file; see load_backend_configs for the fields
+LLM_BACKENDS = os.getenv("LLM_BACKENDS")
+LLM_BACKENDS_FILE = os.getenv("LLM_BACKENDS_FILE")
+# cheaper/faster model for book-info extraction on the default gateway (same model as translation when unset)
+BOOK_INFO_MODEL = os.getenv("BOOK_INFO_MODEL")
+BOOK_INFO_RATE_LIMIT = int(os.getenv("BOOK_INFO_RATE_LIMIT", 10))
+
+# a backend failing this many requests in a row is taken out of rotation
+BACKEND_FAILURE_THRESHOLD = int(os.getenv("BACKEND_FAILURE_THRESHOLD", 3))
+# for this long, doubling every time it fails again right after, up to BACKEND_MAX_COOLDOWN
+BACKEND_COOLDOWN = float(os.getenv("BACKEND_COOLDOWN", 30))
+BACKEND_MAX_COOLDOWN = float(os.getenv("BACKEND_MAX_COOLDOWN", 600))
+LATENCY_EWMA_ALPHA = 0.2
+
+ROLE_TRANSLATE = "translate"
+ROLE_BOOK_INFO = "book_info"
+DEFAULT_EXTRA_BODY = { "chat_template_kwargs": { "thinking_mode": "off" } }
+DEFAULT_RATE_LIMIT_KEY = "ratelimit:sealion"
+
+
+class LLMBackend:
+    """
+        One model on one OpenAI-compatible endpoint, with its own cluster-wide rate limit and AIMD concurrency cap.
+        Tracks its latency (EWMA of seconds per request token) and health in this process:
+        after BACKEND_FAILURE_THRESHOLD consecutive failures it is skipped by the router until its cooldown ends.
+    """
+    def __init__(
+        self,
+        name: str,
+        model: str,
+        rate_limiter: RateLimiter,
+        base_url: str | None = SEALION_API_URL,
+        api_key: str | None = SEALION_API_KEY,
+        weight: float = 1.0,
+        roles: tuple[str, ...] = (ROLE_TRANSLATE, ROLE_BOOK_INFO),
+        extra_body: dict | None = None
+    ):
+        self.name = name
+        self.model = model
+        self.rate_limiter = rate_limiter
+        self.base_url = base_url
+        self.api_key = api_key
+        self.weight = weight
+        self.roles = tuple(roles)
+        self.extra_body = DEFAULT_EXTRA_BODY if extra_body is None else extra_body
+        self.latency: float | None = None
+        self.failures = 0
+        # consecutive times taken out of rotation, doubling the cooldown
+        self.trips = 0
+        self.down_until = 0.0
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        return get_llm_client(self.base_url, self.api_key)
+
+    def is_healthy(self, now: float | None = None) -> bool:
+        return (now or time.monotonic()) >= self.down_until
+
+    def free_slots(self) -> float:
+        concurrency = self.rate_limiter.concurrency
+        return max(concurrency.limit - concurrency.in_flight, 0)
+
+    def on_success(self, seconds: float, tokens: int) -> None:
+        per_token = seconds / max(tokens, 1)
+        self.latency = per_token if self.latency is None else (
+            LATENCY_EWMA_ALPHA * per_token + (1 - LATENCY_EWMA_ALPHA) * self.latency
+        )
+        self.failures = 0
+        self.trips = 0
+        self.down_until = 0.0
+
+    def on_failure(self) -> None:
+        self.failures += 1
+        # failures of requests still in flight when the backend was taken out don't extend its cooldown
+        if self.failures >= BACKEND_FAILURE_THRESHOLD and self.is_healthy():
+            cooldown = min(BACKEND_COOLDOWN * 2 ** self.trips, BACKEND_MAX_COOLDOWN)
+            self.trips += 1
+            self.down_until = time.monotonic() + cooldown
+            print(f"[ROUTER] backend {self.name} failed {self.failures} times in a row, out of rotation for {cooldown:.0f}s")
+
+    def stats(self) -> dict:
+        return {
+            "model": self.model,
+            "roles": list(self.roles),
+            "weight": self.weight,
+            "healthy": self.is_healthy(),
+            "consecutive_failures": self.failures,
+            "concurrency_limit": self.rate_limiter.concurrency.limit,
+            "in_flight": self.rate_limiter.concurrency.in_flight,
+            "ms_per_1k_tokens": self.latency * 1e6 if self.latency is not None else None
+        }
+
+
+class LLMRouter:
+    """
+        Spreads LLM requests of a role (translation or book-info extraction) over the backends serving it.
+        Backends are tried in a weighted random order, each weighted by weight * free concurrency slots / latency,
+        and the first one whose rate limit has budget right now gets the request.
+        Unhealthy backends are skipped while any healthy one serves the role.
+    """
+    def __init__(self, backends: list[LLMBackend]):
+        if not backends:
+            raise ValueError("At least one LLM backend is required")
+        self.backends = backends
+
+    def models(self, role: str = ROLE_TRANSLATE) -> list[str]:
+        """
+            Returns the distinct models serving a role, highest weight first.
+        """
+        res = []
+        for b in sorted(self.backends, key=lambda b: -b.weight):
+            if role in b.roles and b.model not in res:
+                res.append(b.model)
+        return res
+
+    def candidates(self, role: str, exclude: tuple[LLMBackend, ...] = ()) -> list[LLMBackend]:
+        """
+            Returns the backends to try for a role, in weighted random order by live capacity and latency.
+            Falls back to the unhealthy ones (soonest recovered first) when no healthy backend serves the role.
+        """
+        now = time.monotonic()
+        serving = [b for b in self.backends if role in b.roles and b not in exclude]
+        healthy = [b for b in serving if b.is_healthy(now)]
+        if not healthy:
+            return sorted(serving, key=lambda b: b.down_until)
+
+        known = [b.latency for b in healthy if b.latency is not None]
+        # untried backends are assumed as fast as the fastest one, so they get traffic and a latency estimate
+        default_latency = min(known) if known else 1.0
+
+        def score(b: LLMBackend) -> float:
+            return b.weight * max(b.free_slots(), 0.1) / (b.latency or default_latency)
+
+        # weighted shuffle: a backend ends up first with probability proportional to its score
+        return sorted(healthy, key=lambda b: random.random() ** (1 / score(b)), reverse=True)
+
+    async def try_route(self, role: str, tokens: int, exclude: tuple[LLMBackend, ...] = ()) -> LLMBackend | None:
+        """
+            Returns a backend that had rate-limit budget for the request right now (and takes it), or None.
+        """
+        for b in self.candidates(role, exclude):
+            if await b.rate_limiter.try_acquire(tokens):
+                return b
+        return None
+
+    async def route(self, role: str, tokens: int, exclude: tuple[LLMBackend, ...] = ()) -> LLMBackend:
+        """
+            Takes rate-limit budget for a request on the best available backend,
+            waiting on the top candidate when every backend is out of budget.
+        """
+        backend = await self.try_route(role, tokens, exclude)
+        if backend is not None:
+            return backend
+        backend = (self.candidates(role, exclude) or self.candidates(role))[0]
+        await backend.rate_limiter.acquire(tokens)
+        return backend
+
+    def stats(self) -> dict:
+        return { b.name: b.stats() for b in self.backends }
+
+
+def load_backend_configs() -> list[dict] | None:
+    """
+        Reads the backend pool from LLM_BACKENDS (JSON) or LLM_BACKENDS_FILE, e.g.
+        [{"name": "sealion-70b", "model": "aisingapore/Llama-SEA-LION-v3.5-70B-R", "max_calls": 10, "refill_rate": 60,
+          "weight": 2, "roles": ["translate"]},
+         {"name": "sealion-8b", "model": "aisingapore/Llama-SEA-LION-v3.5-8B-R", "max_calls": 10, "refill_rate": 60,
+          "roles": ["translate", "book_info"]}]
+        Optional fields: base_url and api_key_env (default to the SEA-LION gateway), max_tokens,
+        max_concurrency, weight (1), roles (both), extra_body, rate_limit_key.
+        Returns None when neither is set.
+    """
+    if LLM_BACKENDS:
+        return json.loads(LLM_BACKENDS)
+    if LLM_BACKENDS_FILE:
+        with open(LLM_BACKENDS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return None
+
+
+def init_llm_router(
+    server: redis.Redis,
+    default_model: str,
+    max_calls: int,
+    refill_rate: int,
+    max_tokens: int = 0
+) -> LLMRouter:
+    """
+        Builds the router from the configured backend pool.
+        Without one, the single default model serves every role as before (optionally with BOOK_INFO_MODEL for book info).
+    """
+    configs = load_backend_configs()
+    if configs is None:
+        configs = [{
+            "name": "default",
+            "model": default_model,
+            "max_calls": max_calls,
+            "refill_rate": refill_rate,
+            "max_tokens": max_tokens,
+            "rate_limit_key": DEFAULT_RATE_LIMIT_KEY,
+            "roles": [ROLE_TRANSLATE] if BOOK_INFO_MODEL else [ROLE_TRANSLATE, ROLE_BOOK_INFO]
+        }]
+        if BOOK_INFO_MODEL:
+            configs.append({
+                "name": "book-info",
+                "model": BOOK_INFO_MODEL,
+                "max_calls": BOOK_INFO_RATE_LIMIT,
+                "refill_rate": refill_rate,
+                "roles": [ROLE_BOOK_INFO]
+            })
+
+    backends = []
+    for c in configs:
+        api_key_env = c.get("api_key_env")
+        backends.append(LLMBackend(
+            c["name"],
+            c["model"],
+            RedisRateLimiter(
+                server,
+                c.get("max_calls", max_calls),
+                c.get("refill_rate", refill_rate),
+                key=c.get("rate_limit_key", f"ratelimit:{c['name']}"),
+                max_tokens=c.get("max_tokens", 0),
+                max_concurrency=c.get("max_concurrency")
+            ),
+            base_url=c.get("base_url", SEALION_API_URL),
+            api_key=os.getenv(api_key_env) if api_key_env else SEALION_API_KEY,
+            weight=float(c.get("weight", 1)),
+            roles=tuple(c.get("roles", (ROLE_TRANSLATE, ROLE_BOOK_INFO))),
+            extra_body=c.get("extra_body")
+        ))
+    return LLMRouter(backends)
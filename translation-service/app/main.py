@@ -1,28 +1,67 @@
+import asyncio
+import codecs
 import os
+import secrets
+import time
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pathlib import Path
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 import traceback  # todo: remove when done
 
 from app.book_translation import (
     cancel_translation_service,
-    chunk_by_tokens,
+    chunk_with_token_counts,
+    estimate_text_tokens,
+    estimate_upload_tokens,
     extract_book_info,
+    fetch_translation_preview,
     fetch_translation_progress,
     fetch_last_user_job,
-    translate_service
+    fetch_translation_by_fingerprint,
+    fetch_translation_variants,
+    start_translation_workers,
+    stream_translation_events,
+    stop_translation_workers,
+    StreamingChunker,
+    translate_service,
+    translate_upload_service,
+    TRANSLATION_MODEL
 )
-from app.file_management import read_file_in_local_storage, write_file_to_local_storage
+from app.chunk_cache import get_cache_stats
+from app.chunk_tuner import choose_max_tokens
+from app.hedging import HEDGE_ENABLED, latency_tracker
+from app.file_management import BookInfo, read_file_in_local_storage, write_file_to_local_storage
 from app.job_handler import (
     init_redis,
+    BookFingerprinter,
     check_job_status,
+    create_book_fingerprint,
     create_job_id,
+    discard_upload,
+    get_active_job_count,
+    get_queue_depth,
     JobCompletion,
-    JobStatus
+    JobStart,
+    JobStatus,
+    save_book_fingerprint,
+    stage_upload_chunks
+)
+from app.llm_client import close_llm_client, init_llm_client
+from app.llm_router import init_llm_router, ROLE_TRANSLATE
+from app.metrics import (
+    ACTIVE_JOBS,
+    CHUNK_CACHE_HIT_RATIO,
+    QUEUE_DEPTH,
+    register_router_metrics
 )
-from app.rate_limiter import RateLimiter
 from app.schema import CancelRequest, TranslateRequest
+from app.token_counter import preload_tokenizer
+from app.tracing import get_job_timeline, record_span, start_job_trace
 
 load_dotenv()
 
@@ -30,11 +69,36 @@ load_dotenv()
 redis_port = os.getenv("REDIS_PORT")
 API_RATE_LIMIT = 10
 refill_rate = 60
+API_TOKEN_LIMIT = int(os.getenv("API_TOKEN_LIMIT", 0))
+TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", API_RATE_LIMIT))
+# new jobs are refused while this many chunk tasks are waiting (0 = no limit)
+TRANSLATION_QUEUE_LIMIT = int(os.getenv("TRANSLATION_QUEUE_LIMIT", 0))
+PREVIEW_MAX_CHUNKS = int(os.getenv("PREVIEW_MAX_CHUNKS", 5))
+# /translate_book_stream tunes the chunk size from the tokens per byte of this much of the upload
+UPLOAD_SAMPLE_BYTES = 64 * 1024
 redis_server = init_redis(redis_port)
-rate_limiter = RateLimiter(API_RATE_LIMIT, refill_rate)
+llm_router = init_llm_router(redis_server, TRANSLATION_MODEL, API_RATE_LIMIT, refill_rate, API_TOKEN_LIMIT)
+register_router_metrics(llm_router)
 
 # FASTAPI INIT
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+        Startup/shutdown hook.
+        Loads the tokenizer once per process, off the event loop; a no-op if it was preloaded before fork.
+        Creates the shared, pooled LLM client used by every translation call and closes it on shutdown.
+        Runs TRANSLATION_WORKERS queue consumers in this process (0 for an API-only replica)
+        and the sweep that resumes jobs orphaned by crashed pods.
+    """
+    await asyncio.to_thread(preload_tokenizer)
+    init_llm_client()
+    workers = start_translation_workers(TRANSLATION_WORKERS, llm_router, redis_server)
+    yield
+    await stop_translation_workers(workers)
+    await close_llm_client()
+
+
+app = FastAPI(lifespan=lifespan)
 # middleware
 app.add_middleware(
     CORSMiddleware,
@@ -54,10 +118,6 @@ async def root():
     return {"service": f"Translation Service is running!"}
 
 
-from fastapi.responses import JSONResponse  # todo: remove when done
-from fastapi.exceptions import RequestValidationError
-from fastapi import Request
-
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     """
@@ -71,121 +131,353 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 
 
 
+async def check_new_job(book_info: BookInfo, language: str, email: str) -> tuple[str, dict, dict | None]:
+    """
+        Checks whether the user may start the job translating the book into language.
+        Returns (job_id, the response for a started job, an answer to return right away if the job is already
+        queued or done for this user, else None). Raises a conflict error if a different job of the user is running,
+        and a 503 if the queue is full.
+    """
+    job_id = create_job_id(book_info.origin_title, book_info.origin_author, language)
+    started = {
+        "status": JobCompletion.STARTED,
+        "job_id": job_id,
+        "origin_title": book_info.origin_title,
+        "origin_author": book_info.origin_author,
+        "message": "Translation started. Check /translation_progress"
+    }
+
+    # Check ongoing job status and disk cache
+    job_status = await check_job_status(redis_server, email, job_id)
+    if job_status is None:
+        pass
+    elif job_status == JobStatus.SAME_JOB:
+        attempted_translation = read_file_in_local_storage(
+                                    book_info.origin_title,
+                                    book_info.origin_author,
+                                    language
+                                )
+        if attempted_translation:
+            return job_id, started, { "status": JobCompletion.DONE, "result": attempted_translation }
+        # already queued, workers are on it
+        return job_id, started, started
+    elif job_status == JobStatus.DIFFERENT_JOB:
+        raise HTTPException(status_code=409, detail="Another translation already in progress.")
+
+    if TRANSLATION_QUEUE_LIMIT and (await get_queue_depth(redis_server))["ready"] >= TRANSLATION_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=503,
+            detail="Translation queue is full, try again later.",
+            headers={ "Retry-After": "60" }
+        )
+    return job_id, started, None
+
+
+def joined(started: dict) -> dict:
+    """
+        The response for a submission that joined a job already running for another request.
+    """
+    return {
+        **started,
+        "message": "Translation already in progress, shared with this request. Check /translation_progress or /translation_events"
+    }
+
+
 @app.post("/translate_book")
-async def translate_book(req: TranslateRequest, background_tasks: BackgroundTasks):
+async def translate_book(req: TranslateRequest):
     """
         Initiates the book translation process. 
+        If the same book text was already translated into this language, it answers from the fingerprint index
+        without any LLM call; if it is being translated, its known book info skips extraction and the request joins the job.
         If a translation job for the same book by the same user is already completed and cached, it returns the cached result.
         If a different job is in progress for the user, it returns a conflict error.
-        Otherwise, it starts a new translation job in the background and returns the job status."""
+        If another user is translating the same book into this language, the request joins that job instead of running it twice.
+        Otherwise, it enqueues a new translation job and returns its job_id right away; poll /translation_progress for the result."""
     print("Received POST /translate_book")  # todo: remove when done
-    print(f"[DEBUG] Received req: {req}")  # todo: remove when done
 
     try:
         if not req.book:
             raise HTTPException(status_code=400, detail="Empty input text.")
         
-        chunks = chunk_by_tokens(req.book)
-        print(f"[DEBUG] Full book: {repr(req.book)}")  # todo: remove when done
-        print(f"[DEBUG] chunk[0]: {repr(chunks[0])}")  # todo: remove when done
-        #print(f"[DEBUG] chunk lines = {chunks.splitlines()}")  # todo: remove when done
+        # Fast path for books translated before
+        fingerprint = create_book_fingerprint(req.book, req.language)
+        known, book_info = await fetch_translation_by_fingerprint(fingerprint, req.language, redis_server)
+        if known:
+            return known
 
+        # chunk size minimizing the predicted translation time under the current rate-limit budget
+        received = time.time_ns()
+        max_tokens, tuning = choose_max_tokens(estimate_text_tokens(req.book), llm_router)
+        print(f"[CHUNK_TUNER] max_tokens={max_tokens} {tuning}")
+        chunks, token_counts = chunk_with_token_counts(req.book, max_tokens)
+        chunked = time.time_ns()
 
-        book_info = await extract_book_info(chunks[0], req.language, rate_limiter)
+        if book_info is None:
+            book_info = await extract_book_info(chunks[0], req.language, llm_router, redis_server)
+        extracted = time.time_ns()
         print(f"[DEBUG] Extracted book_info: {book_info.origin_title=}, {book_info.origin_author=}")  # todo: remove when done
-        if (
-            not book_info.origin_title or
-            not book_info.origin_author or
-            book_info.origin_title == "NA" or
-            book_info.origin_author == "NA"
-        ):
+        if not book_info.is_complete():
             raise HTTPException(status_code=400, detail="No book title and/or author")
         
-        job_id = create_job_id(book_info.origin_title, book_info.origin_author)
-        print(f"book_info: {book_info.origin_title}, job_id: {job_id}")  # todo: remove when done
-
-        # Check ongoing job status and disk cache
-        job_status = await check_job_status(redis_server, req.email, job_id)
-        if job_status is None:
-            pass
-        elif job_status == JobStatus.SAME_JOB:
-            attempted_translation = read_file_in_local_storage(
-                                        book_info.origin_title,
-                                        book_info.origin_author
-                                    )
-            if attempted_translation:
-                return { "status": JobCompletion.DONE, "result": attempted_translation }
-            else:
-                pass
-        elif job_status == JobStatus.DIFFERENT_JOB:
-            raise HTTPException(status_code=409, detail="Another translation already in progress.")
-        
-        # Start translation in background
-        success, translated = await translate_service(
+        job_id, started, answer = await check_new_job(book_info, req.language, req.email)
+        if answer:
+            return answer
+
+        # Enqueue chunks for the translation workers, or join the run of another user's identical submission
+        start = await translate_service(
             job_id,
             req.email,
             req.language,
             book_info,
             chunks,
-            rate_limiter,
-            redis_server
+            redis_server,
+            token_counts,
+            max_tokens,
+            llm_router.models(ROLE_TRANSLATE)[0]
         )
-        if not success:
-            raise HTTPException(status_code=500, detail="Translation failed.")
+        if start is None:
+            raise HTTPException(status_code=500, detail="Translation failed to start.")
+        await save_book_fingerprint(redis_server, fingerprint, job_id, book_info.get_book_info())
+        if start == JobStart.JOINED:
+            return joined(started)
+
+        # Root span of the job, with the work done before its id was known
+        await start_job_trace(redis_server, job_id, received)
+        await record_span(redis_server, job_id, "chunking", received, chunked, chunks=len(chunks), max_tokens=max_tokens)
+        await record_span(redis_server, job_id, "book_info", chunked, extracted)
         
-        # print("[ENDPOINT] Task scheduled!")  # todo: remove when done
-        # return {
-        #     "status": JobCompletion.STARTED,
-        #     "job_id": job_id,
-        #     "message": "Translation started. Check /translation_progress"
-        # }
-        result = {  # todo: remove wben done
-            "status": JobCompletion.DONE,
-            "job_id": job_id,
-            "result": translated,
-            "origin_title": book_info.origin_title,
-            "origin_author": book_info.origin_author,
-        }
-        print(result)  # todo: remove wben done
-        return result
+        return started
 
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()  # todo: remove when done
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@app.post("/translate_book_stream")
+async def translate_book_stream(request: Request, language: str, email: str):
+    """
+        Streaming variant of /translate_book for uploaded files: the request body is the raw UTF-8 text of the book,
+        language and email are query parameters.
+        The body is read as it arrives; complete paragraphs are chunked right away and the chunks are staged in Redis
+        as they are formed, so the service holds about one chunk of the book rather than several copies of it.
+        The chunk size is tuned from the tokens per byte of the first UPLOAD_SAMPLE_BYTES and the Content-Length.
+        Answers like /translate_book.
+    """
+    upload_id = secrets.token_hex(16)
+    try:
+        received = time.time_ns()
+        body = request.stream()
+        head = b""
+        async for piece in body:
+            head += piece
+            if len(head) >= UPLOAD_SAMPLE_BYTES:
+                break
+        total_bytes = int(request.headers["content-length"]) if "content-length" in request.headers else None
+        max_tokens, tuning = choose_max_tokens(estimate_upload_tokens(head, total_bytes), llm_router)
+        print(f"[CHUNK_TUNER] max_tokens={max_tokens} {tuning}")
+
+        async def pieces():
+            yield head
+            async for piece in body:
+                yield piece
+            # end of the body
+            yield None
+
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        fingerprinter = BookFingerprinter(language)
+        chunker = StreamingChunker(max_tokens)
+        first_chunk = None
+        staged = 0
+        async for piece in pieces():
+            text = decoder.decode(piece or b"", final=piece is None)
+            fingerprinter.update(text)
+            chunks = chunker.feed(text)
+            if piece is None:
+                chunks += chunker.close()
+            if chunks:
+                await stage_upload_chunks(redis_server, upload_id, staged, chunks)
+                first_chunk = first_chunk or chunks[0][0]
+                staged += len(chunks)
+        chunked = time.time_ns()
+        if not staged:
+            raise HTTPException(status_code=400, detail="Empty input text.")
+
+        # Fast path for books translated before
+        fingerprint = fingerprinter.hexdigest()
+        known, book_info = await fetch_translation_by_fingerprint(fingerprint, language, redis_server)
+        if known:
+            return known
+
+        if book_info is None:
+            book_info = await extract_book_info(first_chunk, language, llm_router, redis_server)
+        extracted = time.time_ns()
+        if not book_info.is_complete():
+            raise HTTPException(status_code=400, detail="No book title and/or author")
+
+        job_id, started, answer = await check_new_job(book_info, language, email)
+        if answer:
+            return answer
+
+        # The staged chunks become the job's source chunks, unless the job is already running
+        start = await translate_upload_service(
+            job_id,
+            email,
+            language,
+            book_info,
+            upload_id,
+            staged,
+            redis_server,
+            max_tokens,
+            llm_router.models(ROLE_TRANSLATE)[0]
+        )
+        if start is None:
+            raise HTTPException(status_code=500, detail="Translation failed to start.")
+        await save_book_fingerprint(redis_server, fingerprint, job_id, book_info.get_book_info())
+        if start == JobStart.JOINED:
+            return joined(started)
+
+        await start_job_trace(redis_server, job_id, received)
+        await record_span(redis_server, job_id, "chunking", received, chunked, chunks=staged, max_tokens=max_tokens, streamed=True)
+        await record_span(redis_server, job_id, "book_info", chunked, extracted)
+        return started
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        # a no-op once a job adopted the chunks
+        await discard_upload(redis_server, upload_id)
+
+
 @app.get("/translation_progress")
 async def get_translation_progress(
     origin_title: str,
-    origin_author: str
+    origin_author: str,
+    language: str
 ):
     """
         Fetches the progress of an ongoing translation job or the result if completed.
-        If no job is found for the given book title and author, it returns a not found error.
+        If no job is found for the given book title, author and language, it returns a not found error.
     """
     try:
         # todo: Check if user has active job or old job as per requested
         
         # fetch chunks from redis and get progress
-        job_id = create_job_id(origin_title, origin_author)
-        res = await fetch_translation_progress(job_id, origin_title, origin_author, redis_server)
+        job_id = create_job_id(origin_title, origin_author, language)
+        res = await fetch_translation_progress(job_id, origin_title, origin_author, language, redis_server)
         if "error" in res:
             raise HTTPException(status_code=404, detail=res["error"])
         return res
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/translation_preview")
+async def translation_preview(job_id: str, max_chunks: int = PREVIEW_MAX_CHUNKS):
+    """
+        Returns the already translated opening chunks of a running job, to preview before the whole book is done.
+    """
+    try:
+        return await fetch_translation_preview(job_id, max_chunks, redis_server)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+        Prometheus scrape endpoint. Cluster-wide gauges (active jobs, queue depth, chunk cache hit ratio)
+        are read from Redis only here, so nothing is spent on them between scrapes.
+    """
+    try:
+        depth = await get_queue_depth(redis_server)
+        for queue, n in depth.items():
+            QUEUE_DEPTH.labels(queue=queue).set(n)
+        ACTIVE_JOBS.set(await get_active_job_count(redis_server))
+        CHUNK_CACHE_HIT_RATIO.set((await get_cache_stats(redis_server))["hit_ratio"])
+    except Exception as e:
+        print(f"An error has occured while refreshing metrics: {e}")
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/queue_stats")
+async def queue_stats():
+    """
+        Returns the depth of the shared chunk queue and this process' worker pool size.
+    """
+    try:
+        return {
+            **await get_queue_depth(redis_server),
+            "queue_limit": TRANSLATION_QUEUE_LIMIT,
+            "workers": TRANSLATION_WORKERS
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/latency_stats")
+async def latency_stats():
+    """
+        Returns this process' LLM latency percentiles per chunk size (in tokens), which drive request hedging,
+        and the latency and health of every LLM backend.
+    """
+    return { "hedging": HEDGE_ENABLED, "buckets": latency_tracker.stats(), "backends": llm_router.stats() }
+
+
+@app.get("/translation_timeline")
+async def translation_timeline(job_id: str):
+    """
+        Returns the job's trace summary: time per span and the critical path of the job
+        (queueing, rate-limit waits, LLM requests, retries, Redis and storage calls).
+    """
+    try:
+        timeline = await get_job_timeline(redis_server, job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if timeline is None:
+        raise HTTPException(status_code=404, detail="No trace for this job.")
+    return timeline
+
+
+@app.get("/translation_events")
+async def translation_events(
+    job_id: str,
+    last_event_id: int = 0,
+    last_event_id_header: str | None = Header(None, alias="Last-Event-ID")
+):
+    """
+        Streams the job's progress as Server-Sent Events instead of polling /translation_progress.
+        Each translated chunk is pushed as it lands, with sequence numbers as event ids;
+        a reconnecting client (EventSource sends Last-Event-ID) gets every event it missed.
+    """
+    if last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = max(last_event_id, int(last_event_id_header))
+    return StreamingResponse(
+        stream_translation_events(job_id, last_event_id, redis_server),
+        media_type="text/event-stream",
+        headers={ "Cache-Control": "no-cache", "X-Accel-Buffering": "no" }
+    )
+
+
 @app.post("/cancel_translation")
 async def cancel_translation(req: CancelRequest):
     """
-        Cancels an ongoing translation job for the given book title and author.
+        Cancels an ongoing translation job for the given book title, author and language.
+        A job shared with other users keeps running until none of them is left.
         If no such job is found, it returns a not found error.
     """
     try:
-        job_id = create_job_id(req.origin_title, req.origin_author)
-        await cancel_translation_service(job_id, req.email, redis_server)
+        job_id = create_job_id(req.origin_title, req.origin_author, req.language)
+        if await cancel_translation_service(job_id, req.email, redis_server) is None:
+            raise HTTPException(status_code=404, detail="No running translation of this book for this email.")
         return { "status": JobCompletion.CANCELLED, "job_id": job_id }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
@@ -205,6 +497,29 @@ async def last_job(email: str):
         raise HTTPException(status_code=500, detail=str(e))
     
 
+@app.get("/translated_languages")
+async def translated_languages(origin_title: str, origin_author: str):
+    """
+        Lists every language the book has already been translated into.
+        Fetch one of them with /translation_progress and the matching language.
+    """
+    try:
+        return await fetch_translation_variants(origin_title, origin_author, redis_server)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/cache_stats")
+async def cache_stats():
+    """
+        Returns hit/miss counters of the shared chunk translation cache.
+    """
+    try:
+        return await get_cache_stats(redis_server)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 # @app.get("/")
 # async def translate_book():
 #     main_loc = Path(__file__).parent
@@ -0,0 +1,136 @@
+import functools
+import inspect
+import os
+import time
+from dotenv import load_dotenv
+from prometheus_client import Counter, Gauge, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+from typing import Callable
+
+load_dotenv()
+
+# Prometheus metrics of the hot paths, scraped from GET /metrics (API) or METRICS_PORT (standalone workers).
+# Observations are in-process counters (about a microsecond each); everything read from Redis or the
+# router is only computed when scraped.
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+
+# buckets from sub-millisecond Redis round trips to multi-minute LLM calls
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+
+CHUNKING_SECONDS = Histogram(
+    "translation_chunking_seconds", "Time to split a book into chunks", buckets=FAST_BUCKETS
+)
+BOOK_INFO_SECONDS = Histogram(
+    "translation_book_info_seconds", "Time of extract_book_info, cache hits included", buckets=SLOW_BUCKETS
+)
+TRANSLATE_CHUNK_SECONDS = Histogram(
+    "translation_translate_chunk_seconds", "Latency of a single translate_chunk LLM call", buckets=SLOW_BUCKETS
+)
+LLM_REQUESTS = Counter(
+    "translation_llm_requests_total", "LLM requests by backend and outcome (ok, throttled, error)", ["backend", "outcome"]
+)
+REDIS_OP_SECONDS = Histogram(
+    "translation_redis_op_seconds", "Latency of job_handler Redis operations", ["op"], buckets=FAST_BUCKETS
+)
+FILE_IO_SECONDS = Histogram(
+    "translation_file_io_seconds", "Latency of translated book cache reads, writes and evictions", ["op"], buckets=FAST_BUCKETS
+)
+BOOK_CACHE_LOOKUPS = Counter(
+    "translation_book_cache_lookups_total", "Translated book cache lookups by result (hit, miss)", ["result"]
+)
+RATE_LIMIT_WAIT_SECONDS = Histogram(
+    "translation_rate_limit_wait_seconds", "Time spent waiting for rate-limit budget", ["limiter"], buckets=SLOW_BUCKETS
+)
+CHUNK_RETRIES = Counter(
+    "translation_chunk_retries_total", "Chunks requeued with backoff after a failed attempt"
+)
+CHUNK_FAILURES = Counter(
+    "translation_chunk_failures_total", "Failed chunk attempts by reason (error, timeout, exhausted)", ["reason"]
+)
+JOB_FAILURES = Counter(
+    "translation_job_failures_total", "Jobs failed after a chunk ran out of retry rounds"
+)
+HEDGED_REQUESTS = Counter(
+    "translation_hedged_requests_total", "Second requests fired for straggler chunks"
+)
+DEDUPLICATED_WORK = Counter(
+    "translation_deduplicated_total", "Work not done twice: submissions joining a running job, duplicate chunk tasks dropped (job, chunk)", ["kind"]
+)
+PACKED_REQUESTS = Counter(
+    "translation_packed_requests_total", "LLM requests packing several small chunks, by outcome (ok, split_failed, throttled, error)", ["outcome"]
+)
+PACKED_CHUNKS = Counter(
+    "translation_packed_chunks_total", "Chunks sent in packed requests"
+)
+RECOVERED_TASKS = Counter(
+    "translation_recovered_tasks_total", "Chunk tasks put back in the queue by the recovery sweep (dead_worker, lost)", ["source"]
+)
+
+# refreshed from Redis on scrape, see refresh_redis_gauges
+ACTIVE_JOBS = Gauge("translation_active_jobs", "Running translation jobs")
+QUEUE_DEPTH = Gauge("translation_queue_depth", "Chunk tasks waiting in the queue", ["queue"])
+CHUNK_CACHE_HIT_RATIO = Gauge("translation_chunk_cache_hit_ratio", "Chunk cache hit ratio since the stats were reset")
+
+
+def timed(histogram: Histogram, **labels) -> Callable:
+    """
+        Decorator observing the wall time of a sync or async function in histogram (with the given labels).
+    """
+    child = histogram.labels(**labels) if labels else histogram
+
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    child.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+        return wrapper
+
+    return decorator
+
+
+def timed_redis(fn: Callable) -> Callable:
+    """
+        Times a job_handler operation in REDIS_OP_SECONDS, labelled with the function name.
+    """
+    return timed(REDIS_OP_SECONDS, op=fn.__name__)(fn)
+
+
+class RouterCollector:
+    """
+        Reports the LLM backends' concurrency slots, AIMD limits and health at scrape time.
+    """
+    def __init__(self, router):
+        self.router = router
+
+    def collect(self):
+        in_flight = GaugeMetricFamily("translation_llm_in_flight", "LLM requests in flight", labels=["backend"])
+        limit = GaugeMetricFamily("translation_llm_concurrency_limit", "AIMD concurrency limit", labels=["backend"])
+        healthy = GaugeMetricFamily("translation_llm_backend_healthy", "1 while the backend is in rotation", labels=["backend"])
+        for b in self.router.backends:
+            in_flight.add_metric([b.name], b.rate_limiter.concurrency.in_flight)
+            limit.add_metric([b.name], b.rate_limiter.concurrency.limit)
+            healthy.add_metric([b.name], 1 if b.is_healthy() else 0)
+        yield in_flight
+        yield limit
+        yield healthy
+
+
+def register_router_metrics(router) -> None:
+    """
+        Exposes the router's live state; call once per process.
+    """
+    REGISTRY.register(RouterCollector(router))
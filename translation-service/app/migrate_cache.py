@@ -0,0 +1,105 @@
+import argparse
+import os
+import re
+import unicodedata
+from collections import Counter
+
+from app.file_management import index_existing_files, TRANSLATED_BOOK_CACHE
+from app.utils.str_utils import canonize_str, generate_file_name, parse_file_name
+
+# One-off migration of the translated book cache to language-aware file names:
+# `python -m app.migrate_cache --default-language malay`
+# Old: title___author___trans_title___trans_author___timestamp.txt
+# New: title___author___language___trans_title___trans_author___timestamp.txt
+OLD_FILE_NAME = re.compile(r"^(.*?)___(.*?)___(.*?)___(.*?)___(\d{8}_\d{6})\.txt$")
+
+# first word of the unicode character name -> target language
+SCRIPT_LANGUAGES = {
+    "CJK": "chinese",
+    "THAI": "thai",
+    "TAMIL": "tamil",
+    "KHMER": "khmer",
+    "LAO": "lao",
+    "MYANMAR": "burmese",
+    "HANGUL": "korean",
+    "HIRAGANA": "japanese",
+    "KATAKANA": "japanese",
+    "DEVANAGARI": "hindi",
+    "ARABIC": "arabic",
+}
+SAMPLE_CHARS = 5000
+
+
+def detect_language(text: str) -> str | None:
+    """
+        Guesses the target language of a translated book from the dominant non-Latin script of its first characters.
+        Returns None for Latin-script text (e.g. malay, indonesian, vietnamese), which can't be told apart this way.
+    """
+    scripts = Counter()
+    for ch in text[:SAMPLE_CHARS]:
+        if ch.isalpha():
+            scripts[unicodedata.name(ch, "UNKNOWN").split(" ")[0]] += 1
+    for script, _ in scripts.most_common():
+        if script in SCRIPT_LANGUAGES:
+            return SCRIPT_LANGUAGES[script]
+        if script == "LATIN":
+            return None
+    return None
+
+
+def migrate_cache(
+    folder: str = TRANSLATED_BOOK_CACHE,
+    default_language: str | None = None,
+    dry_run: bool = False
+) -> dict:
+    """
+        Renames old cache files to the language-aware naming scheme.
+        Files whose language can't be detected (and no default_language is given) are left untouched.
+        Migrated files are added to the cache index.
+        Returns counts of migrated, skipped and already migrated files.
+    """
+    stats = { "migrated": 0, "skipped": 0, "up_to_date": 0 }
+    if not os.path.isdir(folder):
+        return stats
+
+    for entry in os.scandir(folder):
+        if not entry.name.endswith(".txt"):
+            continue
+        if parse_file_name(entry.name):
+            stats["up_to_date"] += 1
+            continue
+        match = OLD_FILE_NAME.match(entry.name)
+        if not match:
+            stats["skipped"] += 1
+            continue
+
+        with open(entry.path, "r", encoding="utf-8") as f:
+            language = detect_language(f.read(SAMPLE_CHARS)) or default_language
+        if not language:
+            print(f"[SKIP] {entry.name}: language not detected, pass --default-language")
+            stats["skipped"] += 1
+            continue
+
+        origin_title, origin_author, trans_title, trans_author, timestamp = match.groups()
+        new_name = generate_file_name(origin_title, origin_author, canonize_str(language), trans_title, trans_author, timestamp)
+        print(f"[MIGRATE] {entry.name} -> {new_name}")
+        if not dry_run:
+            # keep mtimes, the cache index seeds recency from them
+            stat = os.stat(entry.path)
+            new_path = os.path.join(folder, new_name)
+            os.replace(entry.path, new_path)
+            os.utime(new_path, (stat.st_atime, stat.st_mtime))
+        stats["migrated"] += 1
+
+    if not dry_run:
+        index_existing_files(folder)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the translated book cache to language-aware file names.")
+    parser.add_argument("--folder", default=TRANSLATED_BOOK_CACHE)
+    parser.add_argument("--default-language", help="language for files whose script can't be detected (e.g. malay)")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    print(migrate_cache(args.folder, args.default_language, args.dry_run))
@@ -1,33 +1,290 @@
 import asyncio
+import re
+import redis.asyncio as redis
 import time
 from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Mapping
+
+from app.metrics import RATE_LIMIT_WAIT_SECONDS
+
+# Sliding-window log of the calls made in the last window seconds, kept in one Redis sorted set scored by call time;
+# each member also records the LLM tokens the call took. Expiry and take happen atomically server-side, so like
+# RateLimiter no window of that length ever holds more than max_calls calls (or max_tokens tokens).
+# A shared pause key (set from Retry-After / rate-limit headers) blocks every process until it expires.
+# Returns "0" when the budget was taken, otherwise the seconds to wait before retrying.
+SLIDING_WINDOW_SCRIPT = """
+local pause = redis.call('PTTL', KEYS[2])
+if pause > 0 then
+    return tostring(pause / 1000)
+end
+local max_calls = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local max_tokens = tonumber(ARGV[3])
+local requested = math.min(tonumber(ARGV[4]), max_tokens)
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+-- oldest first: member, call time, member, call time...
+local calls = redis.call('ZRANGE', KEYS[1], 0, -1, 'WITHSCORES')
+local count = #calls / 2
+local wait = 0
+if count >= max_calls then
+    wait = tonumber(calls[2 * (count - max_calls) + 2]) + window - now
+end
+if max_tokens > 0 then
+    local used = 0
+    for i = 1, #calls, 2 do
+        used = used + tonumber(string.match(calls[i], ':(%d+):'))
+    end
+    -- wait until enough of the oldest calls leave the window to fit the request
+    local i = 1
+    while used + requested > max_tokens and i < #calls do
+        used = used - tonumber(string.match(calls[i], ':(%d+):'))
+        wait = math.max(wait, tonumber(calls[i + 1]) + window - now)
+        i = i + 2
+    end
+end
+if wait > 0 then
+    return tostring(wait)
+end
+redis.call('ZADD', KEYS[1], now, t[1] .. '.' .. t[2] .. ':' .. requested .. ':' .. count)
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000) + 1000)
+return '0'
+"""
+
+# Extends the shared pause, never shortens it
+PAUSE_SCRIPT = """
+local ms = tonumber(ARGV[1])
+if redis.call('PTTL', KEYS[1]) < ms then
+    redis.call('SET', KEYS[1], 1, 'PX', ms)
+end
+return ms
+"""
+
+DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = { "h": 3600, "m": 60, "s": 1, "ms": 0.001 }
+
+
+def parse_duration(value: str) -> float | None:
+    """
+        Parses rate-limit reset values such as "1.5", "20ms" or "6m0s" into seconds.
+    """
+    try:
+        return float(value)
+    except ValueError:
+        parts = DURATION_PART.findall(value)
+        if not parts:
+            return None
+        return sum(float(n) * DURATION_UNITS[unit] for n, unit in parts)
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> float | None:
+    """
+        Reads the server-requested backoff from retry-after-ms / retry-after (seconds or HTTP date).
+    """
+    if headers.get("retry-after-ms"):
+        return parse_duration(headers["retry-after-ms"]) / 1000
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    seconds = parse_duration(value)
+    if seconds is None:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return max(seconds, 0)
+
+
+def parse_rate_limit_reset(headers: Mapping[str, str]) -> float | None:
+    """
+        Returns how long to wait when x-ratelimit-remaining-{requests,tokens} reports an exhausted budget.
+    """
+    wait = None
+    for budget in ("requests", "tokens"):
+        remaining = headers.get(f"x-ratelimit-remaining-{budget}")
+        reset = headers.get(f"x-ratelimit-reset-{budget}")
+        if remaining is None or reset is None:
+            continue
+        try:
+            exhausted = float(remaining) <= 0
+        except ValueError:
+            continue
+        seconds = parse_duration(reset)
+        if exhausted and seconds is not None:
+            wait = max(wait or 0, seconds)
+    return wait
+
+
+class AIMDConcurrency:
+    """
+        Caps in-flight LLM requests with additive-increase/multiplicative-decrease.
+        Every success grows the limit by 1/limit (about +1 per full window of requests);
+        every throttle response cuts it by the decrease factor.
+    """
+    def __init__(self, max_limit: int, min_limit: int = 1, decrease: float = 0.5):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease = decrease
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.cond = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self.cond:
+            await self.cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def __aexit__(self, *exc):
+        async with self.cond:
+            self.in_flight -= 1
+            self.cond.notify_all()
+
+    def on_success(self) -> None:
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def on_throttle(self) -> None:
+        self.limit = max(self.min_limit, self.limit * self.decrease)
+
 
 class RateLimiter:
     """
         A simple rate limiter that allows a maximum number of calls within a specified time frame.
         Uses asyncio for asynchronous operation.
+        Optionally also enforces max_tokens LLM tokens per time frame, and adapts to API feedback
+        through pause() and an AIMD concurrency cap.
+        State lives in process memory, so each process gets its own budget.
     """
-    def __init__(self, max_calls: int, refill_rate: int):
+    def __init__(
+        self,
+        max_calls: int,
+        refill_rate: int,
+        max_tokens: int = 0,
+        max_concurrency: int | None = None,
+        name: str = "local"
+    ):
         self.max_calls = max_calls
         self.refill_rate = refill_rate
+        self.max_tokens = max_tokens
         self.calls = deque()
+        self.token_calls = deque()
+        self.used_tokens = 0
+        self.paused_until = 0.0
         self.lock = asyncio.Lock()
+        self.concurrency = AIMDConcurrency(max_concurrency or max_calls)
+        self.wait_seconds = RATE_LIMIT_WAIT_SECONDS.labels(limiter=name)
 
-    async def acquire(self):
+    async def acquire(self, tokens: int = 0):
         """
-            Acquires a slot for making an API call.
+            Acquires a slot for making an API call costing roughly tokens LLM tokens.
             If the rate limit is reached, it waits until a slot is available.
         """
+        waited = 0.0
+        while True:
+            wait_time = await self._take(tokens)
+            if wait_time is None:
+                self.wait_seconds.observe(waited)
+                return
+            await asyncio.sleep(wait_time)
+            waited += wait_time
+
+    async def try_acquire(self, tokens: int = 0) -> bool:
+        """
+            Takes a slot only if one is available right now, without waiting.
+        """
+        return await self._take(tokens) is None
+
+    async def _take(self, tokens: int) -> float | None:
+        """
+            Takes the budget for one call and returns None, or returns the seconds to wait when there is none.
+        """
+        tokens = min(tokens, self.max_tokens) if self.max_tokens else 0
         async with self.lock:
             now = time.monotonic()
             # refill new API calls
             while self.calls and self.calls[0] + self.refill_rate <= now:
                 self.calls.popleft()
-            if len(self.calls) < self.max_calls:
+            while self.token_calls and self.token_calls[0][0] + self.refill_rate <= now:
+                self.used_tokens -= self.token_calls.popleft()[1]
+
+            if now < self.paused_until:
+                return self.paused_until - now
+            if len(self.calls) < self.max_calls and self.used_tokens + tokens <= self.max_tokens:
                 self.calls.append(now)
-                return
-            
-            # wait until next API call slot frees up
-            wait_time = max(self.refill_rate - (now - self.calls[0]), 0)
-        await asyncio.sleep(wait_time)
-        await self.acquire()
\ No newline at end of file
+                if tokens:
+                    self.token_calls.append((now, tokens))
+                    self.used_tokens += tokens
+                return None
+
+            # wait until next API call slot (and enough token budget) frees up
+            wait_time = 0
+            if len(self.calls) >= self.max_calls:
+                wait_time = self.refill_rate - (now - self.calls[0])
+            freed = self.used_tokens
+            for ts, n in self.token_calls:
+                if freed + tokens <= self.max_tokens:
+                    break
+                freed -= n
+                wait_time = max(wait_time, self.refill_rate - (now - ts))
+            return max(wait_time, 0)
+
+    async def pause(self, seconds: float) -> None:
+        """
+            Blocks new acquisitions for the given number of seconds.
+        """
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def feedback(self, headers: Mapping[str, str], throttled: bool = False) -> None:
+        """
+            Adapts to the provider's response: honours Retry-After and exhausted rate-limit
+            headers by pausing, and adjusts the AIMD concurrency cap.
+        """
+        wait_time = parse_retry_after(headers)
+        if wait_time is None:
+            wait_time = parse_rate_limit_reset(headers)
+        if wait_time:
+            await self.pause(wait_time)
+
+        if throttled:
+            self.concurrency.on_throttle()
+        else:
+            self.concurrency.on_success()
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+        Cluster-wide sliding-window limiter with the same acquire() interface and limits as RateLimiter.
+        Every process and replica sharing the Redis key draws from one budget of
+        max_calls (and max_tokens) in any refill_rate seconds.
+    """
+    def __init__(
+        self,
+        server: redis.Redis,
+        max_calls: int,
+        refill_rate: int,
+        key: str = "ratelimit:sealion",
+        max_tokens: int = 0,
+        max_concurrency: int | None = None
+    ):
+        super().__init__(max_calls, refill_rate, max_tokens, max_concurrency, name=key)
+        self.key = key
+        self.script = server.register_script(SLIDING_WINDOW_SCRIPT)
+        self.pause_script = server.register_script(PAUSE_SCRIPT)
+
+    async def _take(self, tokens: int) -> float | None:
+        """
+            Records one call (and tokens LLM tokens) in the shared window,
+            or returns the server-computed wait when it is full or the budget is paused.
+        """
+        wait_time = float(await self.script(
+            keys=[f"{self.key}:window", f"{self.key}:pause"],
+            args=[self.max_calls, self.refill_rate, self.max_tokens, tokens]
+        ))
+        return wait_time if wait_time > 0 else None
+
+    async def pause(self, seconds: float) -> None:
+        """
+            Blocks new acquisitions in every process sharing the key.
+        """
+        await self.pause_script(keys=[f"{self.key}:pause"], args=[int(seconds * 1000)])
@@ -9,4 +9,5 @@ class TranslateRequest(BaseModel):
 class CancelRequest(BaseModel):
     origin_title: str
     origin_author: str
+    language: str
     email: str
\ No newline at end of file
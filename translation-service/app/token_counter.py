@@ -0,0 +1,96 @@
+import os
+import threading
+from dotenv import load_dotenv
+from pathlib import Path
+
+load_dotenv()
+
+TOKENIZER_REPO = os.getenv("TOKENIZER_REPO", "aisingapore/Gemma-SEA-LION-v4-27B-IT")
+TOKENIZER_PATH = os.getenv(
+    "TOKENIZER_PATH",
+    str(Path(__file__).parent / "assets" / "tokenizer.json")
+)
+HF_TOKEN = os.getenv("HF_TOKEN")
+
+class TokenCounter:
+    """
+        Token counting backed only by the serialized `tokenizers` JSON, without transformers/torch.
+        The tokenizer is loaded on first use (or via preload()), never at import time.
+        Loading is guarded by a lock so concurrent first calls only load it once.
+    """
+    def __init__(self, path: str, repo: str):
+        self.path = path
+        self.repo = repo
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    @property
+    def tokenizer(self):
+        if self._tokenizer is None:
+            with self._lock:
+                if self._tokenizer is None:
+                    self._tokenizer = self._load()
+        return self._tokenizer
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._tokenizer is not None
+
+    def _load(self):
+        """
+            Loads tokenizer.json from the bundled/local path.
+            Falls back to fetching only tokenizer.json from the hub, and saves it locally for next time.
+        """
+        from tokenizers import Tokenizer
+
+        if Path(self.path).is_file():
+            return Tokenizer.from_file(self.path)
+
+        print(f"[TOKENIZER] {self.path} not found, fetching tokenizer.json for {self.repo}")
+        tokenizer = Tokenizer.from_pretrained(self.repo, token=HF_TOKEN)
+        try:
+            os.makedirs(Path(self.path).parent, exist_ok=True)
+            tokenizer.save(self.path)
+        except OSError as e:
+            print(f"[TOKENIZER] Could not save tokenizer to {self.path}: {e}")
+        return tokenizer
+
+    def preload(self) -> None:
+        """
+            Forces the tokenizer to load. Call from a startup hook, or before forking workers
+            so that the loaded tokenizer is shared copy-on-write.
+        """
+        self.tokenizer
+
+    def encode(self, text: str, add_special_tokens: bool = True) -> list[int]:
+        return self.tokenizer.encode(text, add_special_tokens=add_special_tokens).ids
+
+    def decode(self, ids: list[int]) -> str:
+        return self.tokenizer.decode(ids)
+
+    def offsets(self, text: str) -> list[tuple[int, int]]:
+        """
+            Returns the (start, end) character span of each token of text, excluding special tokens.
+        """
+        return self.tokenizer.encode(text, add_special_tokens=False).offsets
+
+    def count(self, text: str) -> int:
+        """
+            Returns the number of tokens in text, excluding special tokens.
+        """
+        return len(self.encode(text, add_special_tokens=False))
+
+
+token_counter = TokenCounter(TOKENIZER_PATH, TOKENIZER_REPO)
+
+def preload_tokenizer() -> None:
+    """
+        Loads the process-wide tokenizer. Safe to call more than once.
+    """
+    token_counter.preload()
+
+
+if __name__ == "__main__":
+    # Bundle tokenizer.json into TOKENIZER_PATH, e.g. at image build time
+    preload_tokenizer()
+    print(f"Tokenizer ready at {token_counter.path}")
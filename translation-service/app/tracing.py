@@ -0,0 +1,331 @@
+import asyncio
+import contextvars
+import json
+import os
+import redis.asyncio as redis
+import secrets
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# OpenTelemetry-style job tracing without the SDK: the trace id is the job id (32 hex digits), the root span covers
+# the job from the request to its end state and every chunk attempt, limiter wait, LLM request and storage call is a span.
+# Spans of all processes are kept per job in Redis (for /translation_timeline) and, if TRACE_EXPORT_FILE is set,
+# appended to that file as OTLP/JSON lines that an OpenTelemetry collector's otlpjsonfile receiver can ingest.
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE")
+SERVICE_NAME = os.getenv("SERVICE_NAME", "translation-service")
+JOB_TRACE_TTL = 24 * 60 * 60
+# spans kept per job; the rest are dropped
+MAX_TRACE_SPANS = 20000
+
+# (job_id, span_id) of the innermost open span of this task
+_current_span: contextvars.ContextVar[tuple[str, str] | None] = contextvars.ContextVar("current_span", default=None)
+# finished spans not yet written, flushed when a top-level span ends
+_pending: list[tuple[str, dict]] = []
+# serializes appends of the export threads, so lines longer than the write buffer don't interleave
+_export_lock = threading.Lock()
+
+
+def root_span_id(job_id: str) -> str:
+    return job_id[:16]
+
+
+def job_trace_keys(job_id: str) -> list[str]:
+    """
+        Keys of the job's trace, dropped when a new run of the job starts (see start_translation_job).
+    """
+    return [f"job:{job_id}:spans", f"job:{job_id}:trace"]
+
+
+class Span:
+    """
+        Async context manager timing one operation of a job.
+        Nested spans (in the same task) get it as parent, top-level ones the job's root span.
+        Attributes can be added while it is open with set().
+    """
+    def __init__(self, server: redis.Redis, job_id: str, name: str, attrs: dict):
+        self.server = server
+        self.job_id = job_id
+        self.name = name
+        self.attrs = attrs
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = None
+        self.start = 0
+        self.error = None
+        self._token = None
+
+    def set(self, **attrs) -> None:
+        self.attrs.update(attrs)
+
+    async def __aenter__(self) -> "Span":
+        if not TRACING_ENABLED:
+            return self
+        current = _current_span.get()
+        self.parent_id = current[1] if current and current[0] == self.job_id else root_span_id(self.job_id)
+        self._token = _current_span.set((self.job_id, self.span_id))
+        self.start = time.time_ns()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        if not TRACING_ENABLED:
+            return
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        _pending.append((self.job_id, self.to_dict(time.time_ns())))
+        if self.parent_id == root_span_id(self.job_id):
+            await flush_spans(self.server)
+
+    def to_dict(self, end: int) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "end": end,
+            "attrs": self.attrs,
+            "error": self.error
+        }
+
+
+def span(server: redis.Redis, job_id: str, name: str, **attrs) -> Span:
+    """
+        Starts a span of the job: `async with span(server, job_id, "llm.request", backend=...) as s:`
+    """
+    return Span(server, job_id, name, attrs)
+
+
+async def record_span(
+    server: redis.Redis,
+    job_id: str,
+    name: str,
+    start: int,
+    end: int,
+    parent_id: str | None = None,
+    **attrs
+) -> str | None:
+    """
+        Records a span timed by the caller (nanosecond timestamps), e.g. work done before the job id was known,
+        a backoff ending in the future or a request shared by several jobs, as a child of parent_id
+        (default the job's root span). Returns its span id.
+    """
+    if not TRACING_ENABLED:
+        return None
+    span_id = secrets.token_hex(8)
+    _pending.append((job_id, {
+        "name": name,
+        "span_id": span_id,
+        "parent_id": parent_id or root_span_id(job_id),
+        "start": start,
+        "end": end,
+        "attrs": attrs,
+        "error": None
+    }))
+    await flush_spans(server)
+    return span_id
+
+
+async def flush_spans(server: redis.Redis) -> None:
+    """
+        Writes the finished spans of this process in one pipeline, and to TRACE_EXPORT_FILE if set.
+    """
+    if not _pending:
+        return
+    batch = _pending[:]
+    _pending.clear()
+    async with server.pipeline(transaction=False) as pipe:
+        for job_id in {job_id for job_id, _ in batch}:
+            pipe.rpush(f"job:{job_id}:spans", *[json.dumps(s) for j, s in batch if j == job_id])
+            pipe.ltrim(f"job:{job_id}:spans", 0, MAX_TRACE_SPANS - 1)
+            pipe.expire(f"job:{job_id}:spans", JOB_TRACE_TTL)
+        await pipe.execute()
+    await export_spans(batch)
+
+
+async def start_job_trace(server: redis.Redis, job_id: str, start: int | None = None) -> None:
+    """
+        Opens the job's root span (at start, in nanoseconds, default now).
+        Spans of a previous run were dropped when this run was claimed, so spans already recorded by workers are kept.
+    """
+    if not TRACING_ENABLED:
+        return
+    async with server.pipeline(transaction=True) as pipe:
+        pipe.hset(f"job:{job_id}:trace", mapping={ "start": start or time.time_ns() })
+        pipe.expire(f"job:{job_id}:trace", JOB_TRACE_TTL)
+        await pipe.execute()
+
+
+async def end_job_trace(server: redis.Redis, job_id: str, state: str) -> None:
+    """
+        Closes the job's root span with its end state and exports it.
+    """
+    if not TRACING_ENABLED:
+        return
+    end = time.time_ns()
+    async with server.pipeline(transaction=False) as pipe:
+        pipe.hget(f"job:{job_id}:trace", "start")
+        pipe.hset(f"job:{job_id}:trace", mapping={ "end": end, "state": state })
+        pipe.expire(f"job:{job_id}:trace", JOB_TRACE_TTL)
+        start, _, _ = await pipe.execute()
+    await export_spans([(job_id, {
+        "name": "job",
+        "span_id": root_span_id(job_id),
+        "parent_id": None,
+        "start": int(start or end),
+        "end": end,
+        "attrs": { "job_id": job_id, "state": state },
+        "error": None if state == "finished" else state
+    })])
+
+# ------ EXPORT ----------
+
+def otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return { "boolValue": value }
+    if isinstance(value, int):
+        return { "intValue": str(value) }
+    if isinstance(value, float):
+        return { "doubleValue": value }
+    return { "stringValue": str(value) }
+
+
+def to_otlp(job_id: str, s: dict) -> dict:
+    """
+        Converts a span to the OTLP/JSON span encoding.
+    """
+    res = {
+        "traceId": job_id,
+        "spanId": s["span_id"],
+        "name": s["name"],
+        "kind": 1,
+        "startTimeUnixNano": str(s["start"]),
+        "endTimeUnixNano": str(s["end"]),
+        "attributes": [{ "key": k, "value": otlp_value(v) } for k, v in s["attrs"].items() if v is not None],
+        "status": { "code": 2, "message": s["error"] } if s["error"] else { "code": 1 }
+    }
+    if s["parent_id"]:
+        res["parentSpanId"] = s["parent_id"]
+    return res
+
+
+def append_export_line(line: str) -> None:
+    with _export_lock, open(TRACE_EXPORT_FILE, "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+async def export_spans(batch: list[tuple[str, dict]]) -> None:
+    """
+        Appends the spans to TRACE_EXPORT_FILE as one OTLP/JSON ExportTraceServiceRequest per line.
+        The file is written in a worker thread, so a slow disk doesn't stall the event loop.
+    """
+    if not TRACE_EXPORT_FILE or not batch:
+        return
+    request = {
+        "resourceSpans": [{
+            "resource": { "attributes": [
+                { "key": "service.name", "value": { "stringValue": SERVICE_NAME } },
+                { "key": "process.pid", "value": { "intValue": str(os.getpid()) } }
+            ] },
+            "scopeSpans": [{
+                "scope": { "name": "app.tracing" },
+                "spans": [to_otlp(job_id, s) for job_id, s in batch]
+            }]
+        }]
+    }
+    await asyncio.to_thread(append_export_line, json.dumps(request) + "\n")
+
+# ------ TIMELINE ----------
+
+# span name -> the category its time is accounted to on the critical path
+SPAN_CATEGORIES = {
+    "chunking": "chunking",
+    "book_info": "book_info",
+    "rate_limit.wait": "rate_limit",
+    "llm.request": "llm",
+    "chunk.backoff": "retry_backoff",
+    "redis.progress": "redis",
+    "finalize.storage": "storage",
+    "finalize.redis": "redis",
+}
+
+
+async def get_job_timeline(server: redis.Redis, job_id: str) -> dict | None:
+    """
+        Summarizes a job's trace: time per span name, and the critical path, i.e. the chain that ended last:
+        work before the chunks were queued, the last chunk to complete (queueing, limiter waits, LLM requests,
+        retries and backoffs of each of its attempts) and finalization.
+        Returns None when the job has no trace.
+    """
+    async with server.pipeline(transaction=False) as pipe:
+        pipe.hgetall(f"job:{job_id}:trace")
+        pipe.lrange(f"job:{job_id}:spans", 0, -1)
+        trace, raw_spans = await pipe.execute()
+    if not trace:
+        return None
+
+    spans = [json.loads(s) for s in raw_spans]
+    job_end = int(trace["end"]) if "end" in trace else time.time_ns()
+    # a job can end before the API opened its root span
+    job_start = int(trace["start"]) if "start" in trace else min((s["start"] for s in spans), default=job_end)
+
+    totals = {}
+    for s in spans:
+        t = totals.setdefault(s["name"], { "count": 0, "seconds": 0.0, "errors": 0 })
+        t["count"] += 1
+        t["seconds"] += (s["end"] - s["start"]) / 1e9
+        t["errors"] += 1 if s["error"] else 0
+
+    def segment(s: dict) -> dict:
+        return {
+            "name": s["name"],
+            "offset_s": round((s["start"] - job_start) / 1e9, 3),
+            "duration_s": round((s["end"] - s["start"]) / 1e9, 3),
+            **{ k: v for k, v in s["attrs"].items() if k in ("chunk_no", "chunk_tokens", "attempt", "backend", "tokens", "outcome", "packed") }
+        }
+
+    # the chunk whose successful attempt ended last gated finalization
+    top_level = [s for s in spans if s["parent_id"] == root_span_id(job_id)]
+    attempts = [s for s in top_level if s["name"] == "chunk.attempt"]
+    done = [s for s in attempts if s["attrs"].get("outcome") == "translated"]
+    last = max(done, key=lambda s: s["end"], default=None)
+
+    path = [s for s in top_level if s["name"] in ("chunking", "book_info")]
+    if last is not None:
+        chunk_no = last["attrs"].get("chunk_no")
+        chain = sorted(
+            (s for s in top_level if s["attrs"].get("chunk_no") == chunk_no and s["name"] in ("chunk.attempt", "chunk.backoff")),
+            key=lambda s: s["start"]
+        )
+        children = {}
+        for s in spans:
+            children.setdefault(s["parent_id"], []).append(s)
+        for s in chain:
+            path.append(s)
+            path.extend(sorted(children.get(s["span_id"], []), key=lambda c: c["start"]))
+    path.extend(s for s in top_level if s["name"] == "finalize")
+    path.extend(s for s in spans if s["name"] in ("finalize.storage", "finalize.redis"))
+
+    # time on the critical path per category; whatever no span covers (mostly waiting in the queue) is "queued_or_untraced"
+    breakdown = {}
+    for s in path:
+        category = SPAN_CATEGORIES.get(s["name"])
+        if category:
+            breakdown[category] = breakdown.get(category, 0.0) + (s["end"] - s["start"]) / 1e9
+    total = (job_end - job_start) / 1e9
+    breakdown["queued_or_untraced"] = max(total - sum(breakdown.values()), 0.0)
+
+    return {
+        "job_id": job_id,
+        "state": trace.get("state", "running"),
+        "duration_s": round(total, 3),
+        "spans": len(spans),
+        "totals": { k: { **v, "seconds": round(v["seconds"], 3) } for k, v in sorted(totals.items()) },
+        "critical_path": {
+            "chunk_no": last["attrs"].get("chunk_no") if last else None,
+            "breakdown_s": { k: round(v, 3) for k, v in sorted(breakdown.items(), key=lambda kv: -kv[1]) },
+            "segments": [segment(s) for s in path]
+        }
+    }
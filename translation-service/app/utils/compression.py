@@ -0,0 +1,73 @@
+import gzip
+import os
+from dotenv import load_dotenv
+from typing import BinaryIO
+
+try:
+    import zstandard
+except ImportError:  # gzip fallback
+    zstandard = None
+
+load_dotenv()
+
+# "zstd" (falls back to gzip when zstandard isn't installed), "gzip" or "none"
+STORAGE_COMPRESSION = os.getenv("STORAGE_COMPRESSION", "zstd")
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", 3))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", 6))
+# values this small rarely shrink, store them as plain UTF-8
+MIN_COMPRESS_BYTES = 128
+
+# Format markers: the frame magic numbers. Neither is a valid UTF-8 prefix
+# (0xB5 / 0x8B are continuation bytes), so plain UTF-8 entries written before compression still read.
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def compress_text(text: str, method: str = STORAGE_COMPRESSION) -> bytes:
+    """
+        Encodes text as UTF-8 and compresses it with zstd or gzip, whose frame header marks the format.
+    """
+    data = text.encode("utf-8")
+    if len(data) < MIN_COMPRESS_BYTES or method == "none":
+        return data
+    if method == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decompress_text(data: bytes | str | None) -> str | None:
+    """
+        Inverse of compress_text. Plain UTF-8 (bytes or an already decoded str) passes through.
+    """
+    if data is None or isinstance(data, str):
+        return data
+    if data.startswith(ZSTD_MAGIC):
+        if zstandard is None:
+            raise RuntimeError("zstd-compressed entry but zstandard is not installed")
+        # a decompressobj also reads streamed frames, whose header carries no content size
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data).decode("utf-8")
+    if data.startswith(GZIP_MAGIC):
+        return gzip.decompress(data).decode("utf-8")
+    return data.decode("utf-8")
+
+
+class CompressedWriter:
+    """
+        Streaming compress_text: text written piece by piece is encoded as UTF-8 and compressed into f
+        in the same format, so decompress_text reads the result. close() ends the frame; f stays open.
+    """
+    def __init__(self, f: BinaryIO, method: str = STORAGE_COMPRESSION):
+        self.f = f
+        if method == "none":
+            self.out = None
+        elif method == "zstd" and zstandard is not None:
+            self.out = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(f, closefd=False)
+        else:
+            self.out = gzip.GzipFile(fileobj=f, mode="wb", compresslevel=GZIP_LEVEL, mtime=0)
+
+    def write(self, text: str) -> None:
+        (self.out or self.f).write(text.encode("utf-8"))
+
+    def close(self) -> None:
+        if self.out is not None:
+            self.out.close()
@@ -1,5 +1,6 @@
 import re
 import time
+import unicodedata
 
 def sanitize_filename(file: str) -> str:
     return re.sub(r"[^\w\d\-_.]", "_", file)
@@ -8,6 +9,7 @@ def sanitize_filename(file: str) -> str:
 def generate_file_name(
     origin_title: str,
     origin_author: str,
+    language: str,
     trans_title: str,
     trans_author: str,
     timestamp: str = None
@@ -16,6 +18,7 @@ def generate_file_name(
     file_name = (
         f"{sanitize_filename(origin_title)[:40]}___"
         f"{sanitize_filename(origin_author)[:30]}___"
+        f"{sanitize_filename(canonize_str(language))[:20]}___"
         f"{sanitize_filename(trans_title)[:40]}___"
         f"{sanitize_filename(trans_author)[:30]}___"
         f"{timestamp}.txt"
@@ -23,22 +26,26 @@ def generate_file_name(
     return file_name
 
 
-def generate_file_regex_pattern(
-    origin_title: str,
-    origin_author: str
-) -> re.Pattern:
-    origin_title = sanitize_filename(origin_title)[:40]
-    origin_author = sanitize_filename(origin_author)[:30]
-    pattern = (
-        f"^{re.escape(origin_title)}___"
-        f"{re.escape(origin_author)}___"
-        r".*___"
-        r".*___"
-        r"\d{8}_\d{6}\.txt$"
-    )
-    return re.compile(pattern)
+FILE_NAME_PATTERN = re.compile(r"^(.*?)___(.*?)___(.*?)___(.*?)___(.*?)___(\d{8}_\d{6})\.txt$")
+
+
+def parse_file_name(file_name: str) -> tuple[str, ...] | None:
+    # (origin_title, origin_author, language, trans_title, trans_author, timestamp) of a cached book file
+    match = FILE_NAME_PATTERN.match(file_name)
+    return match.groups() if match else None
 
 
 def canonize_str(s: str) -> str:
     # strip, lowercase, normalize, remove whitespace/punctuation for safety
-    return "".join(filter(str.isalnum, s)).lower()
\ No newline at end of file
+    return "".join(filter(str.isalnum, s)).lower()
+
+
+def normalize_book_line(line: str) -> str:
+    # NFC, no trailing whitespace; line breaks never combine, so normalizing line by line equals normalizing the text
+    return unicodedata.normalize("NFC", line).rstrip()
+
+
+def normalize_book_text(text: str) -> str:
+    # NFC, unified line endings, no trailing whitespace per line or around the book
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(normalize_book_line(line) for line in text.split("\n")).strip()
@@ -0,0 +1,50 @@
+import asyncio
+import os
+from dotenv import load_dotenv
+from prometheus_client import start_http_server
+
+from app.book_translation import (
+    API_RATE_LIMIT,
+    refill_rate,
+    TRANSLATION_MODEL,
+    start_translation_workers,
+    stop_translation_workers
+)
+from app.job_handler import init_redis
+from app.llm_client import close_llm_client, init_llm_client
+from app.llm_router import init_llm_router
+from app.metrics import METRICS_PORT, register_router_metrics
+from app.token_counter import preload_tokenizer
+
+load_dotenv()
+
+# Standalone queue consumer: `python -m app.worker`
+# Scale translation throughput by running more of these (or more k8s replicas)
+redis_port = os.getenv("REDIS_PORT")
+API_TOKEN_LIMIT = int(os.getenv("API_TOKEN_LIMIT", 0))
+TRANSLATION_WORKERS = int(os.getenv("TRANSLATION_WORKERS", API_RATE_LIMIT))
+
+async def main() -> None:
+    """
+        Runs TRANSLATION_WORKERS consumers of the shared translation queue until interrupted.
+        Serves this process' metrics on METRICS_PORT, if set.
+        The tokenizer is loaded before the first task, so no worker pays for it mid-chunk.
+    """
+    redis_server = init_redis(redis_port)
+    llm_router = init_llm_router(redis_server, TRANSLATION_MODEL, API_RATE_LIMIT, refill_rate, API_TOKEN_LIMIT)
+    register_router_metrics(llm_router)
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
+    await asyncio.to_thread(preload_tokenizer)
+    init_llm_client()
+    workers = start_translation_workers(TRANSLATION_WORKERS, llm_router, redis_server)
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        await stop_translation_workers(workers)
+        await close_llm_client()
+        await redis_server.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
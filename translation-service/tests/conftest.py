@@ -0,0 +1,37 @@
+import os
+import tempfile
+from pathlib import Path
+
+# A small byte-level BPE tokenizer trained here stands in for the bundled SEA-LION tokenizer.json,
+# which is fetched from the hub at image build time.
+TEST_TOKENIZER = Path(tempfile.gettempdir()) / "translation-service-tests" / "tokenizer.json"
+TOKENIZER_CORPUS = [
+    "The quick brown fox jumps over the lazy dog. " * 20,
+    "You don't have to be French to enjoy a decent red wine, Charles used to tell his guests. " * 20,
+    "Para word sentence chapter book translation language chinese malay thai. " * 20,
+]
+
+
+def build_test_tokenizer(path: Path) -> None:
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+
+    tokenizer = Tokenizer(models.BPE())
+    tokenizer.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    tokenizer.decoder = decoders.ByteLevel()
+    trainer = trainers.BpeTrainer(
+        vocab_size=600,
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet(),
+        show_progress=False
+    )
+    tokenizer.train_from_iterator(TOKENIZER_CORPUS, trainer)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tokenizer.save(str(path))
+
+
+def pytest_configure(config):
+    # before any app module is imported: they read their settings at import time
+    if not os.getenv("TOKENIZER_PATH"):
+        if not TEST_TOKENIZER.is_file():
+            build_test_tokenizer(TEST_TOKENIZER)
+        os.environ["TOKENIZER_PATH"] = str(TEST_TOKENIZER)
+    os.environ.setdefault("SEALION_API_KEY", "test")
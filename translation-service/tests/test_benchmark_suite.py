@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from app import benchmark_suite
+from app.benchmark_mock_llm import MockLLMConfig
+from app.benchmark_suite import compare_results
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_compare_flags_only_metrics_beyond_the_threshold():
+    baseline = { "results": { "chunking": [
+        { "corpus": "generated_1MB", "max_tokens": 2000, "seconds": 1.0, "chunks": 10 },
+        { "corpus": "generated_2MB", "max_tokens": 2000, "seconds": 2.0, "chunks": 20 },
+    ] } }
+    current = { "results": { "chunking": [
+        { "corpus": "generated_1MB", "max_tokens": 2000, "seconds": 1.05, "chunks": 10 },
+        { "corpus": "generated_2MB", "max_tokens": 2000, "seconds": 3.0, "chunks": 20 },
+        # no baseline row to compare with
+        { "corpus": "generated_4MB", "max_tokens": 2000, "seconds": 9.0, "chunks": 40 },
+    ] } }
+    changes = compare_results(baseline, current)
+    assert [(scenario, metric, prev, value) for scenario, _, metric, prev, value, _ in changes] == [
+        ("chunking", "seconds", 2.0, 3.0)
+    ]
+
+
+def test_redis_scenarios_are_skipped_without_redis(monkeypatch):
+    monkeypatch.setattr(benchmark_suite, "connect_redis", lambda port: None)
+    monkeypatch.setattr(benchmark_suite, "CORPUS_SIZES_MB", [0.01])
+    monkeypatch.setattr(benchmark_suite, "MAX_TOKENS_LIST", [2000])
+
+    report = run(benchmark_suite.run_suite(["chunking", "bookkeeping"], None, MockLLMConfig()))
+    assert report["meta"]["skipped"] == ["bookkeeping"]
+    assert list(report["results"]) == ["chunking"]
+    assert report["results"]["chunking"]
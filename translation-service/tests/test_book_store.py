@@ -0,0 +1,101 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+import app.file_management as file_management
+import app.main as main
+from app.book_translation import finalize_translation_job
+from app.file_management import BookFileWriter, read_file_in_local_storage, write_file_to_local_storage
+from app.job_handler import (
+    ASSEMBLY_BATCH_CHUNKS,
+    create_job_id,
+    get_job_result,
+    iter_saved_chunk_batches,
+    start_translation_job,
+    update_translation_job_progress,
+)
+from app.migrate_cache import migrate_cache
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    # the book cache folder is relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    server = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(main, "redis_server", server)
+    return server
+
+
+def test_migrated_book_is_served_without_redis_state(server, tmp_path):
+    folder = tmp_path / "translated_books_cache"
+    folder.mkdir()
+    legacy = folder / "Old Book___Old Author___旧书___老作者___20240101_120000.txt"
+    legacy.write_text("很久以前，有一本旧书。", encoding="utf-8")
+
+    assert migrate_cache(str(folder))["migrated"] == 1
+
+    progress = run(main.get_translation_progress("Old Book", "Old Author", "chinese"))
+    assert progress == { "running": False, "chunks_remaining": 0, "result": "很久以前，有一本旧书。" }
+
+    variants = run(main.translated_languages("Old Book", "Old Author"))
+    assert variants["languages"] == { "chinese": create_job_id("Old Book", "Old Author", "chinese") }
+
+
+def test_unknown_book_is_not_found(server):
+    with pytest.raises(HTTPException) as e:
+        run(main.get_translation_progress("No Such Book", "Nobody", "chinese"))
+    assert e.value.status_code == 404
+    assert run(main.translated_languages("No Such Book", "Nobody"))["languages"] == {}
+
+
+def test_least_recently_read_book_is_evicted(tmp_path, monkeypatch):
+    folder = str(tmp_path / "cache")
+    monkeypatch.setattr(file_management, "MAX_CACHE_ENTRIES", 2)
+    for title in ("First", "Second"):
+        write_file_to_local_storage(f"{title} text", title, "Author", title, "Author", "chinese", folder)
+    # reading the first book makes the second the least recently used
+    assert read_file_in_local_storage("First", "Author", "chinese", folder) == "First text"
+    write_file_to_local_storage("Third text", "Third", "Author", "Third", "Author", "chinese", folder)
+
+    assert read_file_in_local_storage("Second", "Author", "chinese", folder) == ""
+    assert read_file_in_local_storage("First", "Author", "chinese", folder) == "First text"
+    assert len([f for f in os.listdir(folder) if f.endswith(".txt")]) == 2
+
+
+def test_finished_book_is_assembled_in_chunk_order(server):
+    total = ASSEMBLY_BATCH_CHUNKS * 2 + 5
+    book_info = { "origin_title": "A Book", "origin_author": "An Author", "trans_title": "一本书", "trans_author": "作者" }
+
+    async def scenario():
+        job_id = create_job_id("A Book", "An Author", "chinese")
+        await start_translation_job(server, "a@b.c", job_id, book_info, "chinese", total)
+        for chunk_no in reversed(range(total)):
+            await update_translation_job_progress(server, job_id, chunk_no, f" 第{chunk_no}段。\n", total)
+        windows = [batch async for batch in iter_saved_chunk_batches(server, job_id, batch_size=10)]
+        assert [len(w) for w in windows] == [10] * (total // 10) + [total % 10]
+
+        assert await finalize_translation_job(job_id, server)
+        expected = "\n\n".join(f"第{n}段。" for n in range(total))
+        assert await get_job_result(server, job_id) == expected
+        assert not await server.exists(f"job:{job_id}:result:partial")
+        assert read_file_in_local_storage("A Book", "An Author", "chinese") == expected
+
+    run(scenario())
+
+
+def test_aborted_book_file_leaves_nothing_behind(tmp_path):
+    folder = str(tmp_path)
+    writer = BookFileWriter("A Book", "An Author", "一本书", "作者", "chinese", folder)
+    writer.write("一半")
+    writer.abort()
+    assert read_file_in_local_storage("A Book", "An Author", "chinese", folder) == ""
+    assert [f for f in os.listdir(folder) if not f.startswith(file_management.CACHE_INDEX_FILE)] == []
@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app import book_translation
+from app.chunk_cache import (
+    CHUNK_CACHE_PREFIX,
+    chunk_cache_key,
+    get_cache_stats,
+    get_cached_translation,
+    set_cached_translation,
+)
+from app.job_handler import fetch_saved_chunks, start_translation_job
+from app.llm_router import LLMBackend, LLMRouter
+from app.rate_limiter import RateLimiter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_key_depends_on_prompt_model_language_and_exact_text():
+    key = chunk_cache_key("Hello.", "Chinese", "model-a", "1")
+    assert key == chunk_cache_key("Hello.", " chinese ", "model-a", "1")
+    assert len({
+        key,
+        chunk_cache_key("Hello. ", "chinese", "model-a", "1"),
+        chunk_cache_key("Hello.", "malay", "model-a", "1"),
+        chunk_cache_key("Hello.", "chinese", "model-b", "1"),
+        chunk_cache_key("Hello.", "chinese", "model-a", "2"),
+    }) == 5
+
+
+def test_redis_tier_and_stats():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        key = chunk_cache_key("Hello.", "chinese", "model-a", "1")
+        assert await get_cached_translation(server, key, folder=None) is None
+        await set_cached_translation(server, key, "你好。", folder=None)
+        assert await get_cached_translation(server, key, folder=None) == "你好。"
+        assert await server.ttl(f"{CHUNK_CACHE_PREFIX}:{key}") > 0
+        assert await get_cache_stats(server) == { "hits": 1, "misses": 1, "hit_ratio": 0.5 }
+
+    run(scenario())
+
+
+def test_disk_tier_refills_redis(tmp_path):
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        key = chunk_cache_key("Hello.", "chinese", "model-a", "1")
+        await set_cached_translation(server, key, "你好。", folder=str(tmp_path))
+        await server.flushall()
+
+        assert await get_cached_translation(server, key, folder=str(tmp_path)) == "你好。"
+        assert await server.get(f"{CHUNK_CACHE_PREFIX}:{key}") == "你好。"
+
+    run(scenario())
+
+
+def test_lookup_over_several_models_takes_the_first_found(tmp_path):
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        keys = [chunk_cache_key("Hello.", "chinese", model, "1") for model in ("model-a", "model-b", "model-c")]
+        assert await get_cached_translation(server, keys, folder=str(tmp_path)) is None
+
+        await set_cached_translation(server, keys[2], "你好（c）。", folder=None)
+        await set_cached_translation(server, keys[1], "你好（b）。", folder=str(tmp_path))
+        assert await get_cached_translation(server, keys, folder=str(tmp_path)) == "你好（b）。"
+
+        # only on disk: found there and put back in Redis
+        await server.delete(f"{CHUNK_CACHE_PREFIX}:{keys[1]}", f"{CHUNK_CACHE_PREFIX}:{keys[2]}")
+        assert await get_cached_translation(server, keys, folder=str(tmp_path)) == "你好（b）。"
+        assert await server.exists(f"{CHUNK_CACHE_PREFIX}:{keys[1]}")
+        assert await get_cache_stats(server) == { "hits": 2, "misses": 1, "hit_ratio": 2 / 3 }
+
+    run(scenario())
+
+
+def test_worker_serves_cached_chunks_without_the_llm(monkeypatch):
+    async def unreachable(*args, **kwargs):
+        raise AssertionError("the LLM was called for a cached chunk")
+
+    monkeypatch.setattr(book_translation, "translate_chunk", unreachable)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", { "origin_title": "A", "origin_author": "B" }, "chinese", 1)
+        # translated earlier by the pool's second model
+        key = chunk_cache_key("Hello.", "chinese", "model-b", book_translation.TRANSLATE_PROMPT_VERSION)
+        await set_cached_translation(server, key, "你好。", folder=None)
+
+        limiters = [RateLimiter(1, 60), RateLimiter(1, 60)]
+        router = LLMRouter([
+            LLMBackend("a", "model-a", limiters[0], weight=2),
+            LLMBackend("b", "model-b", limiters[1])
+        ])
+        assert await book_translation.worker("job-1", 0, "Hello.", "chinese", 1, router, server)
+        assert await fetch_saved_chunks(server, "job-1") == ["你好。"]
+        # no limiter was touched
+        assert not any(rl.calls for rl in limiters)
+
+    run(scenario())
@@ -0,0 +1,94 @@
+import pytest
+
+from app import chunk_tuner
+from app.chunk_tuner import (
+    LatencyModel,
+    ThroughputBudget,
+    choose_max_tokens,
+    fit_latency_model,
+    load_benchmark_points,
+)
+from app.llm_router import ROLE_BOOK_INFO, LLMBackend, LLMRouter
+from app.rate_limiter import RateLimiter
+
+BOOK_TOKENS = 100000
+
+
+@pytest.fixture(autouse=True)
+def latency_model(monkeypatch):
+    model = LatencyModel(3.4, 0.0037, "test")
+    monkeypatch.setattr(chunk_tuner, "current_latency_model", lambda: model)
+    monkeypatch.setattr(chunk_tuner, "CHUNK_TUNING", True)
+    return model
+
+
+def router(*limiters: RateLimiter) -> LLMRouter:
+    return LLMRouter([LLMBackend(f"b{i}", "m", rl) for i, rl in enumerate(limiters)])
+
+
+def test_fit_recovers_overhead_and_per_token_cost():
+    points = [(x, 2 + 0.004 * x, 1) for x in (1000, 2000, 4000)]
+    model = fit_latency_model(points, "observed")
+    assert model.overhead == pytest.approx(2)
+    assert model.per_token == pytest.approx(0.004)
+    # one size alone can't separate overhead from per-token cost
+    assert fit_latency_model([(1000, 5, 1), (1000, 6, 1)], "observed") is None
+
+
+def test_benchmark_summary_rows_are_the_prior(tmp_path):
+    summary = tmp_path / "summary.txt"
+    summary.write_text(
+        "SUMMARY\n"
+        "{'max_tokens': 1000, 'avg_chunk_time': 7.1}\n"
+        "not a row\n"
+        "{'max_tokens': 2000, 'avg_chunk_time': 10.8}\n",
+        encoding="utf-8"
+    )
+    assert load_benchmark_points(str(summary)) == [
+        (1000.0, 7.1, chunk_tuner.PRIOR_WEIGHT), (2000.0, 10.8, chunk_tuner.PRIOR_WEIGHT)
+    ]
+    assert load_benchmark_points(str(tmp_path / "missing.txt")) == []
+
+
+def test_tight_rate_limit_picks_large_chunks():
+    max_tokens, details = choose_max_tokens(BOOK_TOKENS, router(RateLimiter(2, 60)))
+    assert max_tokens == chunk_tuner.CHUNK_TOKENS_MAX
+    assert details["source"] == "test"
+
+
+def test_generous_budget_picks_small_parallel_chunks():
+    max_tokens, _ = choose_max_tokens(BOOK_TOKENS, router(RateLimiter(1000, 60, max_concurrency=100)))
+    assert max_tokens == chunk_tuner.CHUNK_TOKENS_MIN
+
+
+def test_short_book_splits_only_when_the_chunks_run_in_parallel():
+    # two chunks of 600 tokens side by side beat one of 1200
+    assert choose_max_tokens(1200, router(RateLimiter(2, 60)))[0] == 1000
+    # one at a time they don't: the smallest size holding the whole book wins
+    assert choose_max_tokens(1200, router(RateLimiter(2, 60, max_concurrency=1)))[0] == 1500
+
+
+def test_fixed_size_when_tuning_is_off(monkeypatch):
+    monkeypatch.setattr(chunk_tuner, "CHUNK_TUNING", False)
+    assert choose_max_tokens(BOOK_TOKENS, router(RateLimiter(2, 60))) == (chunk_tuner.MAX_TOKENS, { "source": "fixed" })
+
+
+def test_budget_sums_the_healthy_translation_backends():
+    book_info = LLMBackend("info", "m", RateLimiter(100, 60), roles=(ROLE_BOOK_INFO,))
+    down = LLMBackend("down", "m", RateLimiter(100, 60))
+    down.down_until = float("inf")
+    pool = LLMRouter([
+        LLMBackend("a", "m", RateLimiter(6, 60, max_tokens=6000, max_concurrency=4)),
+        LLMBackend("b", "m", RateLimiter(12, 60, max_tokens=12000, max_concurrency=2)),
+        book_info,
+        down
+    ])
+    budget = ThroughputBudget.from_router(pool)
+    assert budget.calls_per_sec == pytest.approx(0.3)
+    assert budget.burst == 18
+    assert budget.tokens_per_sec == pytest.approx(300)
+    assert budget.concurrency == 6
+
+    # one backend without a token limit lifts the pool's
+    pool.backends.append(LLMBackend("c", "m", RateLimiter(6, 60)))
+    assert ThroughputBudget.from_router(pool).tokens_per_sec == 0
@@ -0,0 +1,69 @@
+from app.book_translation import (
+    PARAGRAPH_SEPARATOR,
+    StreamingChunker,
+    chunk_by_tokens,
+    chunk_with_token_counts,
+    count_tokens,
+    iter_paragraphs,
+    split_by_token_window,
+)
+
+PARAGRAPHS = [
+    " ".join(f"Sentence {i} of paragraph {p} tells a short story." for i in range(p % 4 + 1))
+    for p in range(60)
+]
+
+
+def test_chunks_stay_within_max_tokens_and_keep_paragraphs_in_order():
+    assert max(count_tokens(p) for p in PARAGRAPHS) <= 200
+    text = PARAGRAPH_SEPARATOR.join(PARAGRAPHS)
+    chunks = chunk_by_tokens(text, 200)
+    assert len(chunks) > 1
+    assert all(count_tokens(c) <= 200 for c in chunks)
+    assert PARAGRAPH_SEPARATOR.join(chunks) == text
+
+
+def test_oversized_paragraph_is_split_on_sentences():
+    paragraph = " ".join(f"This is sentence number {i}." for i in range(100))
+    chunks = chunk_by_tokens(paragraph, 50)
+    assert len(chunks) > 1
+    assert all(count_tokens(c) <= 50 for c in chunks)
+    assert all(c.endswith(".") for c in chunks)
+    assert " ".join(chunks) == paragraph
+
+
+def test_token_window_split_keeps_characters_whole():
+    # no sentence boundary to split on, and characters spanning several byte-level tokens
+    sentence = "約瑟夫的酒—naïve " * 80
+    for max_tokens in (5, 16, 50):
+        pieces = split_by_token_window(sentence, max_tokens)
+        assert "".join(pieces) == sentence
+        assert all(count_tokens(p) <= max_tokens for p in pieces)
+
+
+def test_token_counts_are_the_real_chunk_sizes():
+    paragraph = " ".join(f"Sentence {i} with naïve 約瑟夫 words." for i in range(40))
+    text = PARAGRAPH_SEPARATOR.join([*PARAGRAPHS[:20], paragraph, "x" * 3000, *PARAGRAPHS[20:]])
+    chunks, counts = chunk_with_token_counts(text, 100)
+    assert chunks == chunk_by_tokens(text, 100)
+    assert counts == [count_tokens(c) for c in chunks]
+    assert max(counts) <= 100
+
+
+def test_paragraphs_are_iterated_like_split():
+    for text in ("", "a", PARAGRAPH_SEPARATOR, f"a{PARAGRAPH_SEPARATOR}{PARAGRAPH_SEPARATOR}b{PARAGRAPH_SEPARATOR}"):
+        assert list(iter_paragraphs(text)) == text.split(PARAGRAPH_SEPARATOR)
+
+
+def test_streamed_chunks_equal_the_whole_text_chunks():
+    paragraph = " ".join(f"Sentence {i} with naïve 約瑟夫 words." for i in range(40))
+    text = PARAGRAPH_SEPARATOR.join([*PARAGRAPHS[:20], paragraph, *PARAGRAPHS[20:]])
+    expected = list(zip(*chunk_with_token_counts(text, 100)))
+    # pieces cut anywhere, including inside a paragraph separator
+    for piece_len in (1, 7, 100, len(text)):
+        chunker = StreamingChunker(100)
+        streamed = []
+        for i in range(0, len(text), piece_len):
+            streamed.extend(chunker.feed(text[i:i + piece_len]))
+        streamed.extend(chunker.close())
+        assert streamed == expected
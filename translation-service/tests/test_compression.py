@@ -0,0 +1,74 @@
+import asyncio
+import io
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app.file_management import read_file_in_local_storage, write_file_to_local_storage
+from app.job_handler import fetch_saved_chunks, get_job_result, save_job_result, update_translation_job_progress
+from app.utils.compression import GZIP_MAGIC, ZSTD_MAGIC, CompressedWriter, compress_text, decompress_text, zstandard
+
+TEXT = "很久以前，在一座山上，有一座庙。" * 40
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.mark.parametrize("method", ["zstd", "gzip", "none"])
+def test_round_trip(method):
+    data = compress_text(TEXT, method)
+    assert decompress_text(data) == TEXT
+    if method == "none":
+        assert data == TEXT.encode("utf-8")
+    else:
+        assert len(data) < len(TEXT.encode("utf-8"))
+
+
+@pytest.mark.parametrize("method", ["zstd", "gzip", "none"])
+def test_streamed_compression_reads_like_one_shot(method):
+    f = io.BytesIO()
+    writer = CompressedWriter(f, method)
+    for i in range(0, len(TEXT), 7):
+        writer.write(TEXT[i:i + 7])
+    writer.close()
+    assert not f.closed
+    assert decompress_text(f.getvalue()) == TEXT
+    assert f.getvalue()[:4] == compress_text(TEXT, method)[:4]
+
+
+def test_frame_header_marks_the_format():
+    assert compress_text(TEXT, "gzip").startswith(GZIP_MAGIC)
+    if zstandard is not None:
+        assert compress_text(TEXT, "zstd").startswith(ZSTD_MAGIC)
+
+
+def test_short_and_plain_values_pass_through():
+    assert compress_text("短", "zstd") == "短".encode("utf-8")
+    # entries written before compression, as bytes or already decoded
+    assert decompress_text("译文".encode("utf-8")) == "译文"
+    assert decompress_text("译文") == "译文"
+    assert decompress_text(None) is None
+
+
+def test_book_file_is_compressed_on_disk(tmp_path):
+    folder = str(tmp_path)
+    path = write_file_to_local_storage(TEXT, "A Book", "An Author", "一本书", "作者", "chinese", folder)
+    with open(path, "rb") as f:
+        assert len(f.read()) < len(TEXT.encode("utf-8"))
+    assert read_file_in_local_storage("A Book", "An Author", "chinese", folder) == TEXT
+
+
+def test_chunks_and_results_round_trip_through_redis():
+    async def scenario():
+        # the service's client decodes replies: compressed values must still come back intact
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        for chunk_no in range(3):
+            await update_translation_job_progress(server, "job", chunk_no, f"{chunk_no}:{TEXT}", 3)
+        assert await fetch_saved_chunks(server, "job") == [f"{n}:{TEXT}" for n in range(3)]
+
+        await save_job_result(server, "job", TEXT)
+        assert await get_job_result(server, "job") == TEXT
+
+    run(scenario())
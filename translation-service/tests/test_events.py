@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+import app.book_translation as book_translation
+import app.main as main
+from app.job_handler import (
+    complete_translation_job,
+    read_job_events,
+    start_translation_job,
+    update_translation_job_progress,
+)
+
+BOOK_INFO = { "origin_title": "A Book", "origin_author": "An Author" }
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def parse_sse(body: str) -> list[tuple[int, str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((int(lines["id"]), lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def short_reads(server, job_id, after_seq=0, block_ms=15000, count=100):
+    # fakeredis serves a blocking XREAD synchronously: keep the wait short
+    return await read_job_events(server, job_id, after_seq, block_ms=10, count=count)
+
+
+async def job_with_two_chunks(server) -> None:
+    await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 2)
+    await update_translation_job_progress(server, "job-1", 0, "第一段", 2)
+    await update_translation_job_progress(server, "job-1", 1, "第二段", 2)
+
+
+def test_chunk_events_read_text_from_chunks_hash():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 2)
+        assert await update_translation_job_progress(server, "job-1", 1, "第二段", 2) == "1/2"
+
+        # the stream holds only the counters, not a second copy of the chunk
+        entries = await server.xrange("job:job-1:events")
+        assert "text" not in entries[-1][1]
+        _, event, fields = (await read_job_events(server, "job-1", after_seq=1, block_ms=0))[0]
+        assert event == "chunk"
+        assert fields == { "chunk_no": "1", "completed": "1", "total": "2", "text": "第二段" }
+
+        await server.delete("job:job-1:chunks")
+        _, _, fields = (await read_job_events(server, "job-1", after_seq=1, block_ms=0))[0]
+        assert "text" not in fields
+
+    run(scenario())
+
+
+def test_stream_resumes_after_last_event_id(monkeypatch):
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        monkeypatch.setattr(main, "redis_server", server)
+        monkeypatch.setattr(book_translation, "read_job_events", short_reads)
+        await job_with_two_chunks(server)
+
+        # a reconnect after event 2 (the first chunk) gets the second chunk next, with its text
+        response = await main.translation_events("job-1", last_event_id_header="2")
+        first = await anext(response.body_iterator)
+        await response.body_iterator.aclose()
+        assert parse_sse(first) == [(3, "chunk", { "chunk_no": 1, "completed": 2, "total": 2, "text": "第二段" })]
+
+        # the query parameter works for clients that can't set headers; the later of the two wins
+        await complete_translation_job(server, "a@b.c", "job-1")
+        response = await main.translation_events("job-1", last_event_id=3, last_event_id_header="1")
+        body = "".join([part async for part in response.body_iterator])
+        assert parse_sse(body) == [(4, "status", { "state": "finished" })]
+
+    run(scenario())
+
+
+def test_stream_of_unknown_job_ends_at_once(monkeypatch):
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        monkeypatch.setattr(book_translation, "read_job_events", short_reads)
+        events = [e async for e in book_translation.stream_translation_events("nope", 0, server)]
+        assert parse_sse("".join(events)) == [(0, "status", { "state": "unknown" })]
+
+    run(scenario())
+
+
+def test_status_event_numbers_are_sent_as_numbers(monkeypatch):
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        monkeypatch.setattr(book_translation, "read_job_events", short_reads)
+        await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 2, max_tokens=1500)
+        stream = book_translation.stream_translation_events("job-1", 0, server)
+        first = await anext(stream)
+        await stream.aclose()
+        assert parse_sse(first) == [(1, "status", { "state": "running", "total": 2, "max_tokens": 1500 })]
+
+    run(scenario())
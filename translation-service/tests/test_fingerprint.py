@@ -0,0 +1,184 @@
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app import book_translation, main
+from app.job_handler import (
+    BookFingerprinter,
+    JobCompletion,
+    create_book_fingerprint,
+    create_job_id,
+    get_cached_book_info,
+    get_job_meta,
+    get_source_chunk,
+    save_book_fingerprint,
+    save_job_result,
+    start_translation_job,
+)
+from app.file_management import BookInfo
+from app.llm_router import LLMBackend, LLMRouter
+from app.rate_limiter import RateLimiter
+from app.schema import TranslateRequest
+
+BOOK = "Chapter 1\n\nIt was a dark and stormy night.\n"
+BOOK_INFO = { "origin_title": "A Book", "origin_author": "An Author", "trans_title": "一本书", "trans_author": "作者" }
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    server = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(main, "redis_server", server)
+    return server
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    async def unreachable(*args, **kwargs):
+        raise AssertionError("an LLM call was made")
+
+    def no_chunking(*args, **kwargs):
+        raise AssertionError("the book was chunked")
+
+    monkeypatch.setattr(main, "extract_book_info", unreachable)
+    monkeypatch.setattr(main, "chunk_with_token_counts", no_chunking)
+
+
+def test_fingerprint_ignores_line_endings_and_trailing_whitespace():
+    fingerprint = create_book_fingerprint(BOOK, "Chinese")
+    assert create_book_fingerprint(BOOK.replace("\n", "\r\n") + "  \n", "chinese") == fingerprint
+    assert create_book_fingerprint(BOOK, "malay") != fingerprint
+    assert create_book_fingerprint(BOOK + "More.", "chinese") != fingerprint
+
+
+def test_streamed_fingerprint_equals_the_whole_text_one():
+    book = BOOK.replace("\n", "\r\n") * 3 + "  \n\n"
+    for piece_len in (1, 2, 5, len(book)):
+        fingerprinter = BookFingerprinter("chinese")
+        for i in range(0, len(book), piece_len):
+            fingerprinter.update(book[i:i + piece_len])
+        assert fingerprinter.hexdigest() == create_book_fingerprint(BOOK * 3, "chinese")
+
+
+def test_repeat_request_for_a_finished_book_is_answered_from_the_index(server, no_llm):
+    async def scenario():
+        job_id = create_job_id("A Book", "An Author", "chinese")
+        await save_book_fingerprint(server, create_book_fingerprint(BOOK, "chinese"), job_id, BOOK_INFO)
+        await save_job_result(server, job_id, "译文")
+
+        res = await main.translate_book(TranslateRequest(book=BOOK + "\n", language="chinese", email="a@b.c"))
+        assert res["status"] == JobCompletion.DONE
+        assert res["result"] == "译文"
+        assert res["job_id"] == job_id
+
+    run(scenario())
+
+
+def test_repeat_request_for_a_running_book_joins_it(server, monkeypatch):
+    async def unreachable(*args, **kwargs):
+        raise AssertionError("an LLM call was made")
+
+    monkeypatch.setattr(main, "extract_book_info", unreachable)
+
+    async def scenario():
+        job_id = create_job_id("A Book", "An Author", "chinese")
+        await save_book_fingerprint(server, create_book_fingerprint(BOOK, "chinese"), job_id, BOOK_INFO)
+        await start_translation_job(server, "b@b.c", job_id, BOOK_INFO, "chinese", 3)
+
+        res = await main.translate_book(TranslateRequest(book=BOOK, language="chinese", email="a@b.c"))
+        assert res["status"] == JobCompletion.STARTED
+        assert res["job_id"] == job_id
+        # the user is one of the job's users and holds its semaphore
+        assert await server.smembers(f"job:{job_id}:users") == { "a@b.c", "b@b.c" }
+        assert await server.get("user:a@b.c:active_job") == job_id
+
+    run(scenario())
+
+
+def upload(body: bytes, piece_len: int) -> Request:
+    pieces = [body[i:i + piece_len] for i in range(0, len(body), piece_len)]
+
+    async def receive():
+        return { "type": "http.request", "body": pieces.pop(0) if pieces else b"", "more_body": len(pieces) > 0 }
+
+    return Request({ "type": "http", "method": "POST", "headers": [(b"content-length", str(len(body)).encode())] }, receive)
+
+
+def test_streamed_upload_of_a_finished_book_is_answered_from_the_index(server, no_llm):
+    async def scenario():
+        job_id = create_job_id("A Book", "An Author", "chinese")
+        await save_book_fingerprint(server, create_book_fingerprint(BOOK, "chinese"), job_id, BOOK_INFO)
+        await save_job_result(server, job_id, "译文")
+
+        res = await main.translate_book_stream(upload(BOOK.encode(), 5), "chinese", "a@b.c")
+        assert res["status"] == JobCompletion.DONE
+        assert res["result"] == "译文"
+        # the staged chunks were dropped
+        assert not await server.keys("upload:*")
+
+    run(scenario())
+
+
+def test_streamed_upload_stages_the_same_chunks_as_the_whole_text(server, monkeypatch):
+    book = "\n\n".join(f"Paragraph {p}: " + "約瑟夫 went home. " * (p % 7 + 1) for p in range(1000))
+
+    async def book_info(*args, **kwargs):
+        info = BookInfo()
+        info.__dict__.update(BOOK_INFO)
+        return info
+
+    monkeypatch.setattr(main, "extract_book_info", book_info)
+
+    async def scenario():
+        # multi-byte characters split across pieces of the body
+        res = await main.translate_book_stream(upload(book.encode(), 1001), "chinese", "a@b.c")
+        assert res["status"] == JobCompletion.STARTED
+        job_id = res["job_id"]
+
+        max_tokens = int((await get_job_meta(server, job_id))["max_tokens"])
+        chunks, _ = book_translation.chunk_with_token_counts(book, max_tokens)
+        assert len(chunks) > 1
+        assert [await get_source_chunk(server, job_id, i) for i in range(len(chunks))] == chunks
+        assert not await server.keys("upload:*")
+
+    run(scenario())
+
+
+def test_stale_entry_still_reuses_the_book_info(server):
+    async def scenario():
+        job_id = create_job_id("A Book", "An Author", "chinese")
+        await save_book_fingerprint(server, create_book_fingerprint(BOOK, "chinese"), job_id, BOOK_INFO)
+
+        res, book_info = await book_translation.fetch_translation_by_fingerprint(create_book_fingerprint(BOOK, "chinese"), "chinese", server)
+        assert res is None
+        assert book_info.get_book_info() == BOOK_INFO
+        assert await book_translation.fetch_translation_by_fingerprint("unknown", "chinese", server) == (None, None)
+
+    run(scenario())
+
+
+def test_book_info_is_extracted_once_per_first_chunk(server, monkeypatch):
+    calls = []
+
+    async def interpret(chunk, language, *args, **kwargs):
+        calls.append(chunk)
+        return "[A Book, An Author, 一本书, 作者]"
+
+    monkeypatch.setattr(book_translation, "interpret_book_info", interpret)
+
+    async def scenario():
+        router = LLMRouter([LLMBackend("test", "m", RateLimiter(10, 60))])
+        for _ in range(2):
+            info = await book_translation.extract_book_info("Chapter 1", "chinese", router, server)
+            assert info.origin_title == "A Book"
+        assert await get_cached_book_info(server, "Chapter 1", "chinese")
+
+    run(scenario())
+    assert calls == ["Chapter 1"]
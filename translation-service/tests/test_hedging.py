@@ -0,0 +1,166 @@
+import asyncio
+import functools
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app import book_translation, hedging
+from app.chunk_cache import chunk_cache_key, get_cached_translation
+from app.hedging import HedgeBudget, LatencyTracker, hedged_call
+from app.job_handler import fetch_saved_chunks, start_translation_job
+from app.llm_router import LLMBackend, LLMRouter
+from app.rate_limiter import RateLimiter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    # requests of this size usually answer within 50 ms
+    tracker = LatencyTracker()
+    for _ in range(hedging.MIN_LATENCY_SAMPLES):
+        tracker.record(100, 0.05)
+    monkeypatch.setattr(hedging, "latency_tracker", tracker)
+    budget = HedgeBudget(max_rate=0.5)
+    for _ in range(9):
+        budget.on_request()
+    monkeypatch.setattr(hedging, "hedge_budget", budget)
+    return tracker
+
+
+def test_latency_percentile_needs_enough_samples():
+    tracker = LatencyTracker(bucket_tokens=100)
+    for i in range(10):
+        tracker.record(150, i / 10)
+    assert tracker.percentile(150, 0.5, min_samples=11) is None
+    assert tracker.percentile(150, 0.5, min_samples=10) == 0.5
+    # another size bucket has its own samples
+    assert tracker.percentile(250, 0.5, min_samples=1) is None
+
+
+def test_hedge_budget_books_only_fired_hedges():
+    budget = HedgeBudget(max_rate=0.5)
+    for _ in range(2):
+        budget.on_request()
+    assert budget.allow()
+    assert budget.allow()
+    budget.on_hedge()
+    assert not budget.allow()
+
+
+def test_hedge_answers_for_a_straggler(tracker):
+    async def straggler():
+        await asyncio.sleep(5)
+        return "primary"
+
+    async def fast():
+        await asyncio.sleep(0.01)
+        return "hedge"
+
+    async def hedge():
+        return fast
+
+    async def scenario():
+        assert await hedged_call(straggler, 100, hedge, enabled=True, timeout=10) == "hedge"
+        assert list(hedging.hedge_budget.events) == [0] * 10 + [1]
+
+    run(scenario())
+
+
+def test_no_hedge_when_no_backend_has_budget(tracker):
+    asked = []
+
+    async def call():
+        await asyncio.sleep(0.2)
+        return "primary"
+
+    async def hedge():
+        asked.append(True)
+        return None
+
+    async def scenario():
+        assert await hedged_call(call, 100, hedge, enabled=True, timeout=10) == "primary"
+        # the hedge was allowed by the budget but never fired, so it isn't counted against it
+        assert asked == [True]
+        assert list(hedging.hedge_budget.events) == [0] * 10
+
+    run(scenario())
+
+
+def test_worker_hedge_takes_its_own_concurrency_slot(tracker, monkeypatch):
+    in_flight = []
+
+    async def translate(chunk, language, backend, tokens):
+        in_flight.append(backend.rate_limiter.concurrency.in_flight)
+        await asyncio.sleep(5 if len(in_flight) == 1 else 0.01)
+        return f"answer {len(in_flight)}"
+
+    monkeypatch.setattr(book_translation, "translate_chunk", translate)
+    monkeypatch.setattr(book_translation, "hedged_call", functools.partial(hedged_call, enabled=True))
+    monkeypatch.setattr(book_translation, "estimate_request_tokens", lambda tokens: 100)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", { "origin_title": "A", "origin_author": "B" }, "chinese", 1)
+        rl = RateLimiter(10, 60)
+        router = LLMRouter([LLMBackend("only", "m", rl)])
+        assert await book_translation.worker("job-1", 0, "A chunk.", "chinese", 1, router, server, 100)
+        assert await fetch_saved_chunks(server, "job-1") == ["answer 2"]
+        # one call of the limiter for the request, one for the hedge
+        assert len(rl.calls) == 2
+
+    run(scenario())
+    assert in_flight == [1, 2]
+
+
+def test_request_past_the_chunk_timeout_is_cancelled():
+    cancelled = []
+
+    async def no_hedge():
+        return None
+
+    async def call():
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await hedged_call(call, 100, no_hedge, enabled=False, timeout=0.05)
+        await asyncio.sleep(0)
+
+    run(scenario())
+    assert cancelled == [True]
+
+
+def test_chunk_answered_by_the_hedge_is_cached_under_its_model(tracker, monkeypatch):
+    asked = []
+
+    async def translate(chunk, language, backend, tokens):
+        asked.append(backend.model)
+        await asyncio.sleep(5 if len(asked) == 1 else 0.01)
+        return f"translated by {backend.model}"
+
+    monkeypatch.setattr(book_translation, "translate_chunk", translate)
+    monkeypatch.setattr(book_translation, "hedged_call", functools.partial(hedged_call, enabled=True))
+    monkeypatch.setattr(book_translation, "estimate_request_tokens", lambda tokens: 100)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", { "origin_title": "A", "origin_author": "B" }, "chinese", 1)
+        router = LLMRouter([LLMBackend("a", "model-a", RateLimiter(10, 60)), LLMBackend("b", "model-b", RateLimiter(10, 60))])
+        assert await book_translation.worker("job-1", 0, "A chunk.", "chinese", 1, router, server, 100)
+
+        primary, hedge = asked
+        assert primary != hedge
+        assert await fetch_saved_chunks(server, "job-1") == [f"translated by {hedge}"]
+        key = chunk_cache_key("A chunk.", "chinese", hedge, book_translation.TRANSLATE_PROMPT_VERSION)
+        assert await get_cached_translation(server, key, folder=None) == f"translated by {hedge}"
+
+    run(scenario())
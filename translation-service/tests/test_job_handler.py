@@ -0,0 +1,196 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app import book_translation
+from app.job_handler import (
+    TASK_PRIORITY,
+    JobStart,
+    JobStatus,
+    acquire_lease,
+    cancel_translation_job,
+    check_job_status,
+    chunk_lease_key,
+    complete_translation_job,
+    dequeue_chunk_task,
+    encode_chunk_task,
+    enqueue_chunk_tasks,
+    fetch_saved_chunks,
+    get_chunk_task_context,
+    get_completed_chunks,
+    get_job_meta,
+    get_job_state,
+    read_job_events,
+    save_source_chunks,
+    start_translation_job,
+    update_translation_job_progress,
+)
+
+BOOK_INFO = { "origin_title": "A Book", "origin_author": "An Author" }
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_chunk_progress_counts_each_chunk_once():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 3)
+        assert await update_translation_job_progress(server, "job-1", 2, "第三段", 3) == "1/3"
+        # a retried chunk overwrites its translation instead of counting twice
+        assert await update_translation_job_progress(server, "job-1", 2, "第三段", 3) == "1/3"
+        assert await update_translation_job_progress(server, "job-1", 0, "第一段", 3) == "2/3"
+        assert await get_completed_chunks(server, "job-1") == (2, 3)
+        assert await fetch_saved_chunks(server, "job-1") == ["第一段", "第三段"]
+
+        events = await read_job_events(server, "job-1", block_ms=0)
+        assert [(seq, event) for seq, event, _ in events] == [(1, "status"), (2, "chunk"), (3, "chunk"), (4, "chunk")]
+        assert events[-1][2]["completed"] == "2"
+
+    run(scenario())
+
+
+def test_user_runs_one_job_at_a_time():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        assert await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 1) == JobStart.STARTED
+        assert await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 1) == JobStart.JOINED
+        assert await start_translation_job(server, "a@b.c", "job-2", BOOK_INFO, "malay", 1) == JobStart.REFUSED
+
+        await complete_translation_job(server, "a@b.c", "job-1")
+        assert await get_job_state(server, "job-1") == "finished"
+        assert await start_translation_job(server, "a@b.c", "job-2", BOOK_INFO, "malay", 1) == JobStart.STARTED
+
+    run(scenario())
+
+
+def test_ending_a_job_keeps_the_semaphore_of_the_users_next_job():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 1)
+        # the user moved on to another job (e.g. the semaphore expired and was retaken)
+        await server.set("user:a@b.c:active_job", "job-2")
+        await complete_translation_job(server, "a@b.c", "job-1")
+        assert await server.get("user:a@b.c:active_job") == "job-2"
+        assert not await server.exists("job:job-1:chunks", "job:job-1:source")
+        _, event, fields = (await read_job_events(server, "job-1", after_seq=1, block_ms=0))[0]
+        assert (event, fields) == ("status", { "state": "finished" })
+
+    run(scenario())
+
+
+def test_chunk_task_context_is_read_in_one_pipeline():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 2)
+        await save_source_chunks(server, "job-1", ["One.", "Two."], [2, 3])
+        context = await get_chunk_task_context(server, "job-1", 1)
+        assert context["chunk"] == "Two."
+        assert context["chunk_tokens"] == 3
+        assert context["state"] == "running"
+        assert context["meta"]["language"] == "chinese"
+        assert context["total_chunks"] == 2
+
+    run(scenario())
+
+
+def test_start_translation_job_without_max_tokens():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        assert await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 3)
+        assert "max_tokens" not in await get_job_meta(server, "job-1")
+        _, _, fields = (await read_job_events(server, "job-1", block_ms=0))[0]
+        assert fields == { "state": "running", "total": "3" }
+
+    run(scenario())
+
+
+def test_start_translation_job_records_max_tokens():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 3, max_tokens=500)
+        assert (await get_job_meta(server, "job-1"))["max_tokens"] == "500"
+        _, _, fields = (await read_job_events(server, "job-1", block_ms=0))[0]
+        assert fields["max_tokens"] == "500"
+
+    run(scenario())
+
+
+def test_identical_jobs_of_several_users_run_once():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        assert await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 2) == JobStart.STARTED
+        await save_source_chunks(server, "job-1", ["One.", "Two."])
+        await update_translation_job_progress(server, "job-1", 0, "一。", 2)
+        assert await start_translation_job(server, "b@b.c", "job-1", BOOK_INFO, "chinese", 2) == JobStart.JOINED
+        # joining leaves the run as it was
+        assert await get_completed_chunks(server, "job-1") == (1, 2)
+        assert (await get_job_meta(server, "job-1"))["email"] == "a@b.c"
+        assert await check_job_status(server, "b@b.c", "job-1") == JobStatus.SAME_JOB
+        assert await start_translation_job(server, "b@b.c", "job-2", BOOK_INFO, "malay", 1) == JobStart.REFUSED
+
+        await complete_translation_job(server, "a@b.c", "job-1")
+        for user in ("a@b.c", "b@b.c"):
+            assert await check_job_status(server, user, "job-2") == JobStatus.NO_JOB
+
+    run(scenario())
+
+
+def test_cancel_withdraws_one_user_until_nobody_waits():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 1)
+        await start_translation_job(server, "b@b.c", "job-1", BOOK_INFO, "chinese", 1)
+
+        assert await cancel_translation_job(server, "a@b.c", "job-1") is False
+        assert await get_job_state(server, "job-1") == "running"
+        assert await check_job_status(server, "a@b.c", "job-1") == JobStatus.NO_JOB
+        # not one of the job's users (any more)
+        assert await cancel_translation_job(server, "a@b.c", "job-1") is None
+        assert await cancel_translation_job(server, "c@b.c", "job-1") is None
+
+        assert await cancel_translation_job(server, "b@b.c", "job-1") is True
+        assert await get_job_state(server, "job-1") == "cancelled"
+
+    run(scenario())
+
+
+def test_finished_job_stays_finished_when_cancelled():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 1)
+        await complete_translation_job(server, "a@b.c", "job-1")
+        assert await cancel_translation_job(server, "a@b.c", "job-1") is None
+        assert await get_job_state(server, "job-1") == "finished"
+
+    run(scenario())
+
+
+def test_duplicate_task_of_a_leased_chunk_is_dropped(monkeypatch):
+    async def unreachable(*args, **kwargs):
+        raise AssertionError("the chunk was translated twice")
+
+    monkeypatch.setattr(book_translation, "worker", unreachable)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 2)
+        await save_source_chunks(server, "job-1", ["One.", "Two."])
+        await enqueue_chunk_tasks(server, "job-1", [0, 1])
+        await update_translation_job_progress(server, "job-1", 1, "二。", 2)
+        # another worker is translating chunk 0
+        assert await acquire_lease(server, chunk_lease_key("job-1", 0), "w0", 30)
+
+        for chunk_no in (0, 1):
+            assert await dequeue_chunk_task(server, "w1", timeout=0) == ("job-1", chunk_no)
+            await book_translation.process_chunk_task("w1", "job-1", chunk_no, None, server)
+        assert await server.llen("queue:translation:processing:w1") == 0
+        # the copy in flight with w0 stays tracked; the translated chunk's task is done
+        assert await server.hget(TASK_PRIORITY, encode_chunk_task("job-1", 0)) is not None
+        assert await server.hget(TASK_PRIORITY, encode_chunk_task("job-1", 1)) is None
+
+    run(scenario())
@@ -0,0 +1,151 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from app import book_translation, job_handler
+from app.book_translation import (
+    MAX_CHUNK_ROUNDS,
+    fetch_translation_progress,
+    start_translation_workers,
+    stop_translation_workers,
+    translate_service,
+)
+from app.file_management import BookInfo, write_file_to_local_storage
+from app.job_handler import create_job_id, get_job_state
+from app.llm_router import LLMBackend, LLMRouter
+from app.rate_limiter import RateLimiter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    # the book cache folder is relative to the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(job_handler, "QUEUE_POLL_INTERVAL", 0.01)
+    monkeypatch.setattr(book_translation, "CHUNK_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(book_translation, "CHUNK_RETRY_MAX_DELAY", 0.05)
+
+
+def local_router() -> LLMRouter:
+    return LLMRouter([LLMBackend("test", "m", RateLimiter(100, 60))])
+
+
+def book_info() -> BookInfo:
+    info = BookInfo()
+    info.set_book_info(["A Book", "An Author", "一本书", "作者"])
+    return info
+
+
+async def wait_for_state(server, job_id: str, states: tuple[str, ...]) -> str:
+    for _ in range(200):
+        state = await get_job_state(server, job_id)
+        if state in states:
+            return state
+        await asyncio.sleep(0.02)
+    raise AssertionError(f"job still {state}")
+
+
+def test_workers_translate_every_chunk_and_finalize_once(monkeypatch):
+    calls = []
+
+    async def fake_translate(chunk, language, *args, **kwargs):
+        calls.append(chunk)
+        await asyncio.sleep(0.01)
+        return f"<{chunk}>"
+
+    monkeypatch.setattr(book_translation, "translate_chunk", fake_translate)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        job_id = create_job_id("A Book", "An Author", "chinese")
+        chunks = [f"chunk {i}" for i in range(7)]
+        assert await translate_service(job_id, "a@b.c", "chinese", book_info(), chunks, server)
+
+        workers = start_translation_workers(3, local_router(), server)
+        try:
+            assert await wait_for_state(server, job_id, ("finished",)) == "finished"
+        finally:
+            await stop_translation_workers(workers)
+
+        res = await fetch_translation_progress(job_id, "A Book", "An Author", "chinese", server)
+        assert res == {
+            "running": False,
+            "chunks_remaining": 0,
+            "result": "\n\n".join(f"<{c}>" for c in chunks)
+        }
+
+    run(scenario())
+    assert sorted(calls) == sorted(f"chunk {i}" for i in range(7))
+
+
+def test_chunk_failing_every_round_fails_the_job(monkeypatch):
+    rounds = []
+
+    async def failing_worker(job_id, chunk_idx, *args):
+        rounds.append(chunk_idx)
+        return False
+
+    monkeypatch.setattr(book_translation, "worker", failing_worker)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        job_id = create_job_id("A Book", "An Author", "chinese")
+        assert await translate_service(job_id, "a@b.c", "chinese", book_info(), ["only chunk"], server)
+
+        workers = start_translation_workers(2, local_router(), server)
+        try:
+            assert await wait_for_state(server, job_id, ("failed",)) == "failed"
+        finally:
+            await stop_translation_workers(workers)
+
+        res = await fetch_translation_progress(job_id, "A Book", "An Author", "chinese", server)
+        assert res["error"] == "Translation job failed."
+
+    run(scenario())
+    assert rounds == [0] * MAX_CHUNK_ROUNDS
+
+
+def test_progress_without_redis_state_reads_the_book_from_disk():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        write_file_to_local_storage("译文", "A Book", "An Author", "一本书", "作者", "chinese")
+
+        res = await fetch_translation_progress(create_job_id("A Book", "An Author", "chinese"), "A Book", "An Author", "chinese", server)
+        assert res == { "running": False, "chunks_remaining": 0, "result": "译文" }
+
+        res = await fetch_translation_progress(create_job_id("Other", "Nobody", "chinese"), "Other", "Nobody", "chinese", server)
+        assert res == { "running": False, "chunks_remaining": 0, "error": "Translation job not found." }
+
+    run(scenario())
+
+
+def test_rate_limited_chunk_takes_budget_only_for_attempts_that_follow(monkeypatch):
+    class CountingLimiter(RateLimiter):
+        acquired = 0
+
+        async def _take(self, tokens: int) -> float | None:
+            self.acquired += 1
+            return None
+
+    async def throttled(*args, **kwargs):
+        response = httpx.Response(429, request=httpx.Request("POST", "http://llm/v1/chat/completions"))
+        raise openai.RateLimitError("rate limited", response=response, body=None)
+
+    monkeypatch.setattr(book_translation, "translate_chunk", throttled)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        rl = CountingLimiter(100, 60)
+        router = LLMRouter([LLMBackend("test", "m", rl)])
+        assert not await book_translation.worker("job", 0, "A chunk.", "chinese", 1, router, server)
+        # one acquisition per attempt: none after the last, whose chunk goes back to the queue
+        assert rl.acquired == book_translation.MAX_RATE_LIMIT_RETRIES
+
+    run(scenario())
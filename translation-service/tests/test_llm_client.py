@@ -0,0 +1,64 @@
+import asyncio
+
+import httpx
+from openai import AsyncOpenAI
+
+from app import llm_client
+from app.book_translation import translate_chunk
+from app.llm_router import LLMBackend
+from app.rate_limiter import RateLimiter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_client_is_shared_until_closed():
+    async def scenario():
+        client = llm_client.get_llm_client()
+        assert llm_client.get_llm_client() is client
+        assert llm_client.init_llm_client() is client
+        # clients of other endpoints share the connection pool
+        other_endpoint = llm_client.get_llm_client("http://other.test/v1", "key")
+        assert other_endpoint is not client
+        assert other_endpoint._client is client._client
+        await llm_client.close_llm_client()
+        assert not llm_client._clients
+        assert llm_client._http_client is None
+        other = llm_client.get_llm_client()
+        assert other is not client
+        await llm_client.close_llm_client()
+
+    run(scenario())
+
+
+def test_requests_go_through_the_shared_client(monkeypatch):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={
+            "id": "c", "object": "chat.completion", "created": 0, "model": "m",
+            "choices": [{ "index": 0, "finish_reason": "stop", "message": { "role": "assistant", "content": "你好" } }]
+        })
+
+    async def scenario():
+        client = AsyncOpenAI(
+            api_key="test",
+            base_url="http://llm.test/v1",
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        )
+        monkeypatch.setattr(llm_client, "_clients", {
+            (llm_client.SEALION_API_URL, llm_client.SEALION_API_KEY): client,
+            ("http://llm.test/v1", "test"): client
+        })
+        backend = LLMBackend("test", "m", RateLimiter(10, 60), base_url="http://llm.test/v1", api_key="test")
+        assert await translate_chunk("Hello", "chinese") == "你好"
+        assert await translate_chunk("Hello again", "chinese", backend, 10) == "你好"
+        assert backend.latency is not None
+        await llm_client.close_llm_client()
+
+    run(scenario())
+    assert len(requests) == 2
+    assert [r.url.path for r in requests] == ["/v1/chat/completions"] * 2
+    assert all(r.url.host == "llm.test" for r in requests)
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app import llm_router
+from app.llm_router import (
+    ROLE_BOOK_INFO,
+    ROLE_TRANSLATE,
+    LLMBackend,
+    LLMRouter,
+    init_llm_router,
+)
+from app.rate_limiter import RateLimiter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def backend(name: str, max_calls: int = 10, **kwargs) -> LLMBackend:
+    return LLMBackend(name, f"model-{name}", RateLimiter(max_calls, 60), **kwargs)
+
+
+def test_router_skips_backends_without_budget():
+    async def scenario():
+        busy, free = backend("busy", max_calls=1), backend("free")
+        router = LLMRouter([busy, free])
+        await busy.rate_limiter.acquire()
+        for _ in range(5):
+            assert await router.route(ROLE_TRANSLATE, 100) is free
+        assert await router.try_route(ROLE_TRANSLATE, 100, exclude=(free,)) is None
+
+    run(scenario())
+
+
+def test_router_prefers_fast_backends_with_free_slots():
+    fast, slow = backend("fast"), backend("slow")
+    fast.on_success(1, 1000)
+    slow.on_success(10, 1000)
+    router = LLMRouter([fast, slow])
+    firsts = [router.candidates(ROLE_TRANSLATE)[0] for _ in range(500)]
+    assert firsts.count(fast) > 400
+
+
+def test_router_only_uses_backends_of_the_role():
+    small = backend("small", roles=(ROLE_BOOK_INFO,))
+    big = backend("big", weight=2, roles=(ROLE_TRANSLATE, ROLE_BOOK_INFO))
+    router = LLMRouter([small, big])
+    assert router.candidates(ROLE_TRANSLATE) == [big]
+    assert router.models(ROLE_BOOK_INFO) == ["model-big", "model-small"]
+    assert router.models(ROLE_TRANSLATE) == ["model-big"]
+
+
+def test_failing_backend_cools_down_and_recovers(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_router.time, "monotonic", lambda: now[0])
+    flaky, steady = backend("flaky"), backend("steady")
+    router = LLMRouter([flaky, steady])
+
+    for _ in range(llm_router.BACKEND_FAILURE_THRESHOLD):
+        flaky.on_failure()
+    assert not flaky.is_healthy()
+    assert router.candidates(ROLE_TRANSLATE) == [steady]
+
+    now[0] += llm_router.BACKEND_COOLDOWN
+    assert flaky.is_healthy()
+    # failing again right after doubles the cooldown
+    flaky.on_failure()
+    now[0] += llm_router.BACKEND_COOLDOWN
+    assert not flaky.is_healthy()
+    now[0] += llm_router.BACKEND_COOLDOWN
+    assert flaky.is_healthy()
+
+    flaky.on_success(1, 100)
+    assert (flaky.failures, flaky.trips) == (0, 0)
+
+
+def test_unhealthy_backends_still_serve_when_none_is_healthy(monkeypatch):
+    monkeypatch.setattr(llm_router.time, "monotonic", lambda: 1000.0)
+    a, b = backend("a"), backend("b")
+    a.down_until, b.down_until = 1030.0, 1010.0
+    assert LLMRouter([a, b]).candidates(ROLE_TRANSLATE) == [b, a]
+
+
+def test_backend_pool_from_config(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_BACKENDS", json.dumps([
+        { "name": "big", "model": "m-70b", "max_calls": 5, "weight": 2, "roles": ["translate"] },
+        { "name": "small", "model": "m-8b", "max_tokens": 1000, "roles": ["book_info"] }
+    ]))
+    router = init_llm_router(fakeredis.FakeAsyncRedis(decode_responses=True), "default-model", 10, 60)
+    big, small = router.backends
+    assert (big.model, big.weight, big.rate_limiter.max_calls, big.rate_limiter.key) == ("m-70b", 2, 5, "ratelimit:big")
+    assert (small.rate_limiter.max_calls, small.rate_limiter.max_tokens) == (10, 1000)
+    assert router.models(ROLE_BOOK_INFO) == ["m-8b"]
+
+
+def test_default_pool_is_the_single_configured_model(monkeypatch):
+    monkeypatch.setattr(llm_router, "LLM_BACKENDS", None)
+    monkeypatch.setattr(llm_router, "LLM_BACKENDS_FILE", None)
+    monkeypatch.setattr(llm_router, "BOOK_INFO_MODEL", None)
+    router = init_llm_router(fakeredis.FakeAsyncRedis(decode_responses=True), "default-model", 10, 60, 5000)
+    [default] = router.backends
+    assert default.rate_limiter.key == llm_router.DEFAULT_RATE_LIMIT_KEY
+    assert default.rate_limiter.max_tokens == 5000
+    assert router.models(ROLE_BOOK_INFO) == router.models(ROLE_TRANSLATE) == ["default-model"]
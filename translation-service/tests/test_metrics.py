@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from prometheus_client import CollectorRegistry, Histogram
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app import book_translation, main
+from app.job_handler import complete_translation_job, start_translation_job
+from app.llm_router import LLMBackend, LLMRouter
+from app.metrics import REGISTRY, RouterCollector, timed
+from app.rate_limiter import RateLimiter
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_timed_observes_sync_and_async_functions_even_when_they_raise():
+    histogram = Histogram("test_seconds", "test", ["op"], registry=CollectorRegistry())
+
+    @timed(histogram, op="sync")
+    def sync():
+        return 1
+
+    @timed(histogram, op="async")
+    async def fails():
+        raise ValueError
+
+    assert sync() == 1
+    with pytest.raises(ValueError):
+        run(fails())
+    counts = {
+        s.labels["op"]: s.value for m in histogram.collect() for s in m.samples if s.name == "test_seconds_count"
+    }
+    assert counts == { "sync": 1, "async": 1 }
+
+
+def test_router_collector_reports_each_backend():
+    router = LLMRouter([LLMBackend("a", "m", RateLimiter(10, 60, max_concurrency=4))])
+    router.backends[0].down_until = float("inf")
+    registry = CollectorRegistry()
+    registry.register(RouterCollector(router))
+    assert registry.get_sample_value("translation_llm_concurrency_limit", { "backend": "a" }) == 4
+    assert registry.get_sample_value("translation_llm_in_flight", { "backend": "a" }) == 0
+    assert registry.get_sample_value("translation_llm_backend_healthy", { "backend": "a" }) == 0
+
+
+def test_failed_chunk_attempts_are_counted_by_reason(monkeypatch):
+    async def failing(*args, **kwargs):
+        raise RuntimeError("backend down")
+
+    monkeypatch.setattr(book_translation, "translate_chunk", failing)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", "job-1", { "origin_title": "A", "origin_author": "B" }, "chinese", 1)
+        router = LLMRouter([LLMBackend("only", "m", RateLimiter(10, 60))])
+        before = sample("translation_chunk_failures_total", reason="error")
+        assert not await book_translation.worker("job-1", 0, "A chunk.", "chinese", 1, router, server)
+        assert sample("translation_chunk_failures_total", reason="error") > before
+
+    run(scenario())
+
+
+def test_scrape_reads_active_jobs_from_redis(monkeypatch):
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        monkeypatch.setattr(main, "redis_server", server)
+        for job_id in ("job-1", "job-2"):
+            await start_translation_job(server, f"{job_id}@b.c", job_id, { "origin_title": job_id, "origin_author": "B" }, "chinese", 1)
+        await complete_translation_job(server, "job-1@b.c", "job-1")
+
+        response = await main.metrics()
+        assert b"translation_active_jobs 1.0" in response.body
+
+    run(scenario())
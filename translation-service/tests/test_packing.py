@@ -0,0 +1,191 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app import book_translation
+from app.book_translation import PACK_END, PACK_MARKER, pack_chunks, process_packed_tasks, split_packed_translation
+from app.chunk_cache import chunk_cache_key, get_cached_translation
+from app.job_handler import (
+    dequeue_chunk_task,
+    dequeue_packable_chunk_tasks,
+    enqueue_chunk_tasks,
+    get_job_state,
+    save_source_chunks,
+    start_translation_job,
+)
+from app.llm_router import LLMBackend, LLMRouter
+from app.rate_limiter import RateLimiter
+
+BOOK_INFO = { "origin_title": "A", "origin_author": "B", "trans_title": "甲", "trans_author": "乙" }
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def answer(translations: list[str]) -> str:
+    return "\n\n".join(f"{PACK_MARKER.format(i)}\n{t}" for i, t in enumerate(translations, 1)) + f"\n\n{PACK_END}"
+
+
+def test_packed_answer_splits_back_per_chunk():
+    chunks = ["One.", "Two.\n\nStill two.", "Three."]
+    assert pack_chunks(chunks).startswith(f"{PACK_MARKER.format(1)}\nOne.")
+    assert split_packed_translation(answer(["一。", "二。\n\n还是二。", "三。"]), chunks) == ["一。", "二。\n\n还是二。", "三。"]
+    # markers indented or with trailing spaces still count
+    assert split_packed_translation(f"  {PACK_MARKER.format(1)}  \n一。\n{PACK_MARKER.format(2)}\n二。\n{PACK_END} ", chunks[:2]) == ["一。", "二。"]
+
+
+@pytest.mark.parametrize("text", [
+    answer(["一。", "二。"]),
+    answer(["一。", "二。", "三。"]).replace(PACK_END, ""),
+    answer(["一。", "", "三。"]),
+    answer(["一。", "二。", "三。"]).replace(PACK_MARKER.format(2), PACK_MARKER.format(3), 1),
+    answer(["一。", "二。", "三。"]) + f"\n{PACK_MARKER.format(4)}\n四。",
+    "一。二。三。",
+    None,
+])
+def test_malformed_packed_answer_is_rejected(text):
+    assert split_packed_translation(text, ["One.", "Two.", "Three."]) is None
+
+
+def test_segment_far_off_the_pack_length_ratio_is_rejected():
+    chunks = ["A long paragraph. " * 20, "Another long paragraph. " * 20]
+    assert split_packed_translation(answer(["长段落。" * 20, "另一个长段落。" * 20]), chunks) is not None
+    # the model moved the second segment's text into the first
+    assert split_packed_translation(answer(["长段落。" * 20 + "另一个长段落。" * 19, "另一个。"]), chunks) is None
+
+
+async def setup_jobs(server) -> None:
+    await start_translation_job(server, "a@b.c", "job-1", BOOK_INFO, "chinese", 2)
+    await save_source_chunks(server, "job-1", ["One.", "Two."], [2, 2])
+    await start_translation_job(server, "b@b.c", "job-2", BOOK_INFO, "chinese", 1)
+    await save_source_chunks(server, "job-2", ["Three."], [2])
+    await start_translation_job(server, "c@b.c", "job-3", BOOK_INFO, "malay", 1)
+    await save_source_chunks(server, "job-3", ["Four."], [2])
+    await start_translation_job(server, "d@b.c", "job-4", BOOK_INFO, "chinese", 1)
+    await save_source_chunks(server, "job-4", ["Five. " * 100], [600])
+    for job_id, total in (("job-1", 2), ("job-2", 1), ("job-3", 1), ("job-4", 1)):
+        await enqueue_chunk_tasks(server, job_id, list(range(total)))
+
+
+def test_only_small_tasks_in_the_same_language_are_packed():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await setup_jobs(server)
+        task = await dequeue_chunk_task(server, "w1", timeout=0)
+        assert task == ("job-1", 0)
+        assert await dequeue_packable_chunk_tasks(server, "w1", *task, 500, 8000, 7) == [("job-2", 0), ("job-1", 1)]
+        assert await server.llen("queue:translation:processing:w1") == 3
+        # the malay and the large chunk are left for other requests
+        assert await dequeue_chunk_task(server, "w2", timeout=0) == ("job-3", 0)
+        assert await dequeue_chunk_task(server, "w2", timeout=0) == ("job-4", 0)
+
+    run(scenario())
+
+
+def test_pack_budget_and_count_are_respected():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await setup_jobs(server)
+        task = await dequeue_chunk_task(server, "w1", timeout=0)
+        assert await dequeue_packable_chunk_tasks(server, "w1", *task, 500, 8000, 1) == [("job-2", 0)]
+        assert await dequeue_packable_chunk_tasks(server, "w1", "job-4", 0, 500, 8000, 7) == []
+        assert await dequeue_packable_chunk_tasks(server, "w1", *task, 500, 3, 7) == []
+
+    run(scenario())
+
+
+@pytest.fixture
+def packed_tasks(monkeypatch, tmp_path):
+    # finished books go to the cache folder under the working directory
+    monkeypatch.chdir(tmp_path)
+
+    async def take(server):
+        await setup_jobs(server)
+        task = await dequeue_chunk_task(server, "w1", timeout=0)
+        return [task, *await dequeue_packable_chunk_tasks(server, "w1", *task, 500, 8000, 7)]
+
+    return take
+
+
+def test_packed_tasks_are_translated_in_one_request(packed_tasks, monkeypatch):
+    requests = []
+
+    async def translate(chunks, language, backend, tokens):
+        requests.append(chunks)
+        return answer([f"译{c}" for c in chunks])
+
+    monkeypatch.setattr(book_translation, "translate_packed_chunks", translate)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        tasks = await packed_tasks(server)
+        rl = RateLimiter(10, 60)
+        router = LLMRouter([LLMBackend("a", "model-a", rl)])
+        settled = set()
+        await process_packed_tasks("w1", tasks, router, server, settled)
+
+        assert requests == [["One.", "Three.", "Two."]]
+        assert len(rl.calls) == 1
+        assert settled == set(tasks)
+        assert await get_job_state(server, "job-1") == "finished"
+        assert await get_job_state(server, "job-2") == "finished"
+        assert await get_cached_translation(
+            server, chunk_cache_key("Two.", "chinese", "model-a", book_translation.TRANSLATE_PROMPT_VERSION), folder=None
+        ) == "译Two."
+        assert await server.llen("queue:translation:processing:w1") == 0
+
+    run(scenario())
+
+
+def test_unsplittable_answer_falls_back_to_one_request_per_chunk(packed_tasks, monkeypatch):
+    singles = []
+
+    async def merged(chunks, language, backend, tokens):
+        return "一。二。三。"
+
+    async def translate(chunk, language, backend, tokens):
+        singles.append(chunk)
+        return f"译{chunk}"
+
+    monkeypatch.setattr(book_translation, "translate_packed_chunks", merged)
+    monkeypatch.setattr(book_translation, "translate_chunk", translate)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        tasks = await packed_tasks(server)
+        router = LLMRouter([LLMBackend("a", "model-a", RateLimiter(10, 60))])
+        await process_packed_tasks("w1", tasks, router, server, set())
+
+        assert singles == ["One.", "Three.", "Two."]
+        assert await get_job_state(server, "job-1") == "finished"
+        assert await get_job_state(server, "job-2") == "finished"
+
+    run(scenario())
+
+
+def test_error_mid_pack_leaves_only_the_unfinished_tasks_to_retry(packed_tasks, monkeypatch):
+    async def merged(chunks, language, backend, tokens):
+        return "一。二。三。"
+
+    async def translate_chunk_task(worker_id, job_id, chunk_idx, ctx, router, redis_server):
+        if (job_id, chunk_idx) == ("job-2", 0):
+            raise RuntimeError("worker crashed")
+        await book_translation.complete_chunk_task(worker_id, job_id, chunk_idx, True, redis_server)
+
+    monkeypatch.setattr(book_translation, "translate_packed_chunks", merged)
+    monkeypatch.setattr(book_translation, "translate_chunk_task", translate_chunk_task)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        tasks = await packed_tasks(server)
+        router = LLMRouter([LLMBackend("a", "model-a", RateLimiter(10, 60))])
+        settled = set()
+        with pytest.raises(RuntimeError):
+            await process_packed_tasks("w1", tasks, router, server, settled)
+        assert settled == { ("job-1", 0) }
+
+    run(scenario())
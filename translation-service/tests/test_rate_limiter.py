@@ -0,0 +1,174 @@
+import asyncio
+import multiprocessing
+import os
+import time
+
+import pytest
+import redis
+import redis.asyncio as aredis
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app.benchmark_rate_limiter import max_calls_in_window
+from app.rate_limiter import (
+    AIMDConcurrency,
+    RateLimiter,
+    RedisRateLimiter,
+    parse_duration,
+    parse_rate_limit_reset,
+    parse_retry_after,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_shared_limiter_keeps_every_window_within_max_calls():
+    max_calls, refill_rate, duration = 5, 1, 2.5
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        # two limiters on one key stand for two processes sharing the budget
+        limiters = [RedisRateLimiter(server, max_calls, refill_rate, key="ratelimit:test") for _ in range(2)]
+        stamps = []
+        deadline = time.monotonic() + duration
+
+        async def caller(rl: RedisRateLimiter):
+            while True:
+                await rl.acquire()
+                now = time.monotonic()
+                if now >= deadline:
+                    return
+                stamps.append(now)
+
+        await asyncio.gather(*[caller(rl) for rl in limiters for _ in range(4)])
+        return stamps
+
+    stamps = run(scenario())
+    # the slack absorbs the gap between the Redis clock and the client's
+    assert max_calls_in_window(stamps, refill_rate - 0.05) <= max_calls
+    assert len(stamps) >= max_calls * 2
+
+
+async def blocks(acquisition, seconds: float = 0.2) -> bool:
+    try:
+        await asyncio.wait_for(acquisition, seconds)
+        return False
+    except asyncio.TimeoutError:
+        return True
+
+
+def test_shared_limiter_token_budget():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        a = RedisRateLimiter(server, 10, 60, key="ratelimit:test", max_tokens=100)
+        b = RedisRateLimiter(server, 10, 60, key="ratelimit:test", max_tokens=100)
+        await a.acquire(60)
+        assert await blocks(b.acquire(60))
+        await b.acquire(40)
+        assert await blocks(a.acquire(1))
+
+    run(scenario())
+
+
+def test_local_limiter_token_budget():
+    async def scenario():
+        rl = RateLimiter(10, 60, max_tokens=100)
+        await rl.acquire(70)
+        assert await blocks(rl.acquire(40))
+        await rl.acquire(30)
+        # a request larger than the whole budget is capped to it instead of waiting forever
+        assert await blocks(rl.acquire(1000))
+
+    run(scenario())
+
+
+def test_retry_after_pauses_every_limiter_on_the_key():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        a = RedisRateLimiter(server, 10, 60, key="ratelimit:test")
+        b = RedisRateLimiter(server, 10, 60, key="ratelimit:test")
+        await a.feedback({ "retry-after": "1" }, throttled=True)
+        assert await blocks(b.acquire())
+        assert a.concurrency.limit == 5
+        await asyncio.sleep(1)
+        await b.acquire()
+
+    run(scenario())
+
+
+def test_rate_limit_headers():
+    assert parse_duration("20ms") == 0.02
+    assert parse_duration("6m0s") == 360
+    assert parse_retry_after({ "retry-after-ms": "1500" }) == 1.5
+    assert parse_retry_after({ "retry-after": "2" }) == 2
+    assert parse_retry_after({}) is None
+    headers = { "x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "1m30s",
+                "x-ratelimit-remaining-requests": "3", "x-ratelimit-reset-requests": "5s" }
+    assert parse_rate_limit_reset(headers) == 90
+
+
+def test_aimd_concurrency_halves_on_throttle_and_grows_back():
+    aimd = AIMDConcurrency(8)
+    aimd.on_throttle()
+    aimd.on_throttle()
+    assert aimd.limit == 2
+    for _ in range(10):
+        aimd.on_success()
+    assert 4 < aimd.limit < 8
+    for _ in range(200):
+        aimd.on_success()
+    assert aimd.limit == 8
+
+
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+PROCESS_KEY = "ratelimit:test-processes"
+
+
+def hammer_process(max_calls: int, refill_rate: float, deadline: float, out) -> None:
+    async def scenario():
+        server = aredis.Redis(port=REDIS_PORT, decode_responses=True)
+        rl = RedisRateLimiter(server, max_calls, refill_rate, key=PROCESS_KEY)
+        stamps = []
+
+        async def caller():
+            while True:
+                await rl.acquire()
+                now = time.time()
+                if now >= deadline:
+                    return
+                stamps.append(now)
+
+        await asyncio.gather(*[caller() for _ in range(4)])
+        await server.aclose()
+        return stamps
+
+    out.put(asyncio.run(scenario()))
+
+
+def test_limiter_shared_by_processes_on_real_redis():
+    try:
+        server = redis.Redis(port=REDIS_PORT, socket_connect_timeout=0.5)
+        server.ping()
+    except redis.ConnectionError:
+        pytest.skip(f"no Redis on localhost:{REDIS_PORT}")
+    server.delete(f"{PROCESS_KEY}:window")
+
+    max_calls, refill_rate = 5, 1
+    deadline = time.time() + 3.5
+    out = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=hammer_process, args=(max_calls, refill_rate, deadline, out))
+        for _ in range(3)
+    ]
+    for p in procs:
+        p.start()
+    stamps = [t for _ in procs for t in out.get(timeout=30)]
+    for p in procs:
+        p.join()
+    server.delete(f"{PROCESS_KEY}:window")
+
+    assert max_calls_in_window(stamps, refill_rate - 0.05) <= max_calls
+    assert len(stamps) >= max_calls * 3
@@ -0,0 +1,140 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app import book_translation
+from app.book_translation import recover_orphaned_jobs
+from app.job_handler import (
+    acquire_lease,
+    JobStatus,
+    check_job_status,
+    dequeue_chunk_task,
+    enqueue_chunk_tasks,
+    get_job_result,
+    get_job_state,
+    refresh_worker_heartbeat,
+    release_lease,
+    save_source_chunks,
+    start_translation_job,
+    update_translation_job_progress,
+)
+
+BOOK_INFO = { "origin_title": "A", "origin_author": "B", "trans_title": "甲", "trans_author": "乙" }
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture(autouse=True)
+def no_grace(monkeypatch, tmp_path):
+    # the finalized book goes to the cache folder under the working directory
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(book_translation, "RECOVERY_GRACE", 0)
+
+
+async def start_job(server, job_id: str, chunks: list[str]) -> None:
+    await start_translation_job(server, f"{job_id}@b.c", job_id, BOOK_INFO, "chinese", len(chunks))
+    await save_source_chunks(server, job_id, chunks)
+
+
+async def drain(server) -> list[tuple[str, int]]:
+    tasks = []
+    while (task := await dequeue_chunk_task(server, "drain:0:0", timeout=0)) is not None:
+        tasks.append(task)
+    return tasks
+
+
+def test_tasks_of_dead_workers_are_reclaimed_and_live_ones_kept():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_job(server, "job-1", ["a", "b", "c"])
+        await enqueue_chunk_tasks(server, "job-1", [0, 1, 2])
+        await refresh_worker_heartbeat(server, "alive:1")
+        assert await dequeue_chunk_task(server, "alive:1:0", timeout=0) == ("job-1", 0)
+        assert await dequeue_chunk_task(server, "dead:2:0", timeout=0) == ("job-1", 1)
+
+        stats = await recover_orphaned_jobs(server, "sweeper")
+        assert stats == { "reclaimed_tasks": 1, "requeued_chunks": 0, "finalized_jobs": 0, "failed_jobs": 0 }
+        # back at its original priority, ahead of chunk 2
+        assert await drain(server) == [("job-1", 1), ("job-1", 2)]
+
+    run(scenario())
+
+
+def test_chunks_without_a_task_are_requeued():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_job(server, "job-1", ["a", "b", "c"])
+        await update_translation_job_progress(server, "job-1", 0, "甲", 3)
+        # chunk 1 is queued, chunk 2's task was lost
+        await enqueue_chunk_tasks(server, "job-1", [1])
+
+        stats = await recover_orphaned_jobs(server, "sweeper")
+        assert stats["requeued_chunks"] == 1
+        assert await drain(server) == [("job-1", 1), ("job-1", 2)]
+
+    run(scenario())
+
+
+def test_a_job_leased_by_another_sweep_is_skipped():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_job(server, "job-1", ["a"])
+        assert await acquire_lease(server, "job:job-1:recovery", "other", 60)
+        assert not await acquire_lease(server, "job:job-1:recovery", "sweeper", 60)
+        assert (await recover_orphaned_jobs(server, "sweeper"))["requeued_chunks"] == 0
+
+        # only the holder releases it
+        await release_lease(server, "job:job-1:recovery", "sweeper")
+        assert await server.get("job:job-1:recovery") == "other"
+        await release_lease(server, "job:job-1:recovery", "other")
+        assert (await recover_orphaned_jobs(server, "sweeper"))["requeued_chunks"] == 1
+        assert not await server.exists("job:job-1:recovery")
+
+    run(scenario())
+
+
+def test_recent_jobs_are_left_alone(monkeypatch):
+    monkeypatch.setattr(book_translation, "RECOVERY_GRACE", 60)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_job(server, "job-1", ["a"])
+        assert (await recover_orphaned_jobs(server, "sweeper"))["requeued_chunks"] == 0
+
+    run(scenario())
+
+
+def test_translated_job_is_finalized_and_job_without_sources_failed():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_job(server, "done", ["a", "b"])
+        for i, t in enumerate(["甲", "乙"]):
+            await update_translation_job_progress(server, "done", i, t, 2)
+        await start_job(server, "lost", ["a"])
+        await server.delete("job:lost:source")
+
+        stats = await recover_orphaned_jobs(server, "sweeper")
+        assert (stats["finalized_jobs"], stats["failed_jobs"]) == (1, 1)
+        assert await get_job_state(server, "done") == "finished"
+        assert await get_job_result(server, "done") == "甲\n\n乙"
+        assert await get_job_state(server, "lost") == "failed"
+        # the user may start another job
+        assert await check_job_status(server, "lost@b.c", "other") == JobStatus.NO_JOB
+
+    run(scenario())
+
+
+def test_running_jobs_missing_from_the_active_set_are_found_by_the_startup_scan():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_job(server, "job-1", ["a"])
+        await server.delete("jobs:active")
+        assert (await recover_orphaned_jobs(server, "sweeper"))["requeued_chunks"] == 0
+        assert (await recover_orphaned_jobs(server, "sweeper", scan=True))["requeued_chunks"] == 1
+
+    run(scenario())
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app import job_handler
+from app.job_handler import (
+    ack_chunk_task,
+    dequeue_chunk_task,
+    enqueue_chunk_tasks,
+    get_queue_depth,
+    requeue_chunk_task,
+)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def drain(server) -> list[tuple[str, int]]:
+    tasks = []
+    while (task := await dequeue_chunk_task(server, "w1", timeout=0)) is not None:
+        tasks.append(task)
+    return tasks
+
+
+def test_opening_chunks_of_every_job_go_first(monkeypatch):
+    monkeypatch.setattr(job_handler, "CHUNK_PRIORITY_SECONDS", 10)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        assert await enqueue_chunk_tasks(server, "old", list(range(3))) == 3
+        await asyncio.sleep(0.01)
+        assert await enqueue_chunk_tasks(server, "new", list(range(3))) == 6
+        assert await drain(server) == [
+            ("old", 0), ("new", 0), ("old", 1), ("new", 1), ("old", 2), ("new", 2)
+        ]
+
+    run(scenario())
+
+
+def test_requeued_task_keeps_its_priority():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await enqueue_chunk_tasks(server, "job", [0, 1, 2])
+        assert await dequeue_chunk_task(server, "w1", timeout=0) == ("job", 0)
+        await requeue_chunk_task(server, "w1", "job", 0)
+        assert await server.llen(f"{job_handler.TRANSLATION_QUEUE}:processing:w1") == 0
+        assert await drain(server) == [("job", 0), ("job", 1), ("job", 2)]
+
+    run(scenario())
+
+
+def test_backed_off_task_waits_out_its_delay():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await enqueue_chunk_tasks(server, "job", [0, 1])
+        assert await dequeue_chunk_task(server, "w1", timeout=0) == ("job", 0)
+        await requeue_chunk_task(server, "w1", "job", 0, delay=0.3)
+        assert await get_queue_depth(server) == { "ready": 1, "delayed": 1 }
+
+        # the worker moves on to other chunks meanwhile
+        assert await dequeue_chunk_task(server, "w1", timeout=0) == ("job", 1)
+        assert await dequeue_chunk_task(server, "w1", timeout=0) is None
+        await asyncio.sleep(0.3)
+        assert await dequeue_chunk_task(server, "w1", timeout=0) == ("job", 0)
+        assert await get_queue_depth(server) == { "ready": 0, "delayed": 0 }
+
+        await ack_chunk_task(server, "w1", "job", 0)
+        await ack_chunk_task(server, "w1", "job", 1)
+        assert await server.llen(f"{job_handler.TRANSLATION_QUEUE}:processing:w1") == 0
+        assert not await server.exists(job_handler.TASK_PRIORITY)
+
+    run(scenario())
@@ -0,0 +1,34 @@
+import os
+import threading
+
+from app.token_counter import TokenCounter
+
+
+def test_tokenizer_loads_on_first_use_only_once():
+    counter = TokenCounter(os.environ["TOKENIZER_PATH"], "unused/repo")
+    assert not counter.is_loaded
+
+    threads = [threading.Thread(target=counter.count, args=("The quick brown fox",)) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.is_loaded
+    tokenizer = counter.tokenizer
+    counter.preload()
+    assert counter.tokenizer is tokenizer
+
+
+def test_count_excludes_special_tokens():
+    counter = TokenCounter(os.environ["TOKENIZER_PATH"], "unused/repo")
+    text = "You don't have to be French to enjoy a decent red wine."
+    assert counter.count(text) == len(counter.encode(text, add_special_tokens=False))
+    assert counter.count("") == 0
+
+
+def test_offsets_cover_the_text():
+    counter = TokenCounter(os.environ["TOKENIZER_PATH"], "unused/repo")
+    text = "naïve 約瑟夫 wine"
+    offsets = counter.offsets(text)
+    assert len(offsets) == counter.count(text)
+    assert offsets[0][0] == 0 and offsets[-1][1] == len(text)
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+from app import book_translation, tracing
+from app.job_handler import complete_translation_job, start_translation_job
+from app.llm_router import LLMBackend, LLMRouter
+from app.rate_limiter import RateLimiter
+from app.tracing import get_job_timeline, root_span_id, span, start_job_trace
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+JOB_ID = "0123456789abcdef0123456789abcdef"
+
+
+def test_nested_spans_get_their_parent():
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        async with span(server, JOB_ID, "outer") as outer:
+            async with span(server, JOB_ID, "inner") as inner:
+                pass
+        spans = { s["name"]: s for s in map(json.loads, await server.lrange(f"job:{JOB_ID}:spans", 0, -1)) }
+        assert spans["outer"]["parent_id"] == root_span_id(JOB_ID)
+        assert spans["inner"]["parent_id"] == outer.span_id
+        assert inner.span_id == spans["inner"]["span_id"]
+
+    run(scenario())
+
+
+def test_timeline_follows_the_last_chunk(monkeypatch):
+    async def translate(chunk, language, backend, tokens):
+        await asyncio.sleep(0.05 if chunk == "Slow." else 0)
+        return chunk
+
+    monkeypatch.setattr(book_translation, "translate_chunk", translate)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        await start_translation_job(server, "a@b.c", JOB_ID, { "origin_title": "A", "origin_author": "B" }, "chinese", 2)
+        await start_job_trace(server, JOB_ID)
+        router = LLMRouter([LLMBackend("only", "m", RateLimiter(10, 60))])
+
+        async def attempt(idx, chunk):
+            async with span(server, JOB_ID, "chunk.attempt", chunk_no=idx) as s:
+                assert await book_translation.worker(JOB_ID, idx, chunk, "chinese", 2, router, server)
+                s.set(outcome="translated")
+
+        await asyncio.gather(attempt(0, "Slow."), attempt(1, "Fast."))
+        await complete_translation_job(server, "a@b.c", JOB_ID)
+
+        timeline = await get_job_timeline(server, JOB_ID)
+        assert timeline["state"] == "finished"
+        assert timeline["totals"]["llm.request"]["count"] == 2
+        path = timeline["critical_path"]
+        assert path["chunk_no"] == 0
+        assert [s["name"] for s in path["segments"]] == ["chunk.attempt", "rate_limit.wait", "llm.request", "redis.progress"]
+        assert path["breakdown_s"]["llm"] >= 0.05
+
+        assert await get_job_timeline(server, "unknown") is None
+
+    run(scenario())
+
+
+def test_spans_are_exported_off_the_event_loop(tmp_path, monkeypatch):
+    export_file = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(tracing, "TRACE_EXPORT_FILE", str(export_file))
+    threads = []
+    append = tracing.append_export_line
+
+    def recording_append(line):
+        threads.append(threading.current_thread())
+        append(line)
+
+    monkeypatch.setattr(tracing, "append_export_line", recording_append)
+
+    async def scenario():
+        server = fakeredis.FakeAsyncRedis(decode_responses=True)
+        async with span(server, JOB_ID, "llm.request", backend="a", tokens=10):
+            pass
+
+    run(scenario())
+    assert threads and threads[0] is not threading.main_thread()
+    [request] = [json.loads(line) for line in export_file.read_text().splitlines()]
+    [otlp] = request["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert otlp["traceId"] == JOB_ID
+    assert otlp["parentSpanId"] == root_span_id(JOB_ID)
+    assert { "key": "tokens", "value": { "intValue": "10" } } in otlp["attributes"]